@@ -0,0 +1,809 @@
+import copy
+import hashlib
+import os
+from contextlib import contextmanager
+
+from care_journal import (append_journal_record, append_journal_records, apply_journal_records, journal_path,
+                          read_care_logs, read_snapshot, repair_journal)
+from care_records import activity_counts
+from care_shards import ShardedCareLogs, month_of, shard_dir_for, split_into_shards
+from households import household_data_dir
+from instrumentation import instrument_methods
+from storage import (FileLock, append_lines, atomic_write, convert_file, dump_data, file_codec, file_stamp,
+                     read_appended_lines, read_data_file, read_tail_records, save_codec)
+from write_behind import WriteBehindWriter
+
+HEALTH_RECORD_TYPES = ('medications', 'health_observations', 'grooming_appointments')
+
+def empty_health_records():
+    return {kind: [] for kind in HEALTH_RECORD_TYPES}
+
+def in_range(day, start=None, end=None):
+    return bool(day) and (not start or day >= start) and (not end or day <= end)
+
+def by_date_and_time(record):
+    return (record['date'], record.get('time') or '')
+
+def in_date_order(records, matches):
+    """The records that match, by date and time. Record lists are usually
+    already in that order, and are then streamed instead of copied."""
+    previous = None
+    for record in records:
+        key = by_date_and_time(record) if record.get('date') else None
+        if key is not None:
+            if previous is not None and key < previous:
+                return iter(sorted(filter(matches, records), key=by_date_and_time))
+            previous = key
+    return filter(matches, records)
+
+def merge_changes(base, ours, theirs):
+    """Three-way merge of {key: record} dicts into ours, in place.
+
+    Keys someone else added, changed or removed since base are taken from
+    theirs. If we changed the same key too, records that are dicts on all
+    three sides are merged the same way field by field; otherwise ours wins.
+    """
+    for key in set(base) | set(theirs):
+        mine, old, new = ours.get(key), base.get(key), theirs.get(key)
+        if new == old:
+            continue
+        if mine == old:
+            if key in theirs:
+                ours[key] = new
+            else:
+                ours.pop(key, None)
+        elif isinstance(mine, dict) and isinstance(old, dict) and isinstance(new, dict):
+            merge_changes(old, mine, new)
+
+class DatasetCache:
+    """A parsed dataset plus the stamp of the storage it was parsed from.
+
+    generation goes up whenever value is replaced or other processes'
+    records are merged into it, so anything derived from it (indexes,
+    columns) knows to rebuild.
+    """
+
+    def __init__(self):
+        self.value = None
+        self.stamp = None
+        self.generation = 0
+
+class StorageBackend:
+    """Where the trackers keep their data.
+
+    Trackers update their in-memory copy first and then tell the backend
+    about the new record with one of the add_* methods. Whole-document
+    backends persist the collection they handed out from load_*, record
+    backends insert just the new row. The count/total methods let reports
+    ask for aggregates without walking every record themselves.
+
+    Loaded datasets are cached and shared by everyone using the backend;
+    a cached copy is only re-read when its stamp shows the underlying
+    storage changed behind our back (another process, say).
+    """
+
+    def __init__(self):
+        self.datasets = {}
+
+    def dataset(self, name):
+        if name not in self.datasets:
+            self.datasets[name] = DatasetCache()
+        return self.datasets[name]
+
+    def cached(self, name, stamp, parse):
+        """The cached dataset, re-parsed if it was never loaded or its stamp changed"""
+        cache = self.dataset(name)
+        if cache.value is None or cache.stamp != stamp:
+            cache.stamp = stamp
+            cache.value = parse()
+            cache.generation += 1
+        return cache.value
+
+    def remember(self, name, value):
+        """Cache a dataset the caller already has in memory"""
+        cache = self.dataset(name)
+        if cache.value is not value:
+            cache.value = value
+            cache.generation += 1
+
+    @contextmanager
+    def saving(self, name):
+        """Wrap the add_* call that follows a tracker's in-memory update: if
+        it fails, drop the cached dataset so the records that never reached
+        storage don't linger in memory and get saved with the next write"""
+        try:
+            yield
+        except BaseException:
+            cache = self.dataset(name)
+            cache.value = None
+            cache.stamp = None
+            raise
+
+    def generation(self, name):
+        """How many times dataset name has been (re)loaded or merged into"""
+        return self.dataset(name).generation
+
+    def load_pets(self):
+        """Return {pet_id: profile}, or None if no pets were ever saved"""
+        raise NotImplementedError
+
+    def save_pets(self, pets):
+        raise NotImplementedError
+
+    def load_care_logs(self):
+        """Return a {date: {pet: [activities]}} mapping"""
+        raise NotImplementedError
+
+    def save_care_logs(self, care_logs):
+        raise NotImplementedError
+
+    def add_care_activity(self, day, pet_name, activity):
+        raise NotImplementedError
+
+    def add_care_activities(self, entries):
+        """Persist many (day, pet_name, activity) entries in one batch"""
+        raise NotImplementedError
+
+    def load_health_records(self):
+        """Return {'medications': [...], 'health_observations': [...], 'grooming_appointments': [...]}"""
+        raise NotImplementedError
+
+    def save_health_records(self, health_records):
+        raise NotImplementedError
+
+    def add_health_record(self, kind, record):
+        raise NotImplementedError
+
+    def add_health_records(self, records_by_kind):
+        """Persist {kind: [records]} in one batch"""
+        raise NotImplementedError
+
+    def load_expenses(self):
+        raise NotImplementedError
+
+    def save_expenses(self, expenses):
+        raise NotImplementedError
+
+    def add_expense(self, expense):
+        raise NotImplementedError
+
+    def add_expenses(self, expenses):
+        raise NotImplementedError
+
+    def care_days_since(self, day):
+        """(date, {pet: [activities]}) for every date on or after day, oldest first"""
+        raise NotImplementedError
+
+    def care_activities_between(self, pet_name=None, start=None, end=None):
+        """(date, pet, activity) for care activities dated within [start, end], by date and time.
+        Here and below pet_name matches case-insensitively and None means every pet."""
+        wanted = pet_name.casefold() if pet_name else None
+        for day, day_logs in self.care_days_since(start):
+            if end and day > end:
+                break
+            activities = [(pet, activity) for pet, pet_activities in day_logs.items()
+                          if wanted is None or pet.casefold() == wanted
+                          for activity in pet_activities]
+            for pet, activity in sorted(activities, key=lambda entry: entry[1]['time'] or ''):
+                yield day, pet, activity
+
+    def health_records_between(self, kind, pet_name=None, start=None, end=None):
+        """Health records of a kind dated within [start, end], by date and time"""
+        wanted = pet_name.casefold() if pet_name else None
+        return in_date_order(self.load_health_records().get(kind, []), lambda record: (
+            (wanted is None or (record.get('pet_name') or '').casefold() == wanted)
+            and in_range(record.get('date'), start, end)))
+
+    def expenses_between(self, pet_name=None, start=None, end=None):
+        """Expenses dated within [start, end], by date"""
+        wanted = pet_name.casefold() if pet_name else None
+        return in_date_order(self.load_expenses(), lambda expense: (
+            (wanted is None or (expense.get('pet') or '').casefold() == wanted)
+            and in_range(expense.get('date'), start, end)))
+
+    def recent_expenses(self, count):
+        """The last count expenses added, oldest first"""
+        return self.load_expenses()[-count:]
+
+    def recent_health_records(self, kind, count):
+        """The last count health records of a kind added, oldest first"""
+        return self.load_health_records().get(kind, [])[-count:]
+
+    def expenses_since(self, position):
+        """Expenses added after position, plus the position to pass next time.
+
+        Positions are opaque; None means from the beginning.
+        """
+        raise NotImplementedError
+
+    def health_records_since(self, kind, position):
+        """Health records of a kind added after position, plus the next position (as expenses_since)"""
+        raise NotImplementedError
+
+    def activity_counts_by_day(self, days):
+        """{date: number of activities} for the given dates that have any"""
+        raise NotImplementedError
+
+    def activity_counts_by_pet(self):
+        raise NotImplementedError
+
+    def care_totals(self):
+        """(days with activities, total activities)"""
+        raise NotImplementedError
+
+    def care_months(self):
+        """Months ('YYYY-MM') that have care logs, oldest first"""
+        raise NotImplementedError
+
+    def care_month_stamps(self):
+        """{month: stamp} that changes whenever a month's stored care logs do,
+        or None if this storage can't tell cheaply"""
+        return None
+
+    def care_month_counts(self, month, from_disk=False):
+        """{date: {pet: {activity_type: count}}} for one month of care logs.
+
+        from_disk reads storage directly instead of the loaded dataset;
+        it's what a worker process with its own backend uses.
+        """
+        raise NotImplementedError
+
+    def worker_spec(self):
+        """(backend class, args) to open this storage again in a worker
+        process, or None if only this process can read it"""
+        return None
+
+    def worker_months(self):
+        """Months a worker's backend would read the same as this one"""
+        return []
+
+    def health_record_count(self):
+        raise NotImplementedError
+
+    def expense_totals(self):
+        """(number of expenses, total amount)"""
+        raise NotImplementedError
+
+    def expenses_for_month(self, month):
+        """Expenses whose date falls in a 'YYYY-MM' month"""
+        raise NotImplementedError
+
+    def write_stats(self):
+        """Write-behind metrics, if the backend does background writes"""
+        return []
+
+    def close(self):
+        pass
+
+@instrument_methods('load_', 'save_', 'add_', 'compact_', 'flush')
+class JSONBackend(StorageBackend):
+    """The original layout: one JSON document per dataset under data_dir.
+
+    Files are pretty JSON unless converted to another codec (see
+    serialization.py); they're read whatever codec wrote them.
+
+    Care logs can optionally be journaled (see care_journal.py) and split
+    into monthly shards (see care_shards.py). With write_behind, whole-file
+    saves are handed to a background writer per file (see write_behind.py)
+    instead of blocking the menu.
+
+    Several processes can write to one data_dir. Every write holds an
+    advisory lock on data_dir/.lock and first folds in whatever the others
+    wrote since we last read the dataset: just the appended lines when
+    they only appended to the journal or a jsonl file, a full re-read when
+    they replaced the file. Our new records then go on top, so neither
+    station's entries get lost. Reads don't lock. Write-behind saves
+    happen later on another thread, so they're for one station at a time.
+    """
+
+    def __init__(self, data_dir='data', journal=False, sharded=False, compact_every=500,
+                 write_behind=False, flush_delay=0.5):
+        super().__init__()
+        self.data_dir = data_dir
+        self.pets_file = os.path.join(data_dir, 'pets.json')
+        self.care_file = os.path.join(data_dir, 'daily_care.json')
+        self.health_file = os.path.join(data_dir, 'health_records.json')
+        self.expense_file = os.path.join(data_dir, 'expenses.json')
+
+        self.journal = journal
+        self.journal_file = journal_path(self.care_file)
+        self.compact_every = compact_every
+        self.journal_entries = 0
+        self.sharded = sharded
+        self.shard_dir = shard_dir_for(self.care_file)
+        self.write_behind = write_behind
+        self.flush_delay = flush_delay
+        self.writers = {}
+        self.writer_datasets = {}
+        self.lock = FileLock(os.path.join(data_dir, '.lock'))
+        # The pets as last read or written, to merge other stations' edits against
+        self.pets_base = {}
+        self.ensure_data_directory()
+
+    def ensure_data_directory(self):
+        """Create data directory if it doesn't exist"""
+        os.makedirs(self.data_dir, exist_ok=True)
+
+    def read_json(self, path, default):
+        if os.path.exists(path):
+            try:
+                return read_data_file(path)
+            except ValueError:
+                return default
+        return default
+
+    def write_json(self, path, data, dataset):
+        self.write_file(path, lambda: dump_data(data, path), dataset)
+
+    def write_file(self, path, serialize, dataset):
+        """Atomically write serialize()'s bytes, now or from the write-behind thread"""
+        if not self.write_behind:
+            with self.lock:
+                atomic_write(path, serialize())
+                self.mark_written(dataset)
+            return
+        if path not in self.writers:
+            self.writers[path] = WriteBehindWriter(path, self.flush_delay,
+                                                   on_written=lambda: self.mark_written(dataset))
+            self.writer_datasets[path] = dataset
+        self.writers[path].request(serialize)
+
+    def stamp(self, name):
+        """What the files behind a dataset look like on disk right now"""
+        if name == 'pets':
+            return file_stamp(self.pets_file)
+        if name == 'care_logs':
+            snapshot = self.shard_dir if os.path.isdir(self.shard_dir) else self.care_file
+            return (file_stamp(snapshot), file_stamp(self.journal_file))
+        if name == 'health_records':
+            return file_stamp(self.health_file)
+        return file_stamp(self.expense_file)
+
+    def current_stamp(self, name):
+        # While our own background write is pending the file is stale on
+        # purpose, so keep trusting the in-memory copy
+        if any(writer.busy() for path, writer in self.writers.items()
+               if self.writer_datasets[path] == name):
+            return self.dataset(name).stamp
+        return self.stamp(name)
+
+    def mark_written(self, name):
+        """Record that the files on disk now match our in-memory dataset"""
+        self.dataset(name).stamp = self.stamp(name)
+
+    def refreshed(self, name, parse):
+        """cached(), but folding in what other processes appended instead of re-parsing"""
+        cache = self.dataset(name)
+        stamp = self.current_stamp(name)
+        if cache.value is not None and cache.stamp != stamp:
+            appended = self.fold_in_appends(name, cache.stamp, stamp)
+            if appended is not None:
+                cache.stamp = stamp
+                cache.generation += bool(appended)
+        generation = cache.generation
+        value = self.cached(name, stamp, parse)
+        if cache.generation != generation and self.current_stamp(name) != stamp:
+            # Written to while we parsed, so there's no telling which of
+            # those writes the copy has: re-parse next time, never fold
+            cache.stamp = None
+        return value
+
+    def fold_in_appends(self, name, old_stamp, stamp):
+        """Add the lines appended to a dataset's file between two stamps to
+        our copy. Returns how many, or None if the file was replaced instead."""
+        value = self.dataset(name).value
+        if name == 'care_logs':
+            if old_stamp is None or old_stamp[0] != stamp[0]:
+                # Compacted into the snapshot
+                return None
+            appended = read_appended_lines(self.journal_file, old_stamp[1], stamp[1])
+            if appended is None or any('compact' in record for record in appended):
+                return None
+            apply_journal_records(value, appended)
+            self.journal_entries += len(appended)
+        elif name == 'health_records':
+            appended = read_appended_lines(self.health_file, old_stamp, stamp)
+            if appended is None:
+                return None
+            for kind, record in appended:
+                value.setdefault(kind, []).append(record)
+        elif name == 'expenses':
+            appended = read_appended_lines(self.expense_file, old_stamp, stamp)
+            if appended is None:
+                return None
+            value.extend(appended)
+        else:
+            return None
+        return len(appended)
+
+    def sync(self, name, reread):
+        """With the lock held, bring our copy of a dataset up to date with
+        what other processes wrote since we loaded it, so ours (already in
+        the copy) can be written on top. reread() returns the dataset from
+        disk plus ours, for when they replaced the file rather than appended."""
+        cache = self.dataset(name)
+        stamp = self.current_stamp(name)
+        if cache.value is None or cache.stamp == stamp:
+            return
+        appended = self.fold_in_appends(name, cache.stamp, stamp)
+        if appended is None:
+            self.remember(name, reread())
+        else:
+            cache.generation += bool(appended)
+        cache.stamp = stamp
+
+    def flush(self):
+        """Wait for background writes to reach disk"""
+        for writer in self.writers.values():
+            writer.flush()
+
+    def write_stats(self):
+        return [writer.stats() for writer in self.writers.values()]
+
+    # Pets
+
+    def load_pets(self):
+        return self.refreshed('pets', self.read_pets)
+
+    def read_pets(self):
+        if not os.path.exists(self.pets_file):
+            return None
+        pets = self.read_json(self.pets_file, None)
+        if pets is None:
+            print("Warning: Could not read pets file. Starting fresh.")
+            pets = {}
+        self.pets_base = copy.deepcopy(pets)
+        return pets
+
+    def save_pets(self, pets):
+        with self.lock:
+            cache = self.dataset('pets')
+            if cache.value is pets and cache.stamp != self.current_stamp('pets'):
+                # Another station saved since we loaded: keep its edits to other pets
+                base = self.pets_base
+                merge_changes(base, pets, self.read_pets() or {})
+                cache.generation += 1
+            self.remember('pets', pets)
+            self.write_json(self.pets_file, pets, 'pets')
+            self.pets_base = copy.deepcopy(pets)
+
+    # Care logs
+
+    def load_care_logs(self):
+        if self.sharded and not os.path.isdir(self.shard_dir):
+            with self.lock:
+                if not os.path.isdir(self.shard_dir):
+                    self.migrate_to_shards()
+        return self.refreshed('care_logs', self.read_care_logs)
+
+    def read_care_logs(self):
+        care_logs, self.journal_entries = read_care_logs(self.care_file)
+        return care_logs
+
+    def sync_care_logs(self, records=()):
+        """With the lock held, fold in what other processes logged, ahead of
+        journaling records (already in our copy)"""
+        def reread():
+            care_logs = self.read_care_logs()
+            apply_journal_records(care_logs, records)
+            return care_logs
+        self.sync('care_logs', reread)
+        repair_journal(self.journal_file)
+
+    def save_care_logs(self, care_logs):
+        """Save care logs to JSON, folding in any journaled activities"""
+        with self.lock:
+            self.write_care_logs(care_logs)
+
+    def write_care_logs(self, care_logs):
+        self.remember('care_logs', care_logs)
+        has_journal = os.path.exists(self.journal_file) and os.path.getsize(self.journal_file) > 0
+        if self.write_behind and not has_journal:
+            # Nothing to fold in, so there's no journal ordering to preserve
+            if isinstance(care_logs, ShardedCareLogs):
+                for path, data in care_logs.pending_writes().items():
+                    self.write_file(path, lambda data=data: data, 'care_logs')
+                care_logs.mark_clean()
+            else:
+                self.write_json(self.care_file, care_logs, 'care_logs')
+            return
+
+        if isinstance(care_logs, ShardedCareLogs):
+            pending = care_logs.pending_writes()
+        else:
+            pending = {self.care_file: dump_data(care_logs, self.care_file)}
+        self.flush()
+        self.write_snapshot(pending)
+        if isinstance(care_logs, ShardedCareLogs):
+            care_logs.mark_clean()
+
+    def add_care_activity(self, day, pet_name, activity):
+        record = {'date': day, 'pet': pet_name, 'activity': activity}
+        with self.lock:
+            self.sync_care_logs([record])
+            if self.journal:
+                append_journal_record(self.journal_file, record)
+                self.journal_entries += 1
+                self.mark_written('care_logs')
+                if self.journal_entries >= self.compact_every:
+                    self.compact_journal()
+            else:
+                self.save_care_logs(self.load_care_logs())
+
+    def add_care_activities(self, entries):
+        records = [{'date': day, 'pet': pet_name, 'activity': activity} for day, pet_name, activity in entries]
+        with self.lock:
+            self.sync_care_logs(records)
+            if self.journal and self.journal_entries + len(records) < self.compact_every:
+                # A handful (e.g. the API's write batches): one journal append and fsync
+                append_journal_records(self.journal_file, records)
+                self.journal_entries += len(records)
+                self.mark_written('care_logs')
+                return
+            # One snapshot write per touched file, folding in the journal as well
+            self.save_care_logs(self.load_care_logs())
+
+    def write_snapshot(self, pending):
+        """Atomically write snapshot files and then clear the journal"""
+        has_journal = os.path.exists(self.journal_file) and os.path.getsize(self.journal_file) > 0
+
+        # Mark the journal first so a crash after the snapshot is replaced
+        # but before the journal is cleared doesn't replay entries twice
+        if has_journal:
+            marker = {os.path.basename(path): hashlib.sha256(data).hexdigest() for path, data in pending.items()}
+            append_journal_record(self.journal_file, {'compact': marker})
+
+        for path, data in pending.items():
+            atomic_write(path, data)
+
+        # A new file rather than truncating, so the journal's stamp can't
+        # grow back to what another process last saw. Written even when
+        # there was nothing to clear: a shard directory's mtime is too
+        # coarse to tell other processes that the shards changed.
+        atomic_write(self.journal_file, b'')
+        self.journal_entries = 0
+        self.mark_written('care_logs')
+
+    def compact_journal(self):
+        """Fold the journal back into the snapshot and start a fresh journal"""
+        with self.lock:
+            self.sync_care_logs()
+            self.save_care_logs(self.load_care_logs())
+
+    def migrate_to_shards(self):
+        """Split the single care log file into monthly shards.
+
+        The journal is left alone; it replays on top of the shards the same
+        way it did on top of the single file.
+        """
+        split_into_shards(read_snapshot(self.care_file), self.shard_dir, file_codec(self.care_file))
+        if os.path.exists(self.care_file):
+            os.replace(self.care_file, self.care_file + '.pre-shard')
+            print(f"📦 Split care logs into {len(os.listdir(self.shard_dir))} monthly shards in {self.shard_dir}")
+
+    def data_files(self):
+        """Every data file that exists, care log shards included (not the journal)"""
+        paths = [self.pets_file, self.care_file, self.health_file, self.expense_file]
+        if os.path.isdir(self.shard_dir):
+            paths += [os.path.join(self.shard_dir, name) for name in sorted(os.listdir(self.shard_dir))
+                      if name.endswith('.json')]
+        return [path for path in paths if os.path.exists(path)]
+
+    def convert(self, codec):
+        """Rewrite every data file with codec, returns {path: (old codec, old size, new size)}.
+
+        jsonl only applies to the record logs (expenses and health records).
+        """
+        self.flush()
+        with self.lock:
+            if os.path.exists(self.journal_file) and os.path.getsize(self.journal_file) > 0:
+                # Fold the journal in first: its compaction markers are digests
+                # of the snapshot bytes, which are about to change
+                self.sync_care_logs()
+                self.save_care_logs(self.load_care_logs())
+            paths = self.data_files()
+            if codec == 'jsonl':
+                paths = [path for path in paths if path in (self.health_file, self.expense_file)]
+            return {path: convert_file(path, codec) for path in paths}
+
+    def appends_lines(self, path):
+        """Whether new records can be appended to path instead of saving the whole file"""
+        return not self.write_behind and os.path.exists(path) and save_codec(path) == 'jsonl'
+
+    def recent_records(self, dataset, path, count, group=None):
+        """Newest records from memory if the dataset is loaded and current,
+        else from the end of a jsonl file, else None"""
+        cache = self.dataset(dataset)
+        if cache.value is not None and cache.stamp == self.current_stamp(dataset):
+            return None
+        if file_codec(path) != 'jsonl':
+            return None
+        return read_tail_records(path, count, group)
+
+    # Health records
+
+    def load_health_records(self):
+        return self.refreshed('health_records', self.read_health_records)
+
+    def read_health_records(self):
+        return self.read_json(self.health_file, empty_health_records())
+
+    def sync_health_records(self, records_by_kind):
+        """With the lock held, fold in the health records other processes
+        added, ahead of writing ours (already in our copy)"""
+        def reread():
+            health_records = self.read_health_records()
+            for kind, records in records_by_kind.items():
+                health_records.setdefault(kind, []).extend(records)
+            return health_records
+        self.sync('health_records', reread)
+
+    def save_health_records(self, health_records):
+        self.remember('health_records', health_records)
+        self.write_json(self.health_file, health_records, 'health_records')
+
+    def add_health_record(self, kind, record):
+        self.add_health_records({kind: [record]})
+
+    def add_health_records(self, records_by_kind):
+        with self.lock:
+            self.sync_health_records(records_by_kind)
+            if self.appends_lines(self.health_file):
+                append_lines(self.health_file, [[kind, record] for kind, records in records_by_kind.items()
+                                                for record in records])
+                self.mark_written('health_records')
+            else:
+                self.save_health_records(self.load_health_records())
+
+    def recent_health_records(self, kind, count):
+        recent = self.recent_records('health_records', self.health_file, count, kind)
+        return recent if recent is not None else super().recent_health_records(kind, count)
+
+    # Expenses
+
+    def load_expenses(self):
+        return self.refreshed('expenses', self.read_expenses)
+
+    def read_expenses(self):
+        return self.read_json(self.expense_file, [])
+
+    def sync_expenses(self, expenses):
+        """As sync_health_records, for expenses"""
+        self.sync('expenses', lambda: self.read_expenses() + list(expenses))
+
+    def save_expenses(self, expenses):
+        self.remember('expenses', expenses)
+        self.write_json(self.expense_file, expenses, 'expenses')
+
+    def add_expense(self, expense):
+        self.add_expenses([expense])
+
+    def add_expenses(self, expenses):
+        with self.lock:
+            self.sync_expenses(expenses)
+            if self.appends_lines(self.expense_file):
+                append_lines(self.expense_file, expenses)
+                self.mark_written('expenses')
+            else:
+                self.save_expenses(self.load_expenses())
+
+    def recent_expenses(self, count):
+        recent = self.recent_records('expenses', self.expense_file, count)
+        return recent if recent is not None else super().recent_expenses(count)
+
+    # Report queries
+
+    def care_days_since(self, day):
+        care_logs = self.load_care_logs()
+        if isinstance(care_logs, ShardedCareLogs):
+            days = care_logs.days_from(day or '')
+        else:
+            days = sorted(d for d in care_logs if day is None or d >= day)
+        for d in days:
+            yield d, care_logs[d]
+
+    def expenses_since(self, position):
+        expenses = self.load_expenses()
+        position = position or 0
+        return expenses[position:], len(expenses)
+
+    def health_records_since(self, kind, position):
+        records = self.load_health_records().get(kind, [])
+        position = position or 0
+        return records[position:], len(records)
+
+    def activity_counts_by_day(self, days):
+        care_logs = self.load_care_logs()
+        return {day: sum(len(activities) for activities in care_logs[day].values())
+                for day in days if day in care_logs}
+
+    def activity_counts_by_pet(self):
+        counts = {}
+        for date_data in self.load_care_logs().values():
+            for pet, activities in date_data.items():
+                counts[pet] = counts.get(pet, 0) + len(activities)
+        return counts
+
+    def care_totals(self):
+        care_logs = self.load_care_logs()
+        total_activities = sum(sum(len(activities) for activities in day_data.values()) for day_data in care_logs.values())
+        return len(care_logs), total_activities
+
+    def care_months(self):
+        care_logs = self.load_care_logs()
+        if isinstance(care_logs, ShardedCareLogs):
+            return care_logs.months()
+        return sorted({month_of(day) for day in care_logs})
+
+    def care_month_stamps(self):
+        care_logs = self.load_care_logs()
+        if not isinstance(care_logs, ShardedCareLogs):
+            return None
+        # Journaled activities only reach their shard's stamp when compacted
+        return {month: file_stamp(care_logs.shard_file(month)) for month in care_logs.months()}
+
+    def care_month_counts(self, month, from_disk=False):
+        if from_disk:
+            days = self.read_json(os.path.join(self.shard_dir, f"{month}.json"), {})
+        else:
+            care_logs = self.load_care_logs()
+            if isinstance(care_logs, ShardedCareLogs):
+                days = care_logs.load_shard(month)
+            else:
+                days = {day: day_logs for day, day_logs in care_logs.items() if month_of(day) == month}
+        return {day: activity_counts(day_logs) for day, day_logs in days.items()}
+
+    def worker_spec(self):
+        return type(self), (self.data_dir,)
+
+    def worker_months(self):
+        care_logs = self.load_care_logs()
+        if not isinstance(care_logs, ShardedCareLogs):
+            return []
+        # Shards with journaled or unsaved activities only exist in memory
+        self.flush()
+        return [month for month in care_logs.months() if month not in care_logs.dirty]
+
+    def health_record_count(self):
+        return sum(len(records) for records in self.load_health_records().values() if isinstance(records, list))
+
+    def expense_totals(self):
+        expenses = self.load_expenses()
+        return len(expenses), sum(e.get('amount', 0) for e in expenses)
+
+    def expenses_for_month(self, month):
+        return [e for e in self.load_expenses() if e['date'].startswith(month)]
+
+    def close(self):
+        # The journal is left for the next compact_every-th write to fold in,
+        # so a one-shot `log` stays a single append
+        for writer in self.writers.values():
+            writer.close()
+
+shared_backends = {}
+
+def shared_backend(name='json', data_dir='data', write_behind=False):
+    """The backend everyone in this process uses for data_dir.
+
+    Trackers and reports that share it share one parsed copy of each
+    dataset instead of each reading the files themselves.
+    """
+    key = (name, os.path.abspath(data_dir))
+    if key not in shared_backends:
+        shared_backends[key] = open_backend(name, data_dir, write_behind)
+    return shared_backends[key]
+
+def backend_from_env(household_id=None):
+    """The shared backend picked by PETCARE_BACKEND (json or sqlite) and PETCARE_WRITE_BEHIND=1,
+    for household_id or PETCARE_HOUSEHOLD (see households.py), or data/ without one"""
+    return shared_backend(os.environ.get('PETCARE_BACKEND', 'json'), household_data_dir(household_id),
+                          write_behind=os.environ.get('PETCARE_WRITE_BEHIND') == '1')
+
+def open_backend(name='json', data_dir='data', write_behind=False):
+    """Build a storage backend by name ('json' or 'sqlite')"""
+    if name == 'json':
+        return JSONBackend(data_dir, journal=True, sharded=True, write_behind=write_behind)
+    if name == 'sqlite':
+        from sqlite_backend import SQLiteBackend
+        return SQLiteBackend(os.path.join(data_dir, 'petcare.db'))
+    raise ValueError(f"Unknown storage backend: {name}")
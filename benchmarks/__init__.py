@@ -0,0 +1 @@
+"""Performance measurements for PetCare Pro, run as python3 -m benchmarks.<name>"""
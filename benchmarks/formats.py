@@ -0,0 +1,103 @@
+"""Size and load/save time of the data files under each codec.
+
+    python3 -m benchmarks.formats [--pets 8] [--years 10] [--repeats 5] [--output codecs.json]
+
+Generates a synthetic history (see synthetic.py), converts it to each
+codec in turn and times decoding and encoding every file of each dataset
+(care logs are all the monthly shards together). Saves include the fsync
+and rename, like the trackers' saves. jsonl only covers the record logs
+(health records and expenses); for it the last 10 expenses are also read
+from the end of the file, as the recent expenses view does.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.run import summarize
+from benchmarks.synthetic import generate
+from backends import JSONBackend
+from serialization import CODECS, decode, encode
+from storage import atomic_write, read_tail_records
+
+def dataset_files(backend):
+    """{dataset: [paths]} for a JSON data directory"""
+    shards = [os.path.join(backend.shard_dir, name) for name in sorted(os.listdir(backend.shard_dir))]
+    return {'pets': [backend.pets_file], 'care_logs': shards,
+            'health_records': [backend.health_file], 'expenses': [backend.expense_file]}
+
+def bench_codec(files, codec, repeats):
+    results = {}
+    for dataset, paths in files.items():
+        contents = {}
+        for path in paths:
+            with open(path, 'rb') as f:
+                contents[path] = f.read()
+        values = {path: decode(data) for path, data in contents.items()}
+
+        loads, saves = [], []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            for path in paths:
+                with open(path, 'rb') as f:
+                    decode(f.read())
+            loads.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            for path in paths:
+                atomic_write(path, encode(values[path], codec))
+            saves.append(time.perf_counter() - started)
+        results[dataset] = {'files': len(paths), 'bytes': sum(len(data) for data in contents.values()),
+                            'load': summarize(loads), 'save': summarize(saves)}
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the data file codecs")
+    parser.add_argument('--pets', type=int, default=8)
+    parser.add_argument('--years', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--codecs', nargs='+', choices=CODECS, default=list(CODECS))
+    parser.add_argument('--output', help="write the JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as root:
+        data_dir = os.path.join(root, 'data')
+        dataset = generate(data_dir, args.pets, args.years, args.seed)
+        backend = JSONBackend(data_dir)
+        files = dataset_files(backend)
+        results = {'dataset': dataset, 'codecs': {}}
+        for codec in args.codecs:
+            backend.convert(codec)
+            codec_files = files
+            if codec == 'jsonl':
+                codec_files = {name: files[name] for name in ('health_records', 'expenses')}
+            results['codecs'][codec] = bench_codec(codec_files, codec, args.repeats)
+            if codec == 'jsonl':
+                samples = []
+                for _ in range(args.repeats):
+                    started = time.perf_counter()
+                    read_tail_records(backend.expense_file, 10)
+                    samples.append(time.perf_counter() - started)
+                results['recent_expenses_tail'] = summarize(samples)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    print(f"\n{'codec':<10}{'KiB':>10}{'load ms':>10}{'save ms':>10}", file=sys.stderr)
+    for codec, datasets in results['codecs'].items():
+        size = sum(result['bytes'] for result in datasets.values()) / 1024
+        load = sum(result['load']['mean_ms'] for result in datasets.values())
+        save = sum(result['save']['mean_ms'] for result in datasets.values())
+        note = "  (health records and expenses only)" if codec == 'jsonl' else ""
+        print(f"{codec:<10}{size:>10,.0f}{load:>10.1f}{save:>10.1f}{note}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Requests/sec and latency of the HTTP API (server.py) under concurrent load.
+
+    python3 -m benchmarks.http_load [--connections 20] [--requests 5000] [--write-ratio 0.1]
+                                    [--backend json|sqlite] [--port PORT] [--output load.json]
+
+Without --port, generates a synthetic history (see synthetic.py), starts
+'main.py serve' on it in a subprocess and stops it afterwards; with
+--port, loads a server that's already running (its data gets the test
+writes). Each connection sends its share of the requests one after
+another over keep-alive: mostly GETs of the pets, today's care, recent
+expenses and the report summaries, and write_ratio of them care logs
+and expenses, which the server batches. The server's own /stats (how
+many batches the writes took) is included in the results.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.run import summarize
+from benchmarks.synthetic import generate
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+READS = ('/pets', '/pets/gus', '/care/today', '/expenses?limit=10', '/health/medications?limit=10',
+         '/reports/summary', '/reports/weekly', '/reports/pets')
+WRITES = (('/care', {'pet': 'Gus', 'activity': 'snackies', 'notes': 'load test'}),
+          ('/expenses', {'pet': 'Gus', 'amount': 1.25, 'category': 'Food/Treats', 'description': 'load test'}))
+
+async def request(reader, writer, method, path, body=None):
+    """Send one request on an open keep-alive connection, returns the status code"""
+    payload = json.dumps(body).encode() if body is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode().partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+async def connection(host, port, count, write_ratio, rng, samples):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(count):
+            if rng.random() < write_ratio:
+                method, (path, body) = 'POST', rng.choice(WRITES)
+            else:
+                method, path, body = 'GET', rng.choice(READS), None
+            started = time.perf_counter()
+            status = await request(reader, writer, method, path, body)
+            samples.append((method, status, time.perf_counter() - started))
+    finally:
+        writer.close()
+
+async def load(host, port, connections, requests, write_ratio, seed):
+    samples = []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        connection(host, port, requests // connections + (index < requests % connections),
+                   write_ratio, random.Random(seed + index), samples)
+        for index in range(connections)))
+    elapsed = time.perf_counter() - started
+
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b"GET /stats HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+    response = await reader.read()
+    writer.close()
+    server_stats = json.loads(response.split(b'\r\n\r\n', 1)[1])
+    return samples, elapsed, server_stats
+
+def results_for(samples, elapsed, server_stats, args):
+    def latency(method=None):
+        chosen = [seconds for sample_method, _, seconds in samples if method in (None, sample_method)]
+        return summarize(chosen) if chosen else None
+
+    errors = {}
+    for _, status, _ in samples:
+        if status >= 400:
+            errors[status] = errors.get(status, 0) + 1
+    return {
+        'connections': args.connections,
+        'requests': len(samples),
+        'write_ratio': args.write_ratio,
+        'seconds': round(elapsed, 3),
+        'requests_per_sec': round(len(samples) / elapsed),
+        'latency': latency(),
+        'get_latency': latency('GET'),
+        'post_latency': latency('POST'),
+        'errors': errors,
+        'server': server_stats,
+    }
+
+def start_server(data_root, backend_name):
+    """'main.py serve' on a free port in data_root/data, returns (process, port)"""
+    env = dict(os.environ, PETCARE_BACKEND=backend_name)
+    env.pop('PETCARE_HOUSEHOLD', None)
+    process = subprocess.Popen([sys.executable, os.path.join(REPO, 'main.py'), 'serve', '--port', '0'],
+                               cwd=data_root, env=env, stdout=subprocess.PIPE, text=True)
+    banner = process.stdout.readline()
+    if 'http://' not in banner:
+        process.kill()
+        raise RuntimeError(f"server didn't start: {banner!r}")
+    return process, int(banner.rsplit(':', 1)[1].split()[0])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the HTTP API")
+    parser.add_argument('--connections', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--write-ratio', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help="load a running server instead of starting one")
+    parser.add_argument('--backend', choices=('json', 'sqlite'), default='json')
+    parser.add_argument('--pets', type=int, default=8)
+    parser.add_argument('--years', type=float, default=3)
+    parser.add_argument('--output', help="write the JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    if args.port:
+        run = load(args.host, args.port, args.connections, args.requests, args.write_ratio, args.seed)
+        results = results_for(*asyncio.run(run), args)
+    else:
+        with tempfile.TemporaryDirectory() as root:
+            dataset = generate(os.path.join(root, 'data'), args.pets, args.years, args.seed)
+            if args.backend == 'sqlite':
+                from sqlite_backend import migrate_json_to_sqlite
+                migrate_json_to_sqlite(os.path.join(root, 'data'))
+            process, port = start_server(root, args.backend)
+            try:
+                run = load(args.host, port, args.connections, args.requests, args.write_ratio, args.seed)
+                results = results_for(*asyncio.run(run), args)
+            finally:
+                process.send_signal(signal.SIGTERM)
+                process.communicate(timeout=30)
+            results['backend'] = args.backend
+            results['dataset'] = dataset
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    latency = results['latency']
+    print(f"\n{results['requests']} requests on {args.connections} connections: "
+          f"{results['requests_per_sec']:,} req/s, p50 {latency['p50_ms']:.1f}ms, p99 {latency['p99_ms']:.1f}ms, "
+          f"{results['server']['writes']} writes in {results['server']['batches']} batches", file=sys.stderr)
+    return 1 if results['errors'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
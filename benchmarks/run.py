@@ -0,0 +1,286 @@
+"""Benchmarks for the hot paths, reported as JSON.
+
+    python3 -m benchmarks.run [--pets 8] [--years 3] [--backend json|sqlite]
+                              [--output results.json] [--baseline old.json]
+
+Generates a synthetic history (see synthetic.py) in a temporary data
+directory and times loading each dataset, logging care, adding expenses
+and medications, every report and the monthly expense summary, then
+measures peak memory for a full load. Rollup rebuilds are timed with one
+worker and with a process pool. Exports of the whole history are timed
+for CSV and JSONL, with the memory they allocate compared against a
+one-month export. With --baseline, timings more than
+--tolerance slower than a previous run's are listed and the exit status
+is 1, so it can guard against regressions.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from unittest import mock
+
+from benchmarks.synthetic import generate
+from backends import open_backend
+from care_logger import CareLogger
+from care_records import compact_care_logs
+from care_shards import shard_dir_for
+from export import export
+from expense_columns import np
+from expense_tracker import ExpenseTracker
+from health_tracker import HealthTracker
+from pet_manager import PetManager
+from reminder_system import ReminderScheduler
+from reports import ReportGenerator
+from rollups import RollupCache
+from storage import read_data_file
+
+REPORTS = ('weekly_care_summary', 'pet_activity_overview', 'full_dashboard')
+
+def summarize(samples):
+    """Timing samples in seconds -> summary in milliseconds"""
+    ordered = sorted(samples)
+    return {
+        'runs': len(ordered),
+        'mean_ms': round(1000 * sum(ordered) / len(ordered), 3),
+        'p50_ms': round(1000 * ordered[len(ordered) // 2], 3),
+        'p95_ms': round(1000 * ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'p99_ms': round(1000 * ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 3),
+        'max_ms': round(1000 * ordered[-1], 3),
+    }
+
+def timed(action, repeats):
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeats):
+            started = time.perf_counter()
+            action()
+            samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+def scripted(answers):
+    """Feed answers to input() in order, for the interactive tracker methods"""
+    answers = iter(answers)
+    return mock.patch('builtins.input', lambda prompt='': next(answers))
+
+def path_size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(folder, name)) for folder, _, names in os.walk(path) for name in names)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+def bench_loads(backend_name, data_dir, repeats):
+    def load_care_logs(backend):
+        care_logs = backend.load_care_logs()
+        # Shards load lazily, so touch every day to parse all of them
+        return sum(len(day_logs) for day_logs in care_logs.values())
+
+    loaders = {
+        'pets': lambda backend: backend.load_pets(),
+        'care_logs': load_care_logs,
+        'health_records': lambda backend: backend.load_health_records(),
+        'expenses': lambda backend: backend.load_expenses(),
+    }
+    results = {}
+    for name, load in loaders.items():
+        samples = []
+        for _ in range(repeats):
+            backend = open_backend(backend_name, data_dir)
+            started = time.perf_counter()
+            load(backend)
+            samples.append(time.perf_counter() - started)
+            backend.close()
+        results[name] = summarize(samples)
+    if backend_name == 'json':
+        backend = open_backend(backend_name, data_dir)
+        files = {'pets': backend.pets_file, 'care_logs': backend.shard_dir,
+                 'health_records': backend.health_file, 'expenses': backend.expense_file}
+        for name, path in files.items():
+            results[name]['bytes'] = path_size(path)
+        backend.close()
+    return results
+
+def bench_writes(backend_name, data_dir, ops):
+    backend = open_backend(backend_name, data_dir)
+    care = CareLogger(backend)
+    expenses = ExpenseTracker(backend)
+    health = HealthTracker(backend)
+    # Load everything first so only the write path is timed
+    care.care_logs, expenses.columns, health.indexes
+
+    results = {'log_care_activity': timed(lambda: care.log_care_activity('Gus', 'snackies', 'benchmark'), ops)}
+    with scripted(['1', 'Gus', '12.50', 'benchmark'] * ops):
+        results['add_expense'] = timed(expenses.add_expense, ops)
+    with scripted(['Gus', 'meloxicam', 'benchmark'] * ops):
+        results['record_medication'] = timed(health.record_medication, ops)
+    with contextlib.redirect_stdout(io.StringIO()):
+        backend.close()
+    return results
+
+def bench_reports(backend_name, data_dir, repeats):
+    backend = open_backend(backend_name, data_dir)
+    rollup_file = os.path.join(backend.data_dir, 'rollups.json')
+    reminders = ReminderScheduler(PetManager(backend), CareLogger(backend), HealthTracker(backend))
+    results = {}
+    for report in REPORTS:
+        # Cold: no rollups yet, so the first refresh walks the whole history
+        cold = []
+        for _ in range(repeats):
+            if os.path.exists(rollup_file):
+                os.remove(rollup_file)
+            reports = ReportGenerator(backend, rollups=RollupCache(backend), reminders=reminders)
+            cold.append(timed(getattr(reports, report), 1)['mean_ms'] / 1000)
+        results[report] = {'cold': summarize(cold), 'warm': timed(getattr(reports, report), repeats)}
+
+    expenses = ExpenseTracker(backend)
+    expenses.columns
+    results['monthly_summary'] = timed(expenses.monthly_summary, repeats)
+
+    # Counting the whole history in one process vs on a process pool
+    for workers in sorted({1, os.cpu_count() or 1, 4}):
+        rollups = RollupCache(backend, workers=workers)
+        results[f'rollup_rebuild_{workers}_workers'] = timed(rollups.rebuild, repeats)
+    backend.close()
+    return results
+
+def bench_exports(backend_name, data_dir, repeats):
+    """Whole-history exports: time, records/s and traced peak vs a one-month export"""
+    backend = open_backend(backend_name, data_dir)
+    # Load everything first so only the export is measured
+    CareLogger(backend).care_logs, backend.load_health_records(), backend.load_expenses()
+    last_month = max(backend.care_months())
+    results = {}
+    with tempfile.TemporaryDirectory() as out_dir:
+        for file_format in ('csv', 'jsonl'):
+            path = os.path.join(out_dir, f"statement.{file_format}")
+            written = {}
+            result = timed(lambda: written.update(export(path, backend=backend)), repeats)
+            result['records'] = written[path]
+            result['records_per_sec'] = round(written[path] / (result['mean_ms'] / 1000))
+
+            peaks = {}
+            for label, start in (('month', f"{last_month}-01"), ('all', None)):
+                tracemalloc.start()
+                export(path, start, backend=backend)
+                peaks[label] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            result['traced_peak_bytes_month'] = peaks['month']
+            result['traced_peak_bytes_all'] = peaks['all']
+            results[file_format] = result
+    backend.close()
+    return results
+
+def bench_memory(backend_name, data_dir):
+    """Peak memory for loading every dataset and building the trackers"""
+    tracemalloc.start()
+    backend = open_backend(backend_name, data_dir)
+    pets = PetManager(backend)
+    care = CareLogger(backend)
+    pets.pets
+    sum(len(day_logs) for day_logs in care.care_logs.values())
+    HealthTracker(backend).indexes
+    ExpenseTracker(backend).columns
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    backend.close()
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        max_rss //= 1024
+    return {'traced_peak_bytes': peak, 'traced_current_bytes': current, 'process_max_rss_kib': max_rss}
+
+def bench_care_log_memory(data_dir):
+    """Traced bytes for the whole care history held as plain dicts vs CareActivity records"""
+    shard_dir = shard_dir_for(os.path.join(data_dir, 'daily_care.json'))
+    shard_files = sorted(os.path.join(shard_dir, name) for name in os.listdir(shard_dir))
+
+    def held_bytes(load):
+        tracemalloc.start()
+        shards = [load(path) for path in shard_files]
+        held, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del shards
+        return held
+
+    plain = held_bytes(read_data_file)
+    compact = held_bytes(lambda path: compact_care_logs(read_data_file(path)))
+    return {'dict_bytes': plain, 'compact_bytes': compact,
+            'saved_percent': round(100 * (plain - compact) / plain, 1) if plain else 0.0}
+
+def compare(results, baseline, tolerance):
+    """Timings in results more than tolerance (0.25 = 25%) slower than baseline"""
+    regressions = []
+
+    def walk(new, old, path):
+        for key, value in new.items():
+            if key not in old:
+                continue
+            if isinstance(value, dict):
+                walk(value, old[key], path + [key])
+            elif key.endswith('_ms') and key != 'max_ms' and old[key] and value > old[key] * (1 + tolerance):
+                regressions.append(f"{'.'.join(path + [key])}: {old[key]:.3f}ms -> {value:.3f}ms")
+
+    for section in ('load', 'writes', 'reports', 'exports'):
+        walk(results.get(section, {}), baseline.get(section, {}), [section])
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PetCare Pro's hot paths")
+    parser.add_argument('--pets', type=int, default=8)
+    parser.add_argument('--years', type=float, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--backend', choices=('json', 'sqlite'), default='json')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--ops', type=int, default=50, help="calls timed for each write path")
+    parser.add_argument('--output', help="write the JSON results here instead of stdout")
+    parser.add_argument('--baseline', help="earlier results to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as root:
+        data_dir = os.path.join(root, 'data')
+        dataset = generate(data_dir, args.pets, args.years, args.seed)
+        if args.backend == 'sqlite':
+            from sqlite_backend import migrate_json_to_sqlite
+            migrate_json_to_sqlite(data_dir)
+
+        results = {
+            'meta': {
+                'run_at': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'numpy': np.__version__ if np is not None else None,
+                'backend': args.backend,
+                'seed': args.seed,
+                'dataset': dataset,
+            },
+            'load': bench_loads(args.backend, data_dir, args.repeats),
+            'reports': bench_reports(args.backend, data_dir, args.repeats),
+            'exports': bench_exports(args.backend, data_dir, args.repeats),
+            'writes': bench_writes(args.backend, data_dir, args.ops),
+            'peak_memory': bench_memory(args.backend, data_dir),
+            'care_log_memory': bench_care_log_memory(data_dir),
+        }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"❌ {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
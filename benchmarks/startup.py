@@ -0,0 +1,49 @@
+"""Time from launching main.py to the first menu, for growing histories.
+
+    python3 -m benchmarks.startup [days ...]
+
+Each run gets a fresh data directory with the given number of days of
+synthetic history for the four usual pets, then main.py is started in it and
+timed until it asks for a menu choice. The times should stay flat as
+the history grows, since nothing is loaded before an option is picked.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import REPO_DIR, generate
+
+def time_to_first_menu(data_dir):
+    """Seconds until main.py prompts for a menu choice"""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(REPO_DIR, 'main.py')], cwd=os.path.dirname(data_dir),
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    seen = b''
+    while b'Choose an option' not in seen:
+        chunk = process.stdout.read1(4096)
+        if not chunk:
+            raise RuntimeError("main.py exited before showing the menu")
+        seen += chunk
+    elapsed = time.perf_counter() - started
+    process.communicate(b'9\n')
+    return elapsed
+
+def main(day_counts, repeats=3):
+    results = []
+    for days in day_counts:
+        with tempfile.TemporaryDirectory() as root:
+            data_dir = os.path.join(root, 'data')
+            generate(data_dir, pets=4, years=days / 365)
+            data_bytes = sum(os.path.getsize(os.path.join(folder, name))
+                             for folder, _, names in os.walk(data_dir) for name in names)
+            time_to_first_menu(data_dir)  # warm the OS file cache
+            best = min(time_to_first_menu(data_dir) for _ in range(repeats))
+        results.append({'days': days, 'data_bytes': data_bytes, 'time_to_menu_ms': round(best * 1000, 1)})
+    print(json.dumps(results, indent=2))
+    return results
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [0, 365, 3650])
@@ -0,0 +1,126 @@
+"""Deterministic synthetic pet histories for the benchmarks.
+
+    python3 -m benchmarks.synthetic DATA_DIR [pets] [years]
+
+The same seed, size and end date always produce the same files, so two
+benchmark runs measure the same work.
+"""
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from backends import JSONBackend
+from care_shards import split_into_shards
+from reminder_system import DEFAULT_ROUTINE_TIME, MEDICATION_TIMES, ROUTINE_TIMES
+
+# Profiles shaped like the ones PetManager.create_initial_pets makes
+TEMPLATES = [
+    {"name": "Bailey", "species": "Caique", "type": "bird",
+     "health_notes": "Has arthritis but not currently bothering him",
+     "daily_routine": ["morning_wakeup", "snackies", "dinner", "playtime", "bedtime"],
+     "special_needs": ["monitor_arthritis"]},
+    {"name": "Munchkin", "species": "Hahn's Macaw", "type": "bird",
+     "health_notes": "Monitor feather condition. Had allergies in past but good this year",
+     "daily_routine": ["morning_wakeup", "snackies", "dinner", "playtime", "bedtime"],
+     "special_needs": ["feather_check", "allergy_watch"]},
+    {"name": "Gus", "species": "Amazon Parrot", "type": "bird",
+     "health_notes": "Daily afternoon medication required",
+     "daily_routine": ["snackies", "poo_patrol", "food_topup", "afternoon_medication"],
+     "special_needs": ["daily_medication"], "medication_time": "afternoon"},
+    {"name": "Bunion", "species": "European Rabbit", "type": "rabbit",
+     "health_notes": "Regular grooming every 3 months",
+     "daily_routine": ["hay_check", "pellet_check", "treats", "playtime"],
+     "weekly_routine": ["water_fountain_maintenance", "litter_box_cleaning"],
+     "special_needs": ["grooming_every_3_months"]},
+]
+
+OBSERVATIONS = ["Feathers look good", "Ate well", "A bit quiet today", "Sneezing", "Bright and active"]
+EXPENSES = [("Food/Treats", 5, 40), ("Vet Visit", 60, 300), ("Grooming", 30, 80),
+            ("Toys", 5, 35), ("Supplies", 10, 60)]
+
+def make_pets(count):
+    """{pet_id: profile} cycling through TEMPLATES, numbering repeats"""
+    pets = {}
+    for i in range(count):
+        template = TEMPLATES[i % len(TEMPLATES)]
+        round_number = i // len(TEMPLATES)
+        pet = dict(template, created_date='2020-01-01')
+        if round_number:
+            pet['name'] = f"{template['name']} {round_number + 1}"
+        pets[pet['name'].casefold().replace(' ', '_')] = pet
+    return pets
+
+def generate_history(pets, days, end, seed):
+    """(care_logs, health_records, expenses) for the days up to and including end"""
+    rng = random.Random(seed)
+    care_logs = {}
+    health_records = {'medications': [], 'health_observations': [], 'grooming_appointments': []}
+    expenses = []
+
+    for offset in range(days - 1, -1, -1):
+        day = end - timedelta(days=offset)
+        day_str = day.strftime('%Y-%m-%d')
+        day_logs = {}
+        for pet in pets.values():
+            items = [item for item in pet['daily_routine'] if rng.random() < 0.9]
+            if day.weekday() == 5:
+                items += pet.get('weekly_routine', [])
+            activities = [{'activity': item, 'time': ROUTINE_TIMES.get(item, DEFAULT_ROUTINE_TIME),
+                           'notes': '', 'time_spent': None} for item in items]
+            if activities:
+                day_logs[pet['name']] = activities
+
+            if pet.get('medication_time') and rng.random() < 0.95:
+                health_records['medications'].append({
+                    'date': day_str, 'time': MEDICATION_TIMES[pet['medication_time']],
+                    'pet_name': pet['name'], 'medication': 'meloxicam', 'notes': ''})
+            if rng.random() < 0.05:
+                health_records['health_observations'].append({
+                    'date': day_str, 'pet_name': pet['name'],
+                    'observation': rng.choice(OBSERVATIONS), 'notes': ''})
+            if rng.random() < 0.08:
+                category, low, high = rng.choice(EXPENSES)
+                expenses.append({'date': day_str, 'category': category, 'pet': pet['name'],
+                                 'amount': round(rng.uniform(low, high), 2),
+                                 'description': f"{category.lower()} for {pet['name']}"})
+        if day_logs:
+            care_logs[day_str] = day_logs
+    return care_logs, health_records, expenses
+
+def generate(data_dir, pets=8, years=3, seed=1, end=None):
+    """Write a synthetic history to data_dir in the layout main.py uses.
+
+    Returns the record counts.
+    """
+    end = end or date.today()
+    profiles = make_pets(pets)
+    care_logs, health_records, expenses = generate_history(profiles, int(years * 365), end, seed)
+
+    backend = JSONBackend(data_dir)
+    backend.save_pets(profiles)
+    split_into_shards(care_logs, backend.shard_dir)
+    backend.save_health_records(health_records)
+    backend.save_expenses(expenses)
+    return {
+        'pets': len(profiles),
+        'care_days': len(care_logs),
+        'care_activities': sum(len(a) for day_logs in care_logs.values() for a in day_logs.values()),
+        'medications': len(health_records['medications']),
+        'health_observations': len(health_records['health_observations']),
+        'expenses': len(expenses),
+        'end': end.strftime('%Y-%m-%d'),
+    }
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python3 -m benchmarks.synthetic DATA_DIR [pets] [years]")
+        sys.exit(1)
+    counts = generate(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+                      float(sys.argv[3]) if len(sys.argv) > 3 else 3)
+    for name, count in counts.items():
+        print(f"{name}: {count}")
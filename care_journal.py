@@ -0,0 +1,108 @@
+import json
+import os
+import sys
+
+from care_records import CareActivity, compact_care_logs, json_default
+from care_shards import ShardedCareLogs, shard_dir_for
+from instrumentation import file_label, timer
+from storage import file_digest, read_data_file
+
+def journal_path(data_file):
+    """Journal file that sits next to a care log snapshot"""
+    return os.path.splitext(data_file)[0] + '.journal'
+
+def append_journal_record(journal_file, record):
+    """Append one JSON line to a journal and fsync it"""
+    append_journal_records(journal_file, [record])
+
+def append_journal_records(journal_file, records):
+    """Append JSON lines to a journal with a single write and fsync"""
+    lines = ''.join(json.dumps(record, default=json_default) + '\n' for record in records)
+    with timer('append', file_label(journal_file)) as t:
+        t.bytes = len(lines)
+        with open(journal_file, 'a') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+def repair_journal(journal_file):
+    """Drop a half-written last line so new appends start on a clean line.
+    Only safe while nobody else can be appending (with the backend's lock held)."""
+    if not os.path.exists(journal_file):
+        return
+    with open(journal_file, 'rb+') as f:
+        size = os.fstat(f.fileno()).st_size
+        f.seek(max(0, size - 1))
+        if size and f.read(1) != b'\n':
+            f.seek(0)
+            f.truncate(f.read().rfind(b'\n') + 1)
+
+def replay_journal(care_logs, journal_file, file_for_day):
+    """Apply journal records on top of a snapshot, returns the number applied.
+
+    file_for_day maps a date to the snapshot file that stores it, which is
+    what compaction markers are checked against.
+    """
+    if not os.path.exists(journal_file):
+        return 0
+
+    records = []
+    digests = {}
+    with timer('replay', file_label(journal_file)) as t, open(journal_file, 'r') as f:
+        t.bytes = os.fstat(f.fileno()).st_size
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn final line from a crash mid-append; everything before it is good
+                break
+            if 'compact' in record:
+                # Compaction got as far as writing this marker. Records whose snapshot
+                # file on disk matches the marker are already folded in.
+                still_pending = []
+                for pending in records:
+                    snapshot_file = file_for_day(pending['date'])
+                    if snapshot_file not in digests:
+                        digests[snapshot_file] = file_digest(snapshot_file)
+                    if record['compact'].get(os.path.basename(snapshot_file)) != digests[snapshot_file]:
+                        still_pending.append(pending)
+                records = still_pending
+                continue
+            records.append(record)
+
+    apply_journal_records(care_logs, records)
+    return len(records)
+
+def apply_journal_records(care_logs, records):
+    """Add the activities of {'date', 'pet', 'activity'} journal records to care logs"""
+    for record in records:
+        # Reassign the day so sharded storage knows the shard changed
+        day_logs = care_logs.get(record['date'], {})
+        day_logs.setdefault(sys.intern(record['pet']), []).append(CareActivity.from_dict(record['activity']))
+        care_logs[record['date']] = day_logs
+
+def read_snapshot(data_file):
+    """Read the single-file care log snapshot without the journal"""
+    if os.path.exists(data_file):
+        try:
+            return compact_care_logs(read_data_file(data_file))
+        except ValueError:
+            return {}
+    return {}
+
+def read_care_logs(data_file):
+    """Read the care logs plus any journaled activities.
+
+    Uses the monthly shard directory when there is one, otherwise the single
+    snapshot file. Returns the care logs and the number of journal records
+    replayed.
+    """
+    shard_dir = shard_dir_for(data_file)
+    if os.path.isdir(shard_dir):
+        care_logs = ShardedCareLogs(shard_dir)
+        file_for_day = care_logs.file_for_day
+    else:
+        care_logs = read_snapshot(data_file)
+        file_for_day = lambda day: data_file
+    applied = replay_journal(care_logs, journal_path(data_file), file_for_day)
+    return care_logs, applied
@@ -1,31 +1,25 @@
-import json
-import os
+import sys
 from datetime import datetime, date
 
+from backends import shared_backend
+from care_records import CareActivity
+
 class CareLogger:
-    def __init__(self, data_file='data/daily_care.json'):
-        self.data_file = data_file
-        self.ensure_data_directory()
-        self.care_logs = self.load_care_logs()
+    def __init__(self, backend=None):
+        self.backend = backend or shared_backend()
 
-    def ensure_data_directory(self):
-        """Create data directory if it doesn't exist"""
-        os.makedirs('data', exist_ok=True)
+    @property
+    def care_logs(self):
+        """The backend's care logs, reloaded if they changed on disk"""
+        return self.load_care_logs()
 
     def load_care_logs(self):
-        """Load care logs to JSON file"""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                return {}
-        return {}
+        """Load care logs from the storage backend"""
+        return self.backend.load_care_logs()
 
     def save_care_logs(self):
-        """Save care logs to JSON file"""
-        with open(self.data_file, 'w') as f:
-            json.dump(self.care_logs, f, indent=2)
+        """Save care logs through the storage backend"""
+        self.backend.save_care_logs(self.care_logs)
 
     def log_care_activity(self, pet_name, activity_type, notes="", time_spent=None):
         """Log a care activity for a pet"""
@@ -33,24 +27,28 @@ class CareLogger:
         current_time = datetime.now().strftime('%H:%m')
 
 
-        if today not in self.care_logs:
-            self.care_logs[today] = {}
-
-        if pet_name not in self.care_logs[today]:
-            self.care_logs[today][pet_name] = []
+        activity = CareActivity(activity_type, current_time, notes, time_spent)
 
-        activity = {
-            'activity': activity_type,
-            'time': current_time,
-            'notes': notes,
-            'time_spent': time_spent
-        }
-
-        self.care_logs[today][pet_name].append(activity)
-        self.save_care_logs()
+        # Reassign the day so sharded storage knows the shard changed
+        care_logs = self.care_logs
+        day_logs = care_logs.get(today, {})
+        day_logs.setdefault(sys.intern(pet_name), []).append(activity)
+        care_logs[today] = day_logs
+        with self.backend.saving('care_logs'):
+            self.backend.add_care_activity(today, pet_name, activity)
 
         print(f"✅ Logged {activity_type} for {pet_name} at {current_time}")
 
+    def add_activities(self, entries):
+        """Record many (date, pet_name, CareActivity) entries with one batched save"""
+        care_logs = self.care_logs
+        for day, pet_name, activity in entries:
+            day_logs = care_logs.get(day, {})
+            day_logs.setdefault(sys.intern(pet_name), []).append(activity)
+            care_logs[day] = day_logs
+        with self.backend.saving('care_logs'):
+            self.backend.add_care_activities(entries)
+
     def quick_log_menu(self):
         """Quick logging menu for common activities"""
         print("\n🦜 BIRD CARE:")
@@ -0,0 +1,88 @@
+import sys
+from collections.abc import Mapping
+
+ACTIVITY_FIELDS = ('activity', 'time', 'notes', 'time_spent')
+
+# 'HH:MM' -> minutes since midnight. Looking times up here is faster than
+# parsing them, and hands out one shared int object per minute (Python
+# only caches ints up to 256, so int(...) would allocate one per activity).
+MINUTE_OF = {f"{minute // 60:02d}:{minute % 60:02d}": minute for minute in range(24 * 60)}
+TIME_OF = list(MINUTE_OF)
+
+class CareActivity(Mapping):
+    """One logged care activity, stored compactly.
+
+    Reads like the {'activity', 'time', 'notes', 'time_spent'} dict the
+    care logs have always used (activity['time'], .get(), dict(activity),
+    == against a dict), but uses slots instead of a per-record dict, keeps
+    the time as minutes since midnight and interns the activity name so
+    every 'snackies' in the history is the same string.
+    """
+
+    __slots__ = ('activity', 'minute', 'notes', 'time_spent')
+
+    def __init__(self, activity, time=None, notes='', time_spent=None):
+        self.activity = sys.intern(activity)
+        # Anything that isn't HH:MM is kept as it was written
+        self.minute = MINUTE_OF.get(time, time) if isinstance(time, str) else time
+        self.notes = notes
+        self.time_spent = time_spent
+
+    @classmethod
+    def from_dict(cls, record):
+        if isinstance(record, cls):
+            return record
+        return cls(record['activity'], record.get('time'), record.get('notes', ''), record.get('time_spent'))
+
+    @property
+    def time(self):
+        if isinstance(self.minute, int):
+            return TIME_OF[self.minute]
+        return self.minute
+
+    def __getitem__(self, key):
+        if key == 'activity':
+            return self.activity
+        if key == 'time':
+            return self.time
+        if key == 'notes':
+            return self.notes
+        if key == 'time_spent':
+            return self.time_spent
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(ACTIVITY_FIELDS)
+
+    def __len__(self):
+        return len(ACTIVITY_FIELDS)
+
+    def as_dict(self):
+        return {'activity': self.activity, 'time': self.time, 'notes': self.notes, 'time_spent': self.time_spent}
+
+    def __repr__(self):
+        return f"CareActivity({self.as_dict()!r})"
+
+def compact_day_logs(day_logs):
+    """{pet: [activity dicts]} -> {pet: [CareActivity]} with interned pet names"""
+    return {sys.intern(pet): [CareActivity.from_dict(activity) for activity in activities]
+            for pet, activities in day_logs.items()}
+
+def compact_care_logs(care_logs):
+    """{date: {pet: [activity dicts]}} -> the same with CareActivity records"""
+    return {day: compact_day_logs(day_logs) for day, day_logs in care_logs.items()}
+
+def activity_counts(day_logs):
+    """{pet: [activities]} -> {pet: {activity_type: count}}; works on dicts and CareActivity"""
+    counts = {}
+    for pet, activities in day_logs.items():
+        pet_counts = counts.setdefault(pet, {})
+        for activity in activities:
+            pet_counts[activity['activity']] = pet_counts.get(activity['activity'], 0) + 1
+    return counts
+
+def json_default(obj):
+    """json.dumps(default=...) hook so CareActivity records serialize as plain dicts"""
+    if isinstance(obj, CareActivity):
+        return obj.as_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
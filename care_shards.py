@@ -0,0 +1,116 @@
+import os
+import shutil
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from care_records import compact_care_logs
+from storage import atomic_write, dump_data, read_data_file
+
+def shard_dir_for(data_file):
+    """Directory holding the monthly shards for a care log file"""
+    return os.path.splitext(data_file)[0]
+
+def month_of(day):
+    """'2024-05-17' -> '2024-05'"""
+    return day[:7]
+
+class ShardedCareLogs(MutableMapping):
+    """Care logs split into one JSON file per month, loaded on first access.
+
+    Behaves like the plain {date: {pet: [activities]}} dict so callers don't
+    need to know about the layout. Only the most recently used shards stay in
+    memory; shards with unsaved changes are never evicted.
+    """
+
+    def __init__(self, shard_dir, max_loaded=6):
+        self.shard_dir = shard_dir
+        self.max_loaded = max_loaded
+        self.shards = OrderedDict()
+        self.dirty = set()
+        os.makedirs(shard_dir, exist_ok=True)
+
+    def shard_file(self, month):
+        return os.path.join(self.shard_dir, f"{month}.json")
+
+    def file_for_day(self, day):
+        return self.shard_file(month_of(day))
+
+    def months(self):
+        """All months that have a shard on disk or in memory, oldest first"""
+        on_disk = {name[:-5] for name in os.listdir(self.shard_dir) if name.endswith('.json')}
+        return sorted(on_disk | set(self.shards))
+
+    def load_shard(self, month):
+        """Return a month's shard, loading it and evicting old ones as needed"""
+        if month in self.shards:
+            self.shards.move_to_end(month)
+            return self.shards[month]
+
+        shard = {}
+        shard_file = self.shard_file(month)
+        if os.path.exists(shard_file):
+            try:
+                shard = compact_care_logs(read_data_file(shard_file))
+            except ValueError:
+                print(f"Warning: Could not read care log shard {shard_file}.")
+        self.shards[month] = shard
+
+        for loaded in list(self.shards):
+            if len(self.shards) <= self.max_loaded:
+                break
+            if loaded not in self.dirty and loaded != month:
+                del self.shards[loaded]
+        return shard
+
+    def __getitem__(self, day):
+        return self.load_shard(month_of(day))[day]
+
+    def __setitem__(self, day, day_logs):
+        self.load_shard(month_of(day))[day] = day_logs
+        self.dirty.add(month_of(day))
+
+    def __delitem__(self, day):
+        del self.load_shard(month_of(day))[day]
+        self.dirty.add(month_of(day))
+
+    def __contains__(self, day):
+        return day in self.load_shard(month_of(day))
+
+    def __iter__(self):
+        for month in self.months():
+            yield from sorted(self.load_shard(month))
+
+    def days_from(self, day):
+        """Dates on or after day, oldest first, without loading older shards"""
+        for month in self.months():
+            if month >= month_of(day):
+                yield from sorted(d for d in self.load_shard(month) if d >= day)
+
+    def __len__(self):
+        return sum(len(self.load_shard(month)) for month in self.months())
+
+    def pending_writes(self):
+        """Serialized contents of every shard with unsaved changes"""
+        return {self.shard_file(month): dump_data(self.shards[month], self.shard_file(month))
+                for month in sorted(self.dirty)}
+
+    def mark_clean(self):
+        self.dirty.clear()
+
+def split_into_shards(care_logs, shard_dir, codec=None):
+    """Write a whole care log dict out as monthly shards.
+
+    The shards are built in a scratch directory and renamed into place so a
+    crash part way through never leaves a half-populated shard directory.
+    """
+    by_month = {}
+    for day, day_logs in care_logs.items():
+        by_month.setdefault(month_of(day), {})[day] = day_logs
+
+    build_dir = shard_dir + '.building'
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.makedirs(build_dir)
+    for month, shard in by_month.items():
+        shard_file = os.path.join(build_dir, f"{month}.json")
+        atomic_write(shard_file, dump_data(shard, shard_file, codec))
+    os.replace(build_dir, shard_dir)
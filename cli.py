@@ -0,0 +1,496 @@
+"""Non-interactive commands, used when main.py is given arguments.
+
+    python3 main.py log Gus snackies --notes "sunflower seeds"
+    python3 main.py expense add --pet Bunion --category Grooming --amount 45
+    python3 main.py med add Gus meloxicam --notes "with breakfast"
+    python3 main.py report dashboard
+    python3 main.py import kennel-sheet.csv more-records.jsonl
+    python3 main.py search feather plucking --pet Bailey
+    python3 main.py export statements/gus-2024-05.csv --pet Gus --from 2024-05-01 --to 2024-05-31
+    python3 main.py timeline Gus --from 2024-01-01 --kinds medication,observation
+    python3 main.py household add smiths "The Smiths"
+    python3 main.py --household smiths report dashboard
+    python3 main.py household report
+    python3 main.py serve --port 8080
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+from datetime import date, datetime
+
+from backends import backend_from_env
+from instrumentation import registry
+from query import KINDS as TIMELINE_KINDS
+from serialization import CODECS
+
+# Which column tells an imported row's kind apart, checked in this order
+KIND_FIELDS = (('expense', 'amount'), ('medication', 'medication'),
+               ('observation', 'observation'), ('care', 'activity'))
+
+def valid_date(value):
+    """'YYYY-MM-DD' or ValueError; also works as an argparse type"""
+    datetime.strptime(value, '%Y-%m-%d')
+    return value
+
+def valid_time(value):
+    """'HH:MM' or ValueError; also works as an argparse type"""
+    from care_records import MINUTE_OF
+    if value not in MINUTE_OF:
+        raise ValueError(f"'{value}' is not HH:MM")
+    return value
+
+def resolve_pet(pets, name, allow_all=False):
+    """The pet's name as stored in its profile, or ValueError if there's no such pet"""
+    if allow_all and name.strip().casefold() == 'all':
+        return 'All'
+    pet_id, pet = pets.get_pet_by_name(name.strip())
+    if pet is None:
+        raise ValueError(f"unknown pet '{name}'")
+    return pet['name']
+
+def now_time():
+    return datetime.now().strftime('%H:%M')
+
+# Single records
+
+def log_command(backend, args):
+    from care_logger import CareLogger
+    from pet_manager import PetManager
+    pet_name = resolve_pet(PetManager(backend), args.pet)
+    CareLogger(backend).log_care_activity(pet_name, args.activity, args.notes, args.time_spent)
+
+def expense_add_command(backend, args):
+    from expense_tracker import ExpenseTracker
+    from pet_manager import PetManager
+    expense = {
+        'date': args.date,
+        'category': args.category,
+        'pet': resolve_pet(PetManager(backend), args.pet, allow_all=True),
+        'amount': args.amount,
+        'description': args.description,
+    }
+    ExpenseTracker(backend).add_expenses([expense])
+    print(f"✅ Added ${args.amount:.2f} expense for {expense['pet']}")
+
+def med_add_command(backend, args):
+    from health_tracker import HealthTracker
+    from pet_manager import PetManager
+    record = {
+        'date': args.date,
+        'time': args.time or now_time(),
+        'pet_name': resolve_pet(PetManager(backend), args.pet),
+        'medication': args.medication,
+        'notes': args.notes,
+    }
+    HealthTracker(backend).add_record('medications', record)
+    print(f"✅ Recorded {args.medication} for {record['pet_name']}")
+
+def report_command(backend, args):
+    if args.report in ('weekly', 'pets', 'dashboard', 'compliance'):
+        from care_logger import CareLogger
+        from health_tracker import HealthTracker
+        from pet_manager import PetManager
+        from reminder_system import ReminderScheduler
+        from reports import ReportGenerator
+        from rollups import RollupCache
+        reminders = ReminderScheduler(PetManager(backend), CareLogger(backend), HealthTracker(backend))
+        reports = ReportGenerator(backend, rollups=RollupCache(backend, workers=args.workers), reminders=reminders)
+        if args.report == 'compliance':
+            reports.compliance_report(args.days)
+        else:
+            {'weekly': reports.weekly_care_summary, 'pets': reports.pet_activity_overview,
+             'dashboard': reports.full_dashboard}[args.report]()
+    elif args.report == 'today':
+        from care_logger import CareLogger
+        CareLogger(backend).view_today_summary()
+    elif args.report == 'health':
+        from health_tracker import HealthTracker
+        HealthTracker(backend).view_health_summary()
+    else:
+        from expense_tracker import ExpenseTracker
+        expenses = ExpenseTracker(backend)
+        {'monthly': expenses.monthly_summary, 'by-pet': expenses.expenses_by_pet,
+         'by-category': expenses.expenses_by_category}[args.report]()
+
+# Timeline
+
+def timeline_kinds(value):
+    """'care,expense' -> ('care', 'expense'); also works as an argparse type"""
+    kinds = tuple(kind.strip() for kind in value.split(',') if kind.strip())
+    if not kinds or any(kind not in TIMELINE_KINDS for kind in kinds):
+        raise argparse.ArgumentTypeError(f"choose from {', '.join(TIMELINE_KINDS)}")
+    return kinds
+
+def timeline_command(backend, args):
+    from pet_manager import PetManager
+    from query import format_entry, timeline, timeline_page
+    pet_name = resolve_pet(PetManager(backend), args.pet)
+    if args.all:
+        entries, has_more = timeline(pet_name, args.start, args.end, args.kinds, backend), False
+    else:
+        entries, has_more = timeline_page(pet_name, args.start, args.end, args.kinds,
+                                          args.page, args.per_page, backend)
+    shown = 0
+    for entry in entries:
+        print(format_entry(entry))
+        shown += 1
+    if not shown:
+        print(f"Nothing recorded for {pet_name} in that range.")
+    elif has_more:
+        print(f"... more on page {args.page + 1} (--page {args.page + 1}, or --all)")
+
+# Search
+
+def search_command(backend, args):
+    from pet_manager import PetManager
+    from search import SearchIndex, format_hit
+    pet_name = resolve_pet(PetManager(backend), args.pet) if args.pet else None
+    hits = SearchIndex(backend).search(' '.join(args.words), pet_name, args.start, args.end, args.limit)
+    for hit in hits:
+        print(format_hit(hit))
+    if not hits:
+        print("No matching notes, observations or descriptions.")
+
+# Export
+
+def export_command(backend, args):
+    from export import export
+    from pet_manager import PetManager
+    pet_name = resolve_pet(PetManager(backend), args.pet) if args.pet else None
+    started = time.perf_counter()
+    written = export(args.path, args.start, args.end, pet_name, args.kinds, args.format, backend)
+    elapsed = time.perf_counter() - started
+    records = written[args.path]
+    print(f"✅ Exported {records} records in {elapsed:.2f}s ({records / elapsed:,.0f} records/s):")
+    for path, rows in written.items():
+        print(f"   {path}: {rows} rows")
+
+# Bulk import
+
+def read_rows(path, file_format=None):
+    """Yield (line number, row) from a CSV file with a header row or a JSONL file.
+
+    CSV rows come back as dicts, JSONL rows as the raw line so a bad line
+    is reported like any other invalid record instead of stopping the import.
+    """
+    file_format = file_format or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='') as f:
+        if file_format == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    yield number, line
+
+def parse_record(row, pets, kind=None):
+    """Validate one imported row, returns (kind, record) or raises ValueError"""
+    from care_records import CareActivity
+
+    if isinstance(row, str):
+        row = json.loads(row)
+        if not isinstance(row, dict):
+            raise ValueError("expected a JSON object")
+
+    def field(name, required=True):
+        """A text field, stripped; None when it's empty and not required"""
+        value = row.get(name)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"{name} must be text, not {type(value).__name__}")
+        value = value.strip() if value else ''
+        if required and not value:
+            raise ValueError(f"missing {name}")
+        return value or None
+
+    def clock(name):
+        value = field(name, required=False)
+        if value is not None:
+            try:
+                valid_time(value)
+            except ValueError:
+                raise ValueError(f"{name} '{value}' is not HH:MM")
+        return value
+
+    def number(name, required=True):
+        """A finite number, given as one or as text"""
+        value = row.get(name)
+        value = value.strip() if isinstance(value, str) else value
+        if value in (None, ''):
+            if required:
+                raise ValueError(f"missing {name}")
+            return None
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError(f"{name} '{value}' is not a number")
+        try:
+            result = float(value)
+        except ValueError:
+            raise ValueError(f"{name} '{value}' is not a number")
+        if not math.isfinite(result):
+            raise ValueError(f"{name} '{value}' is not a finite number")
+        return result
+
+    if kind is None:
+        kind = next((k for k, name in KIND_FIELDS if row.get(name) not in (None, '')), None)
+        if kind is None:
+            raise ValueError("can't tell if this is care, expense, medication or observation")
+    day = valid_date(field('date'))
+    pet = field('pet', required=False) or field('pet_name', required=False)
+    if pet is None:
+        raise ValueError("missing pet")
+
+    if kind == 'care':
+        # Free text ('20 min') or minutes as a number
+        time_spent = row.get('time_spent')
+        if isinstance(time_spent, str):
+            time_spent = field('time_spent', False)
+        elif time_spent is not None:
+            number('time_spent')
+        activity = CareActivity(field('activity'), clock('time'), field('notes', False) or '', time_spent)
+        return kind, (day, resolve_pet(pets, pet), activity)
+    if kind == 'expense':
+        return kind, {'date': day, 'category': field('category', False) or 'Other',
+                      'pet': resolve_pet(pets, pet, allow_all=True), 'amount': number('amount'),
+                      'description': field('description', False) or ''}
+    if kind == 'medication':
+        return kind, {'date': day, 'time': clock('time'), 'pet_name': resolve_pet(pets, pet),
+                      'medication': field('medication'), 'notes': field('notes', False) or ''}
+    return kind, {'date': day, 'pet_name': resolve_pet(pets, pet),
+                  'observation': field('observation'), 'notes': field('notes', False) or ''}
+
+def import_command(backend, args):
+    from care_logger import CareLogger
+    from expense_tracker import ExpenseTracker
+    from health_tracker import HealthTracker
+    from pet_manager import PetManager
+    from rollups import RollupCache
+    from search import SearchIndex
+
+    started = time.perf_counter()
+    pets = PetManager(backend)
+    batches = {'care': [], 'expense': [], 'medication': [], 'observation': []}
+    errors = []
+    for path in args.files:
+        for number, row in read_rows(path, args.format):
+            try:
+                kind, record = parse_record(row, pets, args.kind)
+            except ValueError as error:
+                errors.append(f"{path}:{number}: {error}")
+                continue
+            batches[kind].append(record)
+
+    if errors:
+        print(f"❌ {len(errors)} invalid records:")
+        for error in errors[:20]:
+            print(f"   {error}")
+        if len(errors) > 20:
+            print(f"   ... and {len(errors) - 20} more")
+        if not args.skip_invalid:
+            print("Nothing was imported (use --skip-invalid to import the valid records)")
+            return 1
+
+    # One batched write per data file
+    parsed = time.perf_counter()
+    if batches['care']:
+        CareLogger(backend).add_activities(batches['care'])
+    if batches['medication'] or batches['observation']:
+        HealthTracker(backend).add_records({'medications': batches['medication'],
+                                            'health_observations': batches['observation']})
+    if batches['expense']:
+        ExpenseTracker(backend).add_expenses(batches['expense'])
+    finished = time.perf_counter()
+
+    if batches['care']:
+        # Back-dated activities land behind the report cache's and the search
+        # index's high-water marks, where catching up never looks
+        earliest = min(day for day, _, _ in batches['care'])
+        rollups = RollupCache(backend)
+        high_water = rollups.rollups['care_high_water']
+        if high_water and earliest < high_water:
+            rollups.rebuild()
+            print("🔄 Rebuilt the report cache for back-dated care records")
+        index = SearchIndex(backend)
+        high_water = index.index['care_high_water']
+        if high_water and earliest < high_water:
+            index.rebuild()
+            print("🔄 Rebuilt the search index for back-dated care records")
+
+    total = sum(len(batch) for batch in batches.values())
+    elapsed = finished - started
+    print(f"✅ Imported {total} records: {len(batches['care'])} care, {len(batches['medication'])} medication, "
+          f"{len(batches['observation'])} observation, {len(batches['expense'])} expense")
+    print(f"   {elapsed:.2f}s total ({total / elapsed:,.0f} records/sec), "
+          f"{parsed - started:.2f}s reading and validating, {finished - parsed:.2f}s writing")
+    return 0
+
+# Codecs
+
+def convert_command(backend, args):
+    from backends import JSONBackend
+    if not isinstance(backend, JSONBackend):
+        raise ValueError("convert rewrites the JSON backend's files; this household uses SQLite")
+    started = time.perf_counter()
+    results = backend.convert(args.codec)
+    before = sum(old_size for _, old_size, _ in results.values())
+    after = sum(new_size for _, _, new_size in results.values())
+    changed = sum(1 for old_codec, _, _ in results.values() if old_codec != args.codec)
+    print(f"✅ Converted {changed} of {len(results)} data files to {args.codec} "
+          f"in {time.perf_counter() - started:.2f}s")
+    if before:
+        print(f"   {before / 1024:,.0f} KiB -> {after / 1024:,.0f} KiB ({100 * after / before:.0f}%)")
+
+# HTTP API
+
+def serve_command(backend, args):
+    from server import serve
+    serve(lambda: backend_from_env(args.household), args.host, args.port)
+
+# Households
+
+def household_add_command(backend, args):
+    from households import HouseholdRegistry
+    household = HouseholdRegistry().add(args.id, args.name, args.data_dir)
+    print(f"✅ Added household {args.id} ({household['name']}) in {household['data_dir']}")
+
+def household_list_command(backend, args):
+    from households import HouseholdRegistry
+    registry = HouseholdRegistry()
+    if not registry.households:
+        print("No households registered yet.")
+    for household_id in registry.ids():
+        household = registry.households[household_id]
+        print(f"{household_id}: {household['name']} ({household['data_dir']})")
+
+def household_remove_command(backend, args):
+    from households import HouseholdRegistry
+    HouseholdRegistry().remove(args.id)
+    print(f"✅ Removed household {args.id} (its data directory was kept)")
+
+def household_report_command(backend, args):
+    from households import all_households_report
+    all_households_report(backend_name=os.environ.get('PETCARE_BACKEND', 'json'), workers=args.workers)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='main.py', description="PetCare Pro. Run without arguments for the menu.")
+    parser.add_argument('--household', help="household id to work on (default: PETCARE_HOUSEHOLD, else data/)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    log = commands.add_parser('log', help="log a care activity for today")
+    log.add_argument('pet')
+    log.add_argument('activity', help="e.g. snackies, hay_check, afternoon_medication")
+    log.add_argument('--notes', default='')
+    log.add_argument('--time-spent')
+    log.set_defaults(handler=log_command)
+
+    expense = commands.add_parser('expense', help="expense records").add_subparsers(dest='action', required=True)
+    expense_add = expense.add_parser('add', help="add an expense")
+    expense_add.add_argument('--amount', type=float, required=True)
+    expense_add.add_argument('--category', default='Other', help="e.g. Food/Treats, Vet Visit, Grooming")
+    expense_add.add_argument('--pet', default='All')
+    expense_add.add_argument('--description', default='')
+    expense_add.add_argument('--date', type=valid_date, default=date.today().strftime('%Y-%m-%d'))
+    expense_add.set_defaults(handler=expense_add_command)
+
+    med = commands.add_parser('med', help="medication records").add_subparsers(dest='action', required=True)
+    med_add = med.add_parser('add', help="record a medication given")
+    med_add.add_argument('pet')
+    med_add.add_argument('medication')
+    med_add.add_argument('--notes', default='')
+    med_add.add_argument('--date', type=valid_date, default=date.today().strftime('%Y-%m-%d'))
+    med_add.add_argument('--time', type=valid_time, help="HH:MM, default now")
+    med_add.set_defaults(handler=med_add_command)
+
+    report = commands.add_parser('report', help="print a report")
+    report.add_argument('report', choices=('weekly', 'pets', 'dashboard', 'compliance', 'today', 'health',
+                                           'monthly', 'by-pet', 'by-category'))
+    report.add_argument('--workers', type=int,
+                        help="processes for counting the whole history (default: PETCARE_WORKERS or one per CPU)")
+    report.add_argument('--days', type=int, default=30, help="days the compliance report looks back (default 30)")
+    report.set_defaults(handler=report_command)
+
+    timeline = commands.add_parser('timeline', help="one pet's care, medications, observations and expenses by date")
+    timeline.add_argument('pet')
+    timeline.add_argument('--from', dest='start', type=valid_date, help="first date, YYYY-MM-DD")
+    timeline.add_argument('--to', dest='end', type=valid_date, help="last date, YYYY-MM-DD")
+    timeline.add_argument('--kinds', type=timeline_kinds, default=TIMELINE_KINDS,
+                          help="comma-separated: care, medication, observation, expense (default: all)")
+    timeline.add_argument('--page', type=int, default=1)
+    timeline.add_argument('--per-page', type=int, default=50)
+    timeline.add_argument('--all', action='store_true', help="print every entry instead of one page")
+    timeline.set_defaults(handler=timeline_command)
+
+    search = commands.add_parser('search', help="find words in care notes, health records and expense descriptions")
+    search.add_argument('words', nargs='+', help="every word must appear")
+    search.add_argument('--pet')
+    search.add_argument('--from', dest='start', type=valid_date, help="first date, YYYY-MM-DD")
+    search.add_argument('--to', dest='end', type=valid_date, help="last date, YYYY-MM-DD")
+    search.add_argument('--limit', type=int, default=50, help="newest matches to show (0 for all)")
+    search.set_defaults(handler=search_command)
+
+    exporter = commands.add_parser('export', help="write records for a date range, with daily and per-pet sheets")
+    exporter.add_argument('path', help="record file, e.g. may.csv; may-daily.csv and may-pets.csv go next to it")
+    exporter.add_argument('--pet', help="default: every pet")
+    exporter.add_argument('--from', dest='start', type=valid_date, help="first date, YYYY-MM-DD")
+    exporter.add_argument('--to', dest='end', type=valid_date, help="last date, YYYY-MM-DD")
+    exporter.add_argument('--kinds', type=timeline_kinds, default=TIMELINE_KINDS,
+                          help="comma-separated: care, medication, observation, expense (default: all)")
+    exporter.add_argument('--format', choices=('csv', 'jsonl'), help="default: from the file extension")
+    exporter.set_defaults(handler=export_command)
+
+    importer = commands.add_parser('import', help="bulk import records from CSV or JSONL files")
+    importer.add_argument('files', nargs='+')
+    importer.add_argument('--kind', choices=[kind for kind, _ in KIND_FIELDS],
+                          help="treat every row as this kind (default: tell from the columns)")
+    importer.add_argument('--format', choices=('csv', 'jsonl'), help="default: from the file extension")
+    importer.add_argument('--skip-invalid', action='store_true', help="import the valid rows even if some are bad")
+    importer.set_defaults(handler=import_command)
+
+    convert = commands.add_parser('convert', help="rewrite the data files with another codec")
+    convert.add_argument('codec', choices=CODECS, help="json (pretty, the default), compact, zlib, gzip or records")
+    convert.set_defaults(handler=convert_command)
+
+    server = commands.add_parser('serve', help="serve the trackers as a JSON HTTP API (see server.py)")
+    server.add_argument('--host', default='127.0.0.1', help="0.0.0.0 to accept other devices on the network")
+    server.add_argument('--port', type=int, default=8080)
+    server.set_defaults(handler=serve_command, needs_backend=False)
+
+    household = commands.add_parser('household', help="households served from this install").add_subparsers(
+        dest='action', required=True)
+    household_add = household.add_parser('add', help="register a household with its own data directory")
+    household_add.add_argument('id', help="lowercase letters, digits, - or _")
+    household_add.add_argument('name', nargs='?')
+    household_add.add_argument('--data-dir', help="existing directory to use (default: households/ID)")
+    household_add.set_defaults(handler=household_add_command, needs_backend=False)
+    household.add_parser('list', help="list households").set_defaults(
+        handler=household_list_command, needs_backend=False)
+    household_remove = household.add_parser('remove', help="unregister a household, keeping its data")
+    household_remove.add_argument('id')
+    household_remove.set_defaults(handler=household_remove_command, needs_backend=False)
+    household_report = household.add_parser('report', help="totals and spend by category across all households")
+    household_report.add_argument('--workers', type=int, help="processes to summarize households on")
+    household_report.set_defaults(handler=household_report_command, needs_backend=False)
+    return parser
+
+def run_command(argv):
+    args = build_parser().parse_args(argv)
+    stats_file = os.environ.get('PETCARE_STATS')
+    registry.enabled = bool(stats_file)
+    backend = None
+    try:
+        if getattr(args, 'needs_backend', True):
+            backend = backend_from_env(args.household)
+        return args.handler(backend, args) or 0
+    except BrokenPipeError:
+        raise
+    except (OSError, ValueError) as error:
+        print(f"❌ {error}", file=sys.stderr)
+        return 1
+    finally:
+        if backend is not None:
+            backend.close()
+        if stats_file:
+            registry.dump(stats_file)
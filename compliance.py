@@ -0,0 +1,170 @@
+"""Routine adherence from per-pet, per-activity day bitmaps.
+
+Each (pet, activity) pair gets one int whose bit i is set when the
+activity was logged for the pet on day i (counted from the first logged
+day). A date range is then a shift and a mask, the days it was done a
+popcount, the missed days the zero bits, and a streak the run of set
+bits at the end, so a year of adherence for every routine item is a few
+big-int operations instead of a walk over the care logs.
+"""
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+def day_number(day):
+    if isinstance(day, str):
+        day = datetime.strptime(day, '%Y-%m-%d')
+    return day.toordinal()
+
+def popcount(bits):
+    # int.bit_count() is 3.10+ and we support 3.7+ (see README)
+    return bin(bits).count('1')
+
+def longest_run(bits):
+    """Length of the longest run of set bits"""
+    run = 0
+    while bits:
+        bits &= bits << 1
+        run += 1
+    return run
+
+def set_bits(bits):
+    """Positions of the set bits, lowest first"""
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+def fold_weeks(bits, periods):
+    """Day bits -> one bit per 7-day period, set if any day in it is"""
+    weeks = 0
+    for week in range(periods):
+        if (bits >> (week * 7)) & 0x7f:
+            weeks |= 1 << week
+    return weeks
+
+Adherence = namedtuple('Adherence', 'pet item period_days periods done percent current_streak longest_streak missed')
+
+class ComplianceIndex:
+    """Day bitmaps of which care activities each pet got, kept up to date
+    from the report rollups (see rollups.py) rather than the raw care logs.
+
+    refresh() folds in the days from the last one it saw onwards, the
+    same way the rollups catch up, and starts over if days turn up
+    earlier than that (an import) or the rollups were rebuilt.
+    """
+
+    def __init__(self, rollups):
+        self.rollups = rollups
+        self.reset(None)
+
+    def reset(self, care_days):
+        self.care_days = care_days
+        self.first_day = None
+        self.high_water = None
+        self.day_count = 0
+        # {pet (casefolded): {activity: bitmap}}
+        self.bitmaps = {}
+
+    def shift_first_day(self, number):
+        """Make number the first day, moving every bitmap up to match"""
+        if self.first_day is not None:
+            shift = self.first_day - number
+            for by_activity in self.bitmaps.values():
+                for activity in by_activity:
+                    by_activity[activity] <<= shift
+        self.first_day = number
+
+    def set_day(self, day, day_counts):
+        number = day_number(day)
+        if self.first_day is None or number < self.first_day:
+            self.shift_first_day(number)
+        bit = 1 << (number - self.first_day)
+        if self.high_water is not None and day <= self.high_water:
+            # Seen before, maybe with fewer (or other) activities
+            for by_activity in self.bitmaps.values():
+                for activity in by_activity:
+                    by_activity[activity] &= ~bit
+        for pet, pet_counts in day_counts.items():
+            by_activity = self.bitmaps.setdefault(pet.casefold(), {})
+            for activity, count in pet_counts.items():
+                if count:
+                    by_activity[activity] = by_activity.get(activity, 0) | bit
+
+    def catch_up(self):
+        high_water = self.high_water
+        for day in sorted(day for day in self.care_days if high_water is None or day >= high_water):
+            self.set_day(day, self.care_days[day])
+            if high_water is None or day > high_water:
+                self.day_count += 1
+            self.high_water = day
+
+    def refresh(self):
+        self.rollups.refresh()
+        care_days = self.rollups.rollups['care_days']
+        if care_days is not self.care_days:
+            self.reset(care_days)
+        self.catch_up()
+        if self.day_count != len(care_days):
+            self.reset(care_days)
+            self.catch_up()
+
+    def first_logged(self, pet):
+        """Day number of the pet's first logged activity, or None"""
+        logged = 0
+        for bits in self.bitmaps.get(pet.casefold(), {}).values():
+            logged |= bits
+        if not logged:
+            return None
+        return self.first_day + (logged & -logged).bit_length() - 1
+
+    def window(self, pet, item, start, end):
+        """The item's bits for day numbers start..end, bit 0 = start"""
+        bits = self.bitmaps.get(pet.casefold(), {}).get(item, 0)
+        if not bits:
+            return 0
+        offset = start - self.first_day
+        bits = bits >> offset if offset >= 0 else bits << -offset
+        return bits & ((1 << (end - start + 1)) - 1)
+
+    def adherence(self, pet, item, start, end, period_days=1):
+        """How well pet kept up item from start to end (dates or 'YYYY-MM-DD').
+
+        Daily items are counted per day; period_days=7 counts weekly items
+        per 7-day period ending on end. Days before the pet's first logged
+        activity don't count as missed, but a pet with nothing logged at all
+        has missed every period. Streaks are in periods; missed lists the
+        first day of each missed period.
+        """
+        start, end = day_number(start), day_number(end)
+        first = self.first_logged(pet)
+        if first is None:
+            first = start
+        if first > end:
+            return Adherence(pet, item, period_days, 0, 0, 0.0, 0, 0, [])
+        periods = (end - max(start, first)) // period_days + 1
+        start = end - periods * period_days + 1
+        bits = self.window(pet, item, start, end)
+        if period_days > 1:
+            bits = fold_weeks(bits, periods)
+        everything = (1 << periods) - 1
+        missed = ~bits & everything
+        done = popcount(bits)
+        return Adherence(
+            pet, item, period_days, periods, done, 100 * done / periods,
+            periods - missed.bit_length(), longest_run(bits),
+            [date.fromordinal(start + period * period_days).strftime('%Y-%m-%d') for period in set_bits(missed)])
+
+    def routine_adherence(self, pets, start, end):
+        """Adherence for every daily_routine and weekly_routine item of every pet profile"""
+        results = []
+        for pet in pets.values():
+            for item in pet.get('daily_routine', []):
+                results.append(self.adherence(pet['name'], item, start, end))
+            for item in pet.get('weekly_routine', []):
+                results.append(self.adherence(pet['name'], item, start, end, period_days=7))
+        return results
+
+def last_days(days, today=None):
+    """(start, end) covering the days complete days before today"""
+    end = (today or date.today()) - timedelta(days=1)
+    return end - timedelta(days=days - 1), end
@@ -0,0 +1,127 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from rollups import to_cents
+
+# Day for expenses without a usable date (legacy or hand-edited rows): they
+# count towards all-time totals but never match a date range
+UNDATED = 0
+
+@lru_cache(maxsize=4096)
+def day_ordinal(date_str):
+    """'2024-05-17' -> proleptic Gregorian ordinal"""
+    return date(int(date_str[:4]), int(date_str[5:7]), int(date_str[8:10])).toordinal()
+
+class ExpenseColumns:
+    """Expenses stored column by column for fast summaries.
+
+    Dates are day ordinals, amounts are integer cents and categories/pets
+    are small integer codes into a name table, each kept in a flat array.
+    Group-by and range sums run as a single pass over the arrays, using
+    NumPy when it's installed. While expenses arrive in date order (the
+    usual case) date ranges are found by bisecting instead of scanning.
+    """
+
+    def __init__(self):
+        self.days = array('q')
+        self.cents = array('q')
+        self.category_codes = array('q')
+        self.pet_codes = array('q')
+        self.names = {'category': [], 'pet': []}
+        self.codes = {'category': {}, 'pet': {}}
+        self.in_date_order = True
+
+    @classmethod
+    def from_expenses(cls, expenses):
+        columns = cls()
+        for expense in expenses:
+            columns.append(expense)
+        return columns
+
+    def __len__(self):
+        return len(self.days)
+
+    def encode(self, column, value):
+        codes = self.codes[column]
+        if value not in codes:
+            codes[value] = len(self.names[column])
+            self.names[column].append(value)
+        return codes[value]
+
+    def append(self, expense):
+        try:
+            day = day_ordinal(expense['date'])
+        except (KeyError, TypeError, ValueError):
+            day = UNDATED
+        if self.days and day < self.days[-1]:
+            self.in_date_order = False
+        self.days.append(day)
+        self.cents.append(to_cents(expense.get('amount', 0)))
+        self.category_codes.append(self.encode('category', expense.get('category', '')))
+        self.pet_codes.append(self.encode('pet', expense.get('pet', '')))
+
+    def code_column(self, column):
+        return self.category_codes if column == 'category' else self.pet_codes
+
+    def select(self, columns, start=None, end=None):
+        """Rows of the given arrays whose date is within [start, end] (ISO dates, inclusive)"""
+        if start or end:
+            start = day_ordinal(start) if start else UNDATED + 1
+        else:
+            start = None
+        end = day_ordinal(end) if end else None
+
+        if np is not None:
+            arrays = [np.frombuffer(c, dtype=np.int64) if len(c) else np.zeros(0, dtype=np.int64) for c in columns]
+            if start is None and end is None:
+                return arrays
+            days = np.frombuffer(self.days, dtype=np.int64) if len(self.days) else np.zeros(0, dtype=np.int64)
+            if self.in_date_order:
+                lo = 0 if start is None else int(np.searchsorted(days, start, 'left'))
+                hi = len(days) if end is None else int(np.searchsorted(days, end, 'right'))
+                return [a[lo:hi] for a in arrays]
+            mask = np.ones(len(days), dtype=bool)
+            if start is not None:
+                mask &= days >= start
+            if end is not None:
+                mask &= days <= end
+            return [a[mask] for a in arrays]
+
+        if start is None and end is None:
+            return columns
+        if self.in_date_order:
+            lo = 0 if start is None else bisect_left(self.days, start)
+            hi = len(self.days) if end is None else bisect_right(self.days, end)
+            return [c[lo:hi] for c in columns]
+        keep = [(start is None or d >= start) and (end is None or d <= end) for d in self.days]
+        return [array('q', (v for v, k in zip(c, keep) if k)) for c in columns]
+
+    def total(self, start=None, end=None):
+        """(number of expenses, total cents) in a date range"""
+        cents, = self.select([self.cents], start, end)
+        return len(cents), int(cents.sum()) if np is not None else sum(cents)
+
+    def sum_by(self, column, start=None, end=None):
+        """{category or pet: (number of expenses, total cents)} in a date range"""
+        codes, cents = self.select([self.code_column(column), self.cents], start, end)
+        names = self.names[column]
+
+        if np is not None:
+            counts = np.bincount(codes, minlength=len(names))
+            totals = np.bincount(codes, weights=cents, minlength=len(names))
+            return {names[code]: (int(counts[code]), int(round(totals[code])))
+                    for code in np.flatnonzero(counts)}
+
+        counts = [0] * len(names)
+        totals = [0] * len(names)
+        for code, amount in zip(codes, cents):
+            counts[code] += 1
+            totals[code] += amount
+        return {names[code]: (counts[code], totals[code]) for code in range(len(names)) if counts[code]}
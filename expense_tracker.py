@@ -1,28 +1,32 @@
-import json
-import os
-from datetime import datetime, date
+import calendar
+from datetime import date
+
+from backends import shared_backend
+from expense_columns import ExpenseColumns
 
 class ExpenseTracker:
-    def __init__(self, data_file='data/expenses.json'):
-        self.data_file = data_file
-        self.ensure_data_directory()
-        self.expenses = self.load_expenses()
-    
-    def ensure_data_directory(self):
-        os.makedirs('data', exist_ok=True)
+    def __init__(self, backend=None):
+        self.backend = backend or shared_backend()
+        self.columns_generation = None
+
+    @property
+    def expenses(self):
+        return self.load_expenses()
+
+    @property
+    def columns(self):
+        """ExpenseColumns for the expenses, rebuilt whenever they get reloaded"""
+        expenses = self.load_expenses()
+        if self.columns_generation != self.backend.generation('expenses'):
+            self.expense_columns = ExpenseColumns.from_expenses(expenses)
+            self.columns_generation = self.backend.generation('expenses')
+        return self.expense_columns
     
     def load_expenses(self):
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                return []
-        return []
+        return self.backend.load_expenses()
     
     def save_expenses(self):
-        with open(self.data_file, 'w') as f:
-            json.dump(self.expenses, f, indent=2)
+        self.backend.save_expenses(self.expenses)
     
     def expense_menu(self):
         print("\n💰 EXPENSE TRACKING:")
@@ -31,7 +35,9 @@ class ExpenseTracker:
         print("2. View recent expenses")
         print("3. Monthly summary")
         print("4. Expense by pet")
-        print("5. Back to main menu")
+        print("5. Expense by category")
+        print("6. Date range report")
+        print("7. Back to main menu")
         
         choice = input("\nExpense option: ").strip()
         
@@ -44,6 +50,10 @@ class ExpenseTracker:
         elif choice == '4':
             self.expenses_by_pet()
         elif choice == '5':
+            self.expenses_by_category()
+        elif choice == '6':
+            self.date_range_report()
+        elif choice == '7':
             return
     
     def add_expense(self):
@@ -71,20 +81,33 @@ class ExpenseTracker:
             'description': description
         }
         
+        columns = self.columns
         self.expenses.append(expense)
-        self.save_expenses()
+        columns.append(expense)
+        with self.backend.saving('expenses'):
+            self.backend.add_expense(expense)
         print(f"✅ Added ${amount:.2f} expense for {pet_name}")
     
+    def add_expenses(self, expenses):
+        """Record many expenses with one batched save"""
+        columns = self.columns
+        self.expenses.extend(expenses)
+        for expense in expenses:
+            columns.append(expense)
+        with self.backend.saving('expenses'):
+            self.backend.add_expenses(expenses)
+    
     def view_recent_expenses(self):
-        if not self.expenses:
+        # Show last 10 expenses, read from the end of the file when it's line-delimited
+        recent = self.backend.recent_expenses(10)
+        if not recent:
             print("No expenses recorded yet.")
             return
         
         print("\n💰 RECENT EXPENSES:")
         print("=" * 50)
         
-        # Show last 10 expenses
-        for expense in self.expenses[-10:]:
+        for expense in recent:
             pet_emoji = "🦜" if expense['pet'] in ["Bailey", "Munchkin", "Gus"] else "🐰" if expense['pet'] == "Bunion" else "🐾"
             print(f"{expense['date']} | {pet_emoji} {expense['pet']} | ${expense['amount']:.2f}")
             print(f"   {expense['category']}: {expense['description']}")
@@ -94,26 +117,54 @@ class ExpenseTracker:
             print("No expenses to summarize.")
             return
         
-        current_month = date.today().strftime('%Y-%m')
-        monthly_expenses = [e for e in self.expenses if e['date'].startswith(current_month)]
+        today = date.today()
+        current_month = today.strftime('%Y-%m')
+        month_start = today.replace(day=1).strftime('%Y-%m-%d')
+        month_end = today.replace(day=calendar.monthrange(today.year, today.month)[1]).strftime('%Y-%m-%d')
+        count, total_cents = self.columns.total(month_start, month_end)
         
-        if not monthly_expenses:
+        if not count:
             print(f"No expenses for {current_month}")
             return
         
-        total = sum(e['amount'] for e in monthly_expenses)
-        
         print(f"\n📊 {current_month} SUMMARY:")
         print("=" * 30)
-        print(f"Total spent: ${total:.2f}")
-        print(f"Number of expenses: {len(monthly_expenses)}")
-        
-        # By category
-        categories = {}
-        for expense in monthly_expenses:
-            cat = expense['category']
-            categories[cat] = categories.get(cat, 0) + expense['amount']
+        print(f"Total spent: ${total_cents / 100:.2f}")
+        print(f"Number of expenses: {count}")
         
         print("\nBy category:")
-        for cat, amount in categories.items():
-            print(f"  {cat}: ${amount:.2f}")
+        for cat, (cat_count, cents) in self.columns.sum_by('category', month_start, month_end).items():
+            print(f"  {cat}: ${cents / 100:.2f}")
+    
+    def print_breakdown(self, title, totals):
+        print(f"\n{title}")
+        print("=" * 40)
+        if not totals:
+            print("No expenses recorded yet.")
+            return
+        for name, (count, cents) in sorted(totals.items(), key=lambda item: -item[1][1]):
+            print(f"  {name}: ${cents / 100:.2f} ({count} expenses)")
+        print(f"  Total: ${sum(cents for _, cents in totals.values()) / 100:.2f}")
+    
+    def expenses_by_pet(self):
+        self.print_breakdown("🐾 EXPENSES BY PET:", self.columns.sum_by('pet'))
+    
+    def expenses_by_category(self):
+        self.print_breakdown("🏷️  EXPENSES BY CATEGORY:", self.columns.sum_by('category'))
+    
+    def date_range_report(self):
+        start = input("Start date (YYYY-MM-DD, blank for all): ").strip() or None
+        end = input("End date (YYYY-MM-DD, blank for today): ").strip() or date.today().strftime('%Y-%m-%d')
+        try:
+            count, total_cents = self.columns.total(start, end)
+        except ValueError:
+            print("Invalid date. Use YYYY-MM-DD.")
+            return
+        
+        print(f"\n📊 {start or 'Beginning'} to {end}:")
+        print("=" * 40)
+        print(f"Total spent: ${total_cents / 100:.2f}")
+        print(f"Number of expenses: {count}")
+        if count:
+            self.print_breakdown("By category:", self.columns.sum_by('category', start, end))
+            self.print_breakdown("By pet:", self.columns.sum_by('pet', start, end))
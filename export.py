@@ -0,0 +1,131 @@
+"""Statements: care activities, medications, observations and expenses
+for a date range (and optionally one pet), written to CSV or JSONL.
+
+    export('statements/gus-2024-05.csv', '2024-05-01', '2024-05-31', 'Gus')
+
+writes gus-2024-05.csv with every record in date order, plus
+gus-2024-05-daily.csv (per day and pet counts and spend) and
+gus-2024-05-pets.csv (per pet totals). Records are streamed from the
+timeline query straight to the file and the daily sheet only ever holds
+one day, so memory doesn't grow with the range. The record file uses the
+columns 'main.py import' reads, so a statement can be imported elsewhere.
+"""
+import csv
+import json
+import os
+
+from care_records import json_default
+from query import KINDS, timeline
+
+RECORD_FIELDS = ('date', 'time', 'kind', 'pet', 'activity', 'medication', 'observation',
+                 'category', 'amount', 'description', 'notes', 'time_spent')
+COUNT_FIELDS = ('care', 'medication', 'observation', 'expense')
+DAILY_FIELDS = ('date', 'pet') + COUNT_FIELDS + ('spend',)
+PET_FIELDS = ('pet', 'first_date', 'last_date', 'days') + COUNT_FIELDS + ('spend',)
+
+FORMATS = ('csv', 'jsonl')
+
+def export_format(path):
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+def sheet_path(path, sheet):
+    """statements/may.csv -> statements/may-daily.csv"""
+    base, extension = os.path.splitext(path)
+    return f"{base}-{sheet}{extension}"
+
+def record_row(entry):
+    """A timeline entry as a flat row: the shared columns plus the record's own"""
+    row = {'date': entry.date, 'time': entry.time, 'kind': entry.kind, 'pet': entry.pet or ''}
+    for field, value in entry.record.items():
+        if field in RECORD_FIELDS and field not in row:
+            row[field] = value
+    return row
+
+class RowWriter:
+    """Writes rows to path as CSV (fixed columns) or JSONL (non-empty fields only).
+
+    The file appears under its name only once close() is called, so an
+    interrupted export doesn't leave a truncated statement behind.
+    """
+
+    def __init__(self, path, fields, file_format):
+        self.path = path
+        self.temp_path = path + '.tmp'
+        self.fields = fields
+        self.file_format = file_format
+        self.file = open(self.temp_path, 'w', newline='')
+        self.rows = 0
+        if file_format == 'csv':
+            self.writer = csv.DictWriter(self.file, fields, extrasaction='ignore')
+            self.writer.writeheader()
+
+    def write(self, row):
+        if self.file_format == 'csv':
+            self.writer.writerow(row)
+        else:
+            line = {field: row[field] for field in self.fields if row.get(field) not in (None, '')}
+            self.file.write(json.dumps(line, default=json_default) + '\n')
+        self.rows += 1
+
+    def close(self):
+        self.file.close()
+        os.replace(self.temp_path, self.path)
+
+    def discard(self):
+        self.file.close()
+        os.remove(self.temp_path)
+
+def empty_counts():
+    counts = dict.fromkeys(COUNT_FIELDS, 0)
+    counts['spend'] = 0.0
+    return counts
+
+def add_entry(counts, entry):
+    counts[entry.kind] += 1
+    if entry.kind == 'expense':
+        counts['spend'] += entry.record.get('amount') or 0
+
+def rounded(counts):
+    return dict(counts, spend=round(counts['spend'], 2))
+
+def export(path, start=None, end=None, pet_name=None, kinds=KINDS, file_format=None, backend=None):
+    """Write the record file and the daily and per-pet sheets, returns {path: rows written}"""
+    file_format = file_format or export_format(path)
+    if file_format not in FORMATS:
+        raise ValueError(f"unknown export format '{file_format}'")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    writers = [RowWriter(path, RECORD_FIELDS, file_format),
+               RowWriter(sheet_path(path, 'daily'), DAILY_FIELDS, file_format),
+               RowWriter(sheet_path(path, 'pets'), PET_FIELDS, file_format)]
+    records, daily, per_pet = writers
+    try:
+        day, day_counts, pet_totals = None, {}, {}
+
+        def flush_day():
+            for pet, counts in day_counts.items():
+                daily.write(dict(rounded(counts), date=day, pet=pet))
+                totals = pet_totals.setdefault(pet, dict(empty_counts(), first_date=day, days=0))
+                totals['last_date'] = day
+                totals['days'] += 1
+                for field in COUNT_FIELDS + ('spend',):
+                    totals[field] += counts[field]
+
+        for entry in timeline(pet_name, start, end, kinds, backend):
+            if entry.date != day:
+                flush_day()
+                day, day_counts = entry.date, {}
+            records.write(record_row(entry))
+            add_entry(day_counts.setdefault(entry.pet or '', empty_counts()), entry)
+        flush_day()
+        for pet in sorted(pet_totals):
+            per_pet.write(dict(rounded(pet_totals[pet]), pet=pet))
+    except BaseException:
+        for writer in writers:
+            writer.discard()
+        raise
+    for writer in writers:
+        writer.close()
+    return {writer.path: writer.rows for writer in writers}
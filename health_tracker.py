@@ -1,28 +1,112 @@
-import json
-import os
+from bisect import bisect_left, bisect_right
+from collections import deque
 from datetime import datetime, date
 
+from backends import HEALTH_RECORD_TYPES, shared_backend
+
+RECENT_RECORDS = 5
+
+class PetRecordIndex:
+    """Health records of one type, filed per pet in date order.
+
+    Range queries bisect the pet's date list, and each pet's newest
+    RECENT_RECORDS records are also kept in a bounded deque for last().
+    """
+    
+    def __init__(self, records=()):
+        self.dates = {}
+        self.records = {}
+        self.recent = {}
+        for record in records:
+            self.add(record)
+    
+    def add(self, record):
+        if not record.get('date'):
+            return
+        pet = record.get('pet_name', '').casefold()
+        dates = self.dates.setdefault(pet, [])
+        records = self.records.setdefault(pet, [])
+        # bisect_right keeps records from the same day in the order they were logged
+        position = bisect_right(dates, record['date'])
+        dates.insert(position, record['date'])
+        records.insert(position, record)
+        recent = self.recent.setdefault(pet, deque(maxlen=RECENT_RECORDS))
+        if position == len(records) - 1:
+            recent.append(record)
+        elif position >= len(records) - RECENT_RECORDS:
+            # Back-dated into the newest few: refill from the sorted list
+            recent.clear()
+            recent.extend(records[-RECENT_RECORDS:])
+    
+    def between(self, pet_name, start=None, end=None):
+        """Records for a pet dated within [start, end], oldest first"""
+        dates = self.dates.get(pet_name.casefold(), [])
+        low = bisect_left(dates, start) if start else 0
+        high = bisect_right(dates, end) if end else len(dates)
+        return self.records[pet_name.casefold()][low:high] if dates else []
+    
+    def last(self, pet_name, count=RECENT_RECORDS):
+        """The most recent records for a pet, oldest first (don't modify it)"""
+        pet = pet_name.casefold()
+        if count > RECENT_RECORDS:
+            return self.records.get(pet, [])[-count:]
+        recent = self.recent.get(pet, ())
+        if count >= len(recent):
+            return recent
+        return list(recent)[len(recent) - count:]
+
 class HealthTracker:
-    def __init__(self, data_file='data/health_records.json'):
-        self.data_file = data_file
-        self.ensure_data_directory()
-        self.health_records = self.load_health_records()
+    def __init__(self, backend=None):
+        self.backend = backend or shared_backend()
+        self.indexed_generation = None
     
-    def ensure_data_directory(self):
-        os.makedirs('data', exist_ok=True)
+    @property
+    def health_records(self):
+        return self.load_health_records()
+    
+    @property
+    def indexes(self):
+        """Per-kind PetRecordIndex, rebuilt whenever the records get reloaded"""
+        health_records = self.load_health_records()
+        if self.indexed_generation != self.backend.generation('health_records'):
+            self.build_indexes(health_records)
+            self.indexed_generation = self.backend.generation('health_records')
+        return self.record_indexes
     
     def load_health_records(self):
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                return {'medications': [], 'health_observations': [], 'grooming_appointments': []}
-        return {'medications': [], 'health_observations': [], 'grooming_appointments': []}
+        return self.backend.load_health_records()
+    
+    def build_indexes(self, health_records):
+        self.record_indexes = {kind: PetRecordIndex(health_records.get(kind, [])) for kind in HEALTH_RECORD_TYPES}
+    
+    def add_record(self, kind, record):
+        # Index first so a reload doesn't index the new record twice
+        indexes = self.indexes
+        self.health_records[kind].append(record)
+        indexes[kind].add(record)
+        with self.backend.saving('health_records'):
+            self.backend.add_health_record(kind, record)
+    
+    def add_records(self, records_by_kind):
+        """Record {kind: [records]} with one batched save"""
+        indexes = self.indexes
+        for kind, records in records_by_kind.items():
+            self.health_records[kind].extend(records)
+            for record in records:
+                indexes[kind].add(record)
+        with self.backend.saving('health_records'):
+            self.backend.add_health_records(records_by_kind)
+    
+    def records_between(self, kind, pet_name, start=None, end=None):
+        """e.g. records_between('medications', 'Gus', '2024-01-01', '2024-03-31')"""
+        return self.indexes[kind].between(pet_name, start, end)
+    
+    def last_records(self, kind, pet_name, count=RECENT_RECORDS):
+        """e.g. last_records('health_observations', 'Munchkin', 10)"""
+        return self.indexes[kind].last(pet_name, count)
     
     def save_health_records(self):
-        with open(self.data_file, 'w') as f:
-            json.dump(self.health_records, f, indent=2)
+        self.backend.save_health_records(self.health_records)
     
     def health_menu(self):
         print("\n🏥 HEALTH & MEDICAL TRACKING:")
@@ -30,7 +114,8 @@ class HealthTracker:
         print("1. Record medication given")
         print("2. Health observation")
         print("3. View health summary")
-        print("4. Back to main menu")
+        print("4. Pet health history")
+        print("5. Back to main menu")
         
         choice = input("\nHealth tracking option: ").strip()
         
@@ -41,6 +126,8 @@ class HealthTracker:
         elif choice == '3':
             self.view_health_summary()
         elif choice == '4':
+            self.view_pet_history()
+        elif choice == '5':
             return
     
     def record_medication(self):
@@ -57,8 +144,7 @@ class HealthTracker:
             'notes': notes
         }
         
-        self.health_records['medications'].append(record)
-        self.save_health_records()
+        self.add_record('medications', record)
         print(f"✅ Recorded {medication} for {pet_name}")
     
     def log_health_observation(self):
@@ -74,24 +160,51 @@ class HealthTracker:
             'notes': notes
         }
         
-        self.health_records['health_observations'].append(record)
-        self.save_health_records()
+        self.add_record('health_observations', record)
         print(f"✅ Recorded observation for {pet_name}")
     
     def view_health_summary(self):
         print("\n🏥 HEALTH SUMMARY:")
         print("=" * 50)
         
-        if self.health_records['medications']:
+        recent_meds = self.backend.recent_health_records('medications', RECENT_RECORDS)
+        recent_obs = self.backend.recent_health_records('health_observations', RECENT_RECORDS)
+        
+        if recent_meds:
             print("Recent Medications:")
-            for med in self.health_records['medications'][-5:]:
+            for med in recent_meds:
                 print(f"  {med['date']} - {med['pet_name']}: {med['medication']}")
         
-        if self.health_records['health_observations']:
+        if recent_obs:
             print("\nRecent Observations:")
-            for obs in self.health_records['health_observations'][-5:]:
-                print(f"  {med['date']} - {obs['pet_name']}: {obs['observation']}")
+            for obs in recent_obs:
+                print(f"  {obs['date']} - {obs['pet_name']}: {obs['observation']}")
         
-        if not self.health_records['medications'] and not self.health_records['health_observations']:
+        if not recent_meds and not recent_obs:
             print("No health records yet.")
-
+    
+    def view_pet_history(self):
+        pet_name = input("Pet name: ").strip()
+        start = input("From date (YYYY-MM-DD, blank for last few): ").strip()
+        end = input("To date (YYYY-MM-DD, optional): ").strip()
+        
+        if start:
+            medications = self.records_between('medications', pet_name, start, end)
+            observations = self.records_between('health_observations', pet_name, start, end)
+        else:
+            medications = self.last_records('medications', pet_name)
+            observations = self.last_records('health_observations', pet_name)
+        
+        print(f"\n🏥 {pet_name.upper()}'S HEALTH HISTORY:")
+        print("=" * 50)
+        if medications:
+            print("Medications:")
+            for med in medications:
+                print(f"  {med['date']} {med.get('time', '')} - {med['medication']}")
+        if observations:
+            print("\nObservations:")
+            for obs in observations:
+                notes_info = f" ({obs['notes']})" if obs.get('notes') else ""
+                print(f"  {obs['date']} - {obs['observation']}{notes_info}")
+        if not medications and not observations:
+            print("No health records found.")
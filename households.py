@@ -0,0 +1,146 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from storage import atomic_write, dump_json, read_json_file
+
+DEFAULT_ROOT = 'households'
+HOUSEHOLD_ID = re.compile(r'[a-z0-9][a-z0-9_-]{0,62}')
+
+def households_root():
+    """Where household data roots and the registry live (PETCARE_HOUSEHOLDS_DIR)"""
+    return os.environ.get('PETCARE_HOUSEHOLDS_DIR', DEFAULT_ROOT)
+
+class HouseholdRegistry:
+    """The households (tenants) one install serves, each with its own data root.
+
+    registry.json maps household id -> {'name', 'data_dir', 'created_date'}.
+    New households get root/<id>/; an existing data directory, such as the
+    original data/, can be registered as one too. Every tracker opened for
+    a household reads and writes only under its data_dir.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or households_root()
+        self.registry_file = os.path.join(self.root, 'registry.json')
+        self.households = self.load_registry()
+
+    def load_registry(self):
+        if os.path.exists(self.registry_file):
+            return read_json_file(self.registry_file)
+        return {}
+
+    def save_registry(self):
+        os.makedirs(self.root, exist_ok=True)
+        atomic_write(self.registry_file, dump_json(self.households, self.registry_file))
+
+    def add(self, household_id, name=None, data_dir=None):
+        """Register a household; ValueError for a bad or taken id"""
+        if not HOUSEHOLD_ID.fullmatch(household_id):
+            raise ValueError(f"household id '{household_id}' must be lowercase letters, digits, - or _")
+        if household_id in self.households:
+            raise ValueError(f"household '{household_id}' already exists")
+        data_dir = data_dir or os.path.join(self.root, household_id)
+        os.makedirs(data_dir, exist_ok=True)
+        self.households[household_id] = {
+            'name': name or household_id,
+            'data_dir': data_dir,
+            'created_date': datetime.now().strftime('%Y-%m-%d'),
+        }
+        self.save_registry()
+        return self.households[household_id]
+
+    def remove(self, household_id):
+        """Forget a household. Its data directory is left on disk."""
+        self.data_dir(household_id)
+        del self.households[household_id]
+        self.save_registry()
+
+    def data_dir(self, household_id):
+        if household_id not in self.households:
+            raise ValueError(f"unknown household '{household_id}'")
+        return self.households[household_id]['data_dir']
+
+    def ids(self):
+        return sorted(self.households)
+
+def household_data_dir(household_id=None):
+    """Data root for a household id (default PETCARE_HOUSEHOLD), or data/ without one"""
+    household_id = household_id or os.environ.get('PETCARE_HOUSEHOLD')
+    if not household_id:
+        return 'data'
+    return HouseholdRegistry().data_dir(household_id)
+
+# Cross-household reports: each household is summarized on its own (map),
+# in a worker process when there are several, then the summaries are added up
+
+def summarize_household(household_id, data_dir, backend_name='json'):
+    """One household's totals, from its own report rollups"""
+    from backends import open_backend
+    from rollups import RollupCache
+
+    backend = open_backend(backend_name, data_dir)
+    try:
+        rollups = RollupCache(backend, workers=1)
+        rollups.refresh()
+        days, activities = rollups.care_totals()
+        expense_count, _ = rollups.expense_totals()
+        spend = {}
+        for by_category in rollups.rollups['expense_days'].values():
+            for category, by_pet in by_category.items():
+                spend[category] = spend.get(category, 0) + sum(by_pet.values())
+        pets = backend.load_pets() or {}
+    finally:
+        backend.close()
+    return {'household': household_id, 'pets': len(pets), 'care_days': days,
+            'care_activities': activities, 'expenses': expense_count, 'spend_cents': spend}
+
+def merge_summaries(summaries):
+    """Reduce: add per-household summaries into install-wide totals"""
+    totals = {'households': len(summaries), 'pets': 0, 'care_activities': 0, 'expenses': 0, 'spend_cents': {}}
+    for summary in summaries:
+        for key in ('pets', 'care_activities', 'expenses'):
+            totals[key] += summary[key]
+        for category, cents in summary['spend_cents'].items():
+            totals['spend_cents'][category] = totals['spend_cents'].get(category, 0) + cents
+    return totals
+
+def summarize_households(registry, backend_name='json', workers=None):
+    """Per-household summaries in id order, on up to workers processes"""
+    from rollups import default_workers
+
+    jobs = [(household_id, registry.data_dir(household_id), backend_name) for household_id in registry.ids()]
+    workers = min(workers or default_workers(), len(jobs))
+    if workers > 1:
+        try:
+            with ProcessPoolExecutor(workers) as pool:
+                return list(pool.map(summarize_household, *zip(*jobs)))
+        except (OSError, BrokenProcessPool) as error:
+            print(f"Warning: summarizing households in one process ({error})")
+    return [summarize_household(*job) for job in jobs]
+
+def all_households_report(registry=None, backend_name='json', workers=None):
+    registry = registry or HouseholdRegistry()
+    summaries = summarize_households(registry, backend_name, workers)
+    totals = merge_summaries(summaries)
+
+    print("\n🏘️  ALL HOUSEHOLDS:")
+    print("=" * 66)
+    if not summaries:
+        print("No households registered yet.")
+        return totals
+    print(f"{'household':<20}{'pets':>6}{'days':>8}{'activities':>12}{'expenses':>10}{'spend':>10}")
+    for summary in summaries:
+        spend = sum(summary['spend_cents'].values()) / 100
+        print(f"{summary['household'][:19]:<20}{summary['pets']:>6}{summary['care_days']:>8}"
+              f"{summary['care_activities']:>12}{summary['expenses']:>10}{spend:>10.2f}")
+    print("-" * 66)
+    print(f"{len(summaries)} households, {totals['pets']} pets, "
+          f"{totals['care_activities']} care activities, {totals['expenses']} expenses")
+
+    print("\n💰 Spend by category:")
+    for category, cents in sorted(totals['spend_cents'].items(), key=lambda item: -item[1]):
+        print(f"   {category}: ${cents / 100:.2f}")
+    return totals
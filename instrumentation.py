@@ -0,0 +1,194 @@
+import functools
+import json
+import os
+import re
+import time
+from datetime import datetime
+
+class Stat:
+    """Call count, time and bytes for one instrumented operation"""
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.bytes = 0
+
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'total_ms': round(1000 * self.seconds, 3),
+            'avg_ms': round(1000 * self.seconds / self.calls, 3) if self.calls else 0.0,
+            'max_ms': round(1000 * self.max_seconds, 3),
+            'bytes': self.bytes,
+        }
+
+class Registry:
+    """Where instrumented code reports timings, keyed by 'kind label'.
+
+    Disabled by default: timer() then hands back a shared do-nothing
+    context manager and @timed functions call straight through, so the
+    instrumentation costs one attribute check per call.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.started = time.perf_counter()
+        self.stats = {}
+
+    def record(self, name, seconds, nbytes=0):
+        stat = self.stats.get(name)
+        if stat is None:
+            stat = self.stats[name] = Stat()
+        stat.calls += 1
+        stat.seconds += seconds
+        stat.max_seconds = max(stat.max_seconds, seconds)
+        stat.bytes += nbytes
+
+    def reset(self):
+        self.stats = {}
+        self.started = time.perf_counter()
+
+    def snapshot(self):
+        return {
+            'collected_at': datetime.now().isoformat(timespec='seconds'),
+            'session_seconds': round(time.perf_counter() - self.started, 3),
+            'stats': {name: stat.as_dict() for name, stat in sorted(self.stats.items())},
+        }
+
+    def dump(self, destination):
+        """Write the snapshot as JSON to a file, or to stdout for '-'"""
+        output = json.dumps(self.snapshot(), indent=2)
+        if destination == '-':
+            print(output)
+            return
+        with open(destination, 'w') as f:
+            f.write(output + '\n')
+
+    def print_report(self, limit=25):
+        print("\n🔬 DIAGNOSTICS:")
+        print("=" * 78)
+        if not self.enabled:
+            print("Instrumentation is off. Turn it on here or with PETCARE_STATS=stats.json")
+        if not self.stats:
+            print("Nothing recorded yet.")
+            return
+        print(f"{'operation':<44}{'calls':>7}{'total ms':>10}{'max ms':>9}{'KiB':>8}")
+        ranked = sorted(self.stats.items(), key=lambda item: -item[1].seconds)
+        for name, stat in ranked[:limit]:
+            print(f"{name[:43]:<44}{stat.calls:>7}{1000 * stat.seconds:>10.1f}"
+                  f"{1000 * stat.max_seconds:>9.1f}{stat.bytes / 1024:>8.0f}")
+        if len(ranked) > limit:
+            print(f"... and {len(ranked) - limit} more")
+
+registry = Registry()
+
+class Timer:
+    """Times a with block into the registry; set .bytes to count data moved"""
+
+    def __init__(self, name):
+        self.name = name
+        self.bytes = 0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registry.record(self.name, time.perf_counter() - self.started, self.bytes)
+        return False
+
+class NullTimer:
+    bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_TIMER = NullTimer()
+
+def timer(kind, label):
+    """with timer('json.parse', 'expenses.json') as t: ..."""
+    if not registry.enabled:
+        return NULL_TIMER
+    return Timer(f"{kind} {label}")
+
+def timed(kind, label=None):
+    """Decorator recording every call of a function under kind and label (default: its name)"""
+    def decorate(func):
+        name = f"{kind} {label or func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                registry.record(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+def instrument_methods(*prefixes):
+    """Class decorator timing every method defined on the class whose name starts with a prefix"""
+    def decorate(cls):
+        for attr, value in list(vars(cls).items()):
+            if callable(value) and attr.startswith(prefixes):
+                setattr(cls, attr, timed('backend', f"{cls.__name__}.{attr}")(value))
+        return cls
+    return decorate
+
+def file_label(path):
+    """Stats key for a data file; monthly shards are lumped together"""
+    name = os.path.basename(path)
+    if re.fullmatch(r'\d{4}-\d{2}\.json', name):
+        return os.path.basename(os.path.dirname(path)) + '/YYYY-MM.json'
+    return name
+
+def profile_call(action, top=20):
+    """Run action under cProfile, print the top functions and save the raw profile"""
+    # pstats pulls in inspect and dataclasses, too slow to import at startup
+    import cProfile
+    import io
+    import pstats
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.runcall(action)
+    finally:
+        profile_file = f"petcare-{datetime.now().strftime('%Y%m%d-%H%M%S')}.prof"
+        profiler.dump_stats(profile_file)
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(top)
+        print("\n⏱️  PROFILE (by cumulative time):")
+        print(output.getvalue())
+        print(f"Full profile saved to {profile_file} (open with python3 -m pstats)")
+
+def diagnostics_menu():
+    """Returns True if the next menu action should be profiled"""
+    registry.print_report()
+    print("\n1. Turn instrumentation " + ("off" if registry.enabled else "on"))
+    print("2. Reset stats")
+    print("3. Profile the next menu action")
+    print("4. Save stats as JSON")
+    print("5. Back to main menu")
+
+    choice = input("\nDiagnostics option: ").strip()
+
+    if choice == '1':
+        registry.enabled = not registry.enabled
+        print(f"Instrumentation {'on' if registry.enabled else 'off'}")
+    elif choice == '2':
+        registry.reset()
+        print("Stats cleared")
+    elif choice == '3':
+        print("The next option you pick will be profiled")
+        return True
+    elif choice == '4':
+        destination = input("File name (default petcare-stats.json): ").strip() or 'petcare-stats.json'
+        registry.dump(destination)
+        print(f"✅ Saved to {destination}")
+    return False
@@ -1,8 +1,9 @@
-from pet_manager import PetManager
-from care_logger import CareLogger
-from health_tracker import HealthTracker
-from expense_tracker import ExpenseTracker
-from reports import ReportGenerator
+import os
+import sys
+
+from backends import backend_from_env
+from instrumentation import diagnostics_menu, profile_call, registry
+from write_behind import print_write_stats
 
 def display_main_menu():
     print("\n" + "="*60)
@@ -14,44 +15,110 @@ def display_main_menu():
     print("4. Health & Medical Tracking")
     print("5. Expense Tracking")
     print("6. Reports & Analytics")
-    print("7. Exit")
+    print("7. Reminders")
+    print("8. Diagnostics")
+    print("9. Exit")
     print("-"*60)
 
-def main():
-    pm = PetManager()
-    cl = CareLogger()
-    ht = HealthTracker()
-    et = ExpenseTracker()
-    rg = ReportGenerator()
+class Trackers:
+    """Builds each tracker the first time its menu option is picked.
+
+    Nothing is imported or loaded up front, so the menu appears in the
+    same time however much history there is.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.built = {}
+
+    def get(self, name, build):
+        if name not in self.built:
+            self.built[name] = build()
+        return self.built[name]
+
+    @property
+    def pets(self):
+        from pet_manager import PetManager
+        return self.get('pets', lambda: PetManager(self.backend))
+
+    @property
+    def care(self):
+        from care_logger import CareLogger
+        return self.get('care', lambda: CareLogger(self.backend))
+
+    @property
+    def health(self):
+        from health_tracker import HealthTracker
+        return self.get('health', lambda: HealthTracker(self.backend))
+
+    @property
+    def expenses(self):
+        from expense_tracker import ExpenseTracker
+        return self.get('expenses', lambda: ExpenseTracker(self.backend))
 
-    while True:
-        display_main_menu()
-        choice = input("Choose an option (1-9): ").strip()
+    @property
+    def reminders(self):
+        from reminder_system import ReminderScheduler
+        return self.get('reminders', lambda: ReminderScheduler(self.pets, self.care, self.health))
 
-        if choice == '1':
-            pm.view_all_pets()
+    @property
+    def reports(self):
+        from reports import ReportGenerator
+        return self.get('reports', lambda: ReportGenerator(self.backend, reminders=self.reminders))
 
-        elif choice == '2':
-            cl.quick_log_menu()
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        # Subcommands (log, expense add, import, ...) skip the menu entirely
+        from cli import run_command
+        return run_command(argv)
 
-        elif choice == '3':
-            cl.view_today_summary()
+    # PETCARE_HOUSEHOLD=<id> uses that household's data root instead of data/,
+    # PETCARE_BACKEND=sqlite switches storage to data/petcare.db,
+    # PETCARE_WRITE_BEHIND=1 saves JSON files from a background thread,
+    # PETCARE_STATS=stats.json records timings and writes them there on exit
+    backend = backend_from_env()
+    stats_file = os.environ.get('PETCARE_STATS')
+    registry.enabled = bool(stats_file)
+    trackers = Trackers(backend)
+    actions = {
+        '1': lambda: trackers.pets.view_all_pets(),
+        '2': lambda: trackers.care.quick_log_menu(),
+        '3': lambda: trackers.care.view_today_summary(),
+        '4': lambda: trackers.health.health_menu(),
+        '5': lambda: trackers.expenses.expense_menu(),
+        '6': lambda: trackers.reports.reports_menu(),
+        '7': lambda: trackers.reminders.show_reminders(),
+    }
+    profile_next = False
 
-        elif choice == '4':
-            ht.health_menu()
+    try:
+        while True:
+            display_main_menu()
+            choice = input("Choose an option (1-9): ").strip()
 
-        elif choice == '5':
-            et.expense_menu()
+            if choice in actions:
+                if profile_next:
+                    profile_call(actions[choice])
+                    profile_next = False
+                else:
+                    actions[choice]()
 
-        elif choice == '6':
-            rg.reports_menu()
+            elif choice == '8':
+                profile_next = diagnostics_menu()
 
-        elif choice == '7':
-            print("Take good care of Bailey, Munchkin, Gus & Bunion! 🐾")
-            break
+            elif choice == '9':
+                print("Take good care of Bailey, Munchkin, Gus & Bunion! 🐾")
+                break
 
-        else:
-            print("Invalid choice. Please try again.")
+            else:
+                print("Invalid choice. Please try again.")
+    finally:
+        # Flush anything still queued for the disk, even on Ctrl+C
+        backend.close()
+        print_write_stats(backend.write_stats())
+        if stats_file:
+            registry.dump(stats_file)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
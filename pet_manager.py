@@ -1,28 +1,28 @@
-import json
-import os
+import itertools
 from datetime import datetime
 
+from backends import shared_backend
+
 class PetManager:
-    def __init__(self, data_file='data/pets.json'):
-        self.data_file = data_file
-        self.ensure_data_directory()
-        self.pets = self.load_pets()
+    def __init__(self, backend=None):
+        self.backend = backend or shared_backend()
+        self.indexed_generation = None
 
-    def ensure_data_directory(self):
-        """Create data directory if it doesn't exist"""
-        os.makedirs('data', exist_ok=True)
+    @property
+    def pets(self):
+        """The backend's pet profiles, re-indexed whenever they get reloaded"""
+        pets = self.load_pets()
+        if self.indexed_generation != self.backend.generation('pets'):
+            self.build_indexes(pets)
+            self.indexed_generation = self.backend.generation('pets')
+        return pets
 
     def load_pets(self):
-        """Load pets from JSON file"""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                print("Warning: Could not read pets file. Starting fresh.")
-                return {}
-        else:
+        """Load pets from the storage backend"""
+        pets = self.backend.load_pets()
+        if pets is None:
             return self.create_initial_pets()
+        return pets
 
     def create_initial_pets(self):
         """create your initial pet prfiles"""
@@ -70,10 +70,9 @@ class PetManager:
         return initial_pets
 
     def save_pets(self, pets_data=None):
-        """Save pets to JSON file"""
-        data_to_save = pets_data if pets_data else self.pets
-        with open(self.data_file, 'w') as f:
-            json.dump(data_to_save, f, indent=2)
+        """Save pets through the storage backend"""
+        data_to_save = pets_data if pets_data is not None else self.pets
+        self.backend.save_pets(data_to_save)
 
     def view_all_pets(self):
         """Display all pets with their info"""
@@ -90,14 +89,102 @@ class PetManager:
                 print(f"   💊 MEDICATION: {pet['medication_time']}")
                 
 
+    def build_indexes(self, pets):
+        """Rebuild the lookup indexes from scratch"""
+        self.name_index = {}
+        self.type_index = {}
+        self.species_index = {}
+        self.special_needs_index = {}
+        # Profile order, so set lookups can hand back pets in the order they were added
+        self.positions = {}
+        self.next_position = itertools.count()
+        for pet_id, pet in pets.items():
+            self.index_pet(pet_id, pet)
+
+    def index_pet(self, pet_id, pet):
+        """Add a pet to the name/type/species/special needs indexes"""
+        if pet_id not in self.positions:
+            self.positions[pet_id] = next(self.next_position)
+        self.name_index.setdefault(pet['name'].casefold(), []).append(pet_id)
+        self.type_index.setdefault(pet['type'].casefold(), set()).add(pet_id)
+        self.species_index.setdefault(pet['species'].casefold(), set()).add(pet_id)
+        for need in pet.get('special_needs', []):
+            self.special_needs_index.setdefault(need.casefold(), set()).add(pet_id)
+
+    def unindex_pet(self, pet_id, pet):
+        """Remove a pet from the indexes, dropping keys nobody uses anymore"""
+        name = pet['name'].casefold()
+        self.name_index[name].remove(pet_id)
+        if not self.name_index[name]:
+            del self.name_index[name]
+
+        keys = [(self.type_index, pet['type'].casefold()), (self.species_index, pet['species'].casefold())]
+        keys += [(self.special_needs_index, need.casefold()) for need in pet.get('special_needs', [])]
+        for index, key in keys:
+            index[key].discard(pet_id)
+            if not index[key]:
+                del index[key]
+
+    def add_pet(self, pet_id, pet):
+        """Add a new pet profile"""
+        pets = self.pets
+        if pet_id in pets:
+            raise ValueError(f"A pet with id '{pet_id}' already exists")
+        pet.setdefault('created_date', datetime.now().strftime('%Y-%m-%d'))
+        pets[pet_id] = pet
+        self.index_pet(pet_id, pet)
+        self.save_pets(pets)
+
+    def update_pet(self, pet_id, **changes):
+        """Change fields on an existing pet profile"""
+        pets = self.pets
+        pet = pets[pet_id]
+        self.unindex_pet(pet_id, pet)
+        pet.update(changes)
+        self.index_pet(pet_id, pet)
+        self.save_pets(pets)
+
+    def remove_pet(self, pet_id):
+        """Remove a pet profile"""
+        pets = self.pets
+        pet = pets.pop(pet_id)
+        self.unindex_pet(pet_id, pet)
+        del self.positions[pet_id]
+        self.save_pets(pets)
+
     def get_pet_by_name(self, name):
         """Find pet by name (case insensitive)"""
-        for pet_id, pet in self.pets.items():
-            if pet['name'].lower() == name.lower():
-                return pet_id, pet
+        pets = self.pets
+        pet_ids = self.name_index.get(name.casefold())
+        if pet_ids:
+            return pet_ids[0], pets[pet_ids[0]]
         return None, None
 
+    def in_profile_order(self, pets, pet_ids):
+        """{pet_id: pet} for the ids, in the order the profiles were added"""
+        return {pid: pets[pid] for pid in sorted(pet_ids, key=self.positions.__getitem__)}
+
     def get_pets_by_type(self, pet_type):
         """Get all pets of a specific type (bird/rabbit)"""
-        return {pid: pet for pid, pet in self.pets.items() if pet['type'] == pet_type}
-    
+        pets = self.pets
+        return self.in_profile_order(pets, self.type_index.get(pet_type.casefold(), ()))
+
+    def find_pets(self, pet_type=None, species=None, special_need=None):
+        """Pets matching every filter given, e.g. find_pets('bird', special_need='daily_medication')"""
+        pets = self.pets
+        matches = []
+        if pet_type is not None:
+            matches.append(self.type_index.get(pet_type, set()))
+        if species is not None:
+            matches.append(self.species_index.get(species.casefold(), set()))
+        if special_need is not None:
+            matches.append(self.special_needs_index.get(special_need.casefold(), set()))
+        if not matches:
+            return dict(pets)
+
+        # Intersect starting from the smallest set so the work is bounded by it
+        matches.sort(key=len)
+        pet_ids = set(matches[0])
+        for other in matches[1:]:
+            pet_ids &= other
+        return self.in_profile_order(pets, pet_ids)
@@ -0,0 +1,88 @@
+"""A pet's history across care logs, medications, observations and expenses.
+
+    for entry in timeline('Gus', '2021-01-01', '2025-12-31', kinds=('medication', 'expense')):
+        print(format_entry(entry))
+
+Each source yields its records already in date order, and timeline()
+heap-merges them lazily, so printing five years for one animal holds one
+record per source at a time (plus whatever the backend already caches).
+"""
+import heapq
+from collections import namedtuple
+from itertools import islice
+
+from backends import shared_backend
+
+KINDS = ('care', 'medication', 'observation', 'expense')
+
+# Same day and time: care, then medications, observations, expenses
+KIND_ORDER = {kind: position for position, kind in enumerate(KINDS)}
+
+TimelineEntry = namedtuple('TimelineEntry', 'date time kind pet record')
+
+def care_entries(backend, pet_name, start, end):
+    for day, pet, activity in backend.care_activities_between(pet_name, start, end):
+        yield TimelineEntry(day, activity['time'] or '', 'care', pet, activity)
+
+def medication_entries(backend, pet_name, start, end):
+    for record in backend.health_records_between('medications', pet_name, start, end):
+        yield TimelineEntry(record['date'], record.get('time') or '', 'medication', record.get('pet_name'), record)
+
+def observation_entries(backend, pet_name, start, end):
+    for record in backend.health_records_between('health_observations', pet_name, start, end):
+        yield TimelineEntry(record['date'], '', 'observation', record.get('pet_name'), record)
+
+def expense_entries(backend, pet_name, start, end):
+    for expense in backend.expenses_between(pet_name, start, end):
+        yield TimelineEntry(expense['date'], '', 'expense', expense.get('pet'), expense)
+
+SOURCES = {
+    'care': care_entries,
+    'medication': medication_entries,
+    'observation': observation_entries,
+    'expense': expense_entries,
+}
+
+def sort_key(entry):
+    return (entry.date, entry.time, KIND_ORDER[entry.kind])
+
+def timeline(pet_name, start=None, end=None, kinds=KINDS, backend=None):
+    """Lazily yield TimelineEntry(date, time, kind, pet, record) for one pet
+    (or every pet with pet_name=None), oldest first.
+
+    start and end are inclusive 'YYYY-MM-DD' dates (None for open-ended);
+    kinds picks any of 'care', 'medication', 'observation' and 'expense'.
+    Records without a time sort at the start of their day.
+    """
+    backend = backend or shared_backend()
+    unknown = set(kinds) - set(KINDS)
+    if unknown:
+        raise ValueError(f"unknown timeline kinds: {', '.join(sorted(unknown))}")
+    sources = [SOURCES[kind](backend, pet_name, start, end) for kind in KINDS if kind in kinds]
+    return heapq.merge(*sources, key=sort_key)
+
+def timeline_page(pet_name, start=None, end=None, kinds=KINDS, page=1, per_page=50, backend=None):
+    """(entries, has_more) for one page of a timeline; pages count from 1"""
+    if page < 1 or per_page < 1:
+        raise ValueError("page and per_page start at 1")
+    entries = timeline(pet_name, start, end, kinds, backend)
+    rows = list(islice(entries, (page - 1) * per_page, page * per_page + 1))
+    return rows[:per_page], len(rows) > per_page
+
+def format_entry(entry):
+    """One printable line for a timeline entry"""
+    record = entry.record
+    when = f"{entry.date} {entry.time or '     '}"
+    if entry.kind == 'care':
+        text = f"🐾 {record['activity']}"
+    elif entry.kind == 'medication':
+        text = f"💊 {record.get('medication', '')}"
+    elif entry.kind == 'observation':
+        text = f"👀 {record.get('observation', '')}"
+    else:
+        text = f"💰 ${record.get('amount', 0):.2f} {record.get('category', '')}"
+        if record.get('description'):
+            text += f": {record['description']}"
+    if entry.kind != 'expense' and record.get('notes'):
+        text += f" ({record['notes']})"
+    return f"{when}  {text}"
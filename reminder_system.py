@@ -0,0 +1,219 @@
+import heapq
+import itertools
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+# When in the day each routine item is expected to happen
+ROUTINE_TIMES = {
+    'morning_wakeup': '07:00',
+    'hay_check': '08:00',
+    'pellet_check': '08:00',
+    'food_topup': '09:00',
+    'snackies': '10:00',
+    'poo_patrol': '11:00',
+    'afternoon_medication': '14:00',
+    'treats': '15:00',
+    'playtime': '16:00',
+    'dinner': '17:00',
+    'bedtime': '20:00',
+    'water_fountain_maintenance': '10:00',
+    'litter_box_cleaning': '10:00',
+}
+DEFAULT_ROUTINE_TIME = '12:00'
+MEDICATION_TIMES = {'morning': '08:00', 'afternoon': '14:00', 'evening': '18:00', 'night': '21:00'}
+CHECK_TIME = '18:00'
+# Tasks that are done by adding a health record rather than a care log entry
+HEALTH_RECORD_TASKS = {'grooming': 'grooming_appointments'}
+
+class CareTask:
+    """One recurring thing a pet needs, e.g. Gus's afternoon medication every day"""
+
+    def __init__(self, pet_name, pet_type, activity, time_of_day, period_days, check=False):
+        self.pet_name = pet_name
+        self.pet_type = pet_type
+        self.activity = activity
+        self.time_of_day = time_of_day
+        self.period_days = period_days
+        # Something to keep an eye on (e.g. monitor_arthritis) rather than
+        # a chore that gets logged, so it's never due or overdue
+        self.check = check
+
+    @property
+    def key(self):
+        return (self.pet_name, self.activity)
+
+    def due_on(self, day):
+        hour, minute = (int(part) for part in self.time_of_day.split(':'))
+        return datetime(day.year, day.month, day.day, hour, minute)
+
+    def describe(self):
+        emoji = "💊" if 'medication' in self.activity else {"bird": "🦜", "rabbit": "🐰"}.get(self.pet_type, "🐾")
+        every = {1: "daily", 7: "weekly"}.get(self.period_days, f"every {self.period_days} days")
+        return f"{emoji} {self.pet_name}: {self.activity.replace('_', ' ')} ({every}, {self.time_of_day})"
+
+def tasks_for_pet(pet):
+    """Derive the recurring tasks from a pet profile"""
+    tasks = {}
+
+    def add(activity, time_of_day, period_days, check=False):
+        if activity not in tasks:
+            tasks[activity] = CareTask(pet['name'], pet['type'], activity, time_of_day, period_days, check)
+
+    medication_time = MEDICATION_TIMES.get(pet.get('medication_time'))
+    for item in pet.get('daily_routine', []):
+        if 'medication' in item and medication_time:
+            add(item, medication_time, 1)
+        else:
+            add(item, ROUTINE_TIMES.get(item, DEFAULT_ROUTINE_TIME), 1)
+    for item in pet.get('weekly_routine', []):
+        add(item, ROUTINE_TIMES.get(item, DEFAULT_ROUTINE_TIME), 7)
+
+    for need in pet.get('special_needs', []):
+        every_months = re.search(r'(\w+?)_every_(\d+)_months', need)
+        if every_months:
+            add(every_months.group(1), DEFAULT_ROUTINE_TIME, int(every_months.group(2)) * 30)
+        elif need == 'daily_medication':
+            # Usually already covered by a *_medication routine item
+            if not any('medication' in activity for activity in tasks):
+                add('medication', medication_time or MEDICATION_TIMES['afternoon'], 1)
+        else:
+            add(need, CHECK_TIME, 1, check=True)
+    return list(tasks.values())
+
+class ReminderScheduler:
+    """Keeps every pet's recurring tasks in a heap ordered by next due time.
+
+    Asking what's due only pops tasks off the front of the heap, so it costs
+    O(log n) per due task no matter how many pets and routine items there
+    are. Completion is checked against the CareLogger entries for the
+    task's period (today for daily tasks, the last week for weekly ones),
+    and for grooming against the HealthTracker's grooming appointments.
+    Checks from special_needs aren't queued; they're listed in self.checks.
+    """
+
+    def __init__(self, pet_manager, care_logger, health_tracker=None, now=None):
+        self.pet_manager = pet_manager
+        self.care_logger = care_logger
+        self.health_tracker = health_tracker
+        self.counter = itertools.count()
+        self.queue = []
+        self.checks = []
+        self.pets_generation = None
+        self.build(now or datetime.now())
+
+    def logged_activities(self, pet_name, day):
+        day_logs = self.care_logger.care_logs.get(day.strftime('%Y-%m-%d'), {})
+        return {activity['activity'] for activity in day_logs.get(pet_name, [])}
+
+    def last_done(self, task, today):
+        """Most recent day within the task's period on which it was logged"""
+        first_day = today - timedelta(days=task.period_days - 1)
+        kind = HEALTH_RECORD_TASKS.get(task.activity)
+        if kind and self.health_tracker:
+            records = self.health_tracker.records_between(
+                kind, task.pet_name, first_day.strftime('%Y-%m-%d'), today.strftime('%Y-%m-%d'))
+            if records:
+                return datetime.strptime(records[-1]['date'], '%Y-%m-%d').date()
+        for days_ago in range(task.period_days):
+            day = today - timedelta(days=days_ago)
+            if task.activity in self.logged_activities(task.pet_name, day):
+                return day
+        return None
+
+    def next_due(self, task, today):
+        """When the task's current occurrence is due"""
+        done = self.last_done(task, today)
+        if done is None:
+            return task.due_on(today)
+        return task.due_on(done + timedelta(days=task.period_days))
+
+    def push(self, due, task):
+        heapq.heappush(self.queue, (due, next(self.counter), task))
+
+    def build(self, now):
+        """Derive tasks from every pet profile and queue them"""
+        self.queue = []
+        self.checks = []
+        for pet in self.pet_manager.pets.values():
+            for task in tasks_for_pet(pet):
+                if task.check:
+                    self.checks.append(task)
+                else:
+                    self.push(self.next_due(task, now.date()), task)
+        self.pets_generation = self.pet_manager.backend.generation('pets')
+
+    def due_tasks(self, now=None):
+        """Tasks that are due or overdue, as (due time, task), earliest first"""
+        now = now or datetime.now()
+        self.pet_manager.pets  # picks up profile changes made on disk
+        if self.pets_generation != self.pet_manager.backend.generation('pets'):
+            self.build(now)
+        due = []
+        while self.queue and self.queue[0][0] <= now:
+            due_at, _, task = heapq.heappop(self.queue)
+            # Logged since we queued it? Move it on to its next occurrence.
+            actual = self.next_due(task, now.date())
+            if actual > due_at:
+                self.push(actual, task)
+            else:
+                due.append((due_at, task))
+        for due_at, task in due:
+            self.push(due_at, task)
+        return due
+
+    def upcoming(self, limit=5):
+        """The next few tasks in due order without changing the queue"""
+        return [(due_at, task) for due_at, _, task in heapq.nsmallest(limit, self.queue)]
+
+    def show_reminders(self, now=None):
+        now = now or datetime.now()
+        due = self.due_tasks(now)
+        print("\n⏰ REMINDERS:")
+        print("=" * 50)
+        if not due:
+            print("Nothing due right now. 🎉")
+        for due_at, task in due:
+            status = "OVERDUE" if due_at.date() < now.date() or now - due_at > timedelta(hours=1) else "due"
+            print(f"   {task.describe()} - {status} since {due_at.strftime('%Y-%m-%d %H:%M')}")
+        if self.checks:
+            print("\nKeep an eye on:")
+            for task in self.checks:
+                print(f"   {task.describe()}")
+
+        coming = [(due_at, task) for due_at, task in self.upcoming(len(due) + 5) if due_at > now][:5]
+        if coming:
+            print("\nComing up:")
+            for due_at, task in coming:
+                print(f"   {due_at.strftime('%a %H:%M')} - {task.describe()}")
+
+    def run(self, tick=60, iterations=None):
+        """Print reminders as tasks come due, checking every tick seconds.
+
+        Activities logged from another terminal show up on their own since
+        the backend reloads files that changed on disk.
+        """
+        announced = set()
+        for _ in itertools.count() if iterations is None else range(iterations):
+            for due_at, task in self.due_tasks():
+                if (task.key, due_at) not in announced:
+                    announced.add((task.key, due_at))
+                    print(f"⏰ {datetime.now().strftime('%H:%M')} {task.describe()} is due")
+            time.sleep(tick)
+
+if __name__ == "__main__":
+    from backends import backend_from_env
+    from care_logger import CareLogger
+    from health_tracker import HealthTracker
+    from pet_manager import PetManager
+
+    tick = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+    backend = backend_from_env()
+    scheduler = ReminderScheduler(PetManager(backend), CareLogger(backend), HealthTracker(backend))
+
+    print(f"Watching for due care tasks every {tick:g}s (Ctrl+C to stop)")
+    try:
+        scheduler.run(tick)
+    except KeyboardInterrupt:
+        pass
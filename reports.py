@@ -1,22 +1,17 @@
-import json
-import os
 from datetime import datetime, date, timedelta
 from collections import Counter
 
+from backends import shared_backend
+from compliance import ComplianceIndex, last_days
+from instrumentation import timed
+from rollups import RollupCache
+
 class ReportGenerator:
-    def __init__(self, care_file='data/daily_care.json', health_file='data/health_records.json', expense_file='data/expenses.json'):
-        self.care_data = self.load_json(care_file)
-        self.health_data = self.load_json(health_file)
-        self.expense_data = self.load_json(expense_file)
-    
-    def load_json(self, filename):
-        if os.path.exists(filename):
-            try:
-                with open(filename, 'r') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+    def __init__(self, backend=None, rollups=None, reminders=None):
+        self.backend = backend or shared_backend()
+        self.rollups = rollups or RollupCache(self.backend)
+        self.reminders = reminders
+        self.compliance = ComplianceIndex(self.rollups)
     
     def reports_menu(self):
         print("\n📊 REPORTS & ANALYTICS:")
@@ -26,7 +21,12 @@ class ReportGenerator:
         print("3. Health tracking summary")
         print("4. Expense overview")
         print("5. Full dashboard")
-        print("6. Back to main menu")
+        print("6. Rebuild report cache")
+        print("7. Check report cache")
+        print("8. Pet timeline")
+        print("9. Search notes")
+        print("10. Routine compliance")
+        print("11. Back to main menu")
         
         choice = input("\nReport option: ").strip()
         
@@ -41,20 +41,90 @@ class ReportGenerator:
         elif choice == '5':
             self.full_dashboard()
         elif choice == '6':
+            self.rollups.rebuild()
+            print("✅ Report cache rebuilt")
+        elif choice == '7':
+            self.check_rollups()
+        elif choice == '8':
+            self.pet_timeline()
+        elif choice == '9':
+            self.search_notes()
+        elif choice == '10':
+            days = input("Days to look back (Enter for 30): ").strip()
+            self.compliance_report(int(days) if days.isdigit() and int(days) > 0 else 30)
+        elif choice == '11':
+            return
+    
+    @timed('report')
+    def check_rollups(self):
+        problems = self.rollups.check()
+        if not problems:
+            print("✅ Report cache matches the logged data")
             return
+        print(f"❌ Report cache is out of date ({len(problems)} differences):")
+        for problem in problems[:10]:
+            print(f"   {problem}")
+        print("Use 'Rebuild report cache' to fix it.")
     
+    def pet_timeline(self, page_size=20):
+        """Page through one pet's care, medications, observations and expenses"""
+        from query import format_entry, timeline
+
+        pet_name = input("Pet name: ").strip()
+        start = input("From date (YYYY-MM-DD, Enter for the beginning): ").strip() or None
+        end = input("To date (YYYY-MM-DD, Enter for the latest): ").strip() or None
+        try:
+            for day in (start, end):
+                if day:
+                    datetime.strptime(day, '%Y-%m-%d')
+        except ValueError:
+            print("❌ Dates must look like 2024-01-31")
+            return
+
+        print(f"\n🗓️  TIMELINE FOR {pet_name.upper()}:")
+        print("=" * 50)
+        shown = 0
+        for entry in timeline(pet_name, start, end, backend=self.backend):
+            if shown and shown % page_size == 0:
+                if input("-- Enter for more, q to stop -- ").strip().lower() == 'q':
+                    return
+            print(format_entry(entry))
+            shown += 1
+        if not shown:
+            print("Nothing recorded for that pet and dates.")
+    
+    def search_notes(self, limit=20):
+        """Find words in care notes, health records and expense descriptions"""
+        from search import SearchIndex, format_hit
+
+        query = input("Search for: ").strip()
+        pet_name = input("Pet name (Enter for all pets): ").strip() or None
+        hits = SearchIndex(self.backend).search(query, pet_name)
+        print(f"\n🔎 {len(hits)} MATCHES FOR '{query}':")
+        print("=" * 50)
+        for hit in hits[:limit]:
+            print(format_hit(hit))
+        if len(hits) > limit:
+            print(f"... and {len(hits) - limit} older matches")
+    
+    def weekly_counts(self, today=None):
+        """{date: activities logged} for the last 7 days, today first (0 for days without any)"""
+        today = today or date.today()
+        week_dates = [(today - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(7)]
+        self.rollups.refresh()
+        day_counts = self.rollups.activity_counts_by_day(week_dates)
+        return {date_str: day_counts.get(date_str, 0) for date_str in week_dates}
+    
+    @timed('report')
     def weekly_care_summary(self):
         print("\n📅 WEEKLY CARE SUMMARY:")
         print("=" * 50)
         
         # Get last 7 days of data
-        today = date.today()
-        week_dates = [(today - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(7)]
-        
+        week_counts = self.weekly_counts()
         total_activities = 0
-        for date_str in week_dates:
-            if date_str in self.care_data:
-                day_activities = sum(len(activities) for activities in self.care_data[date_str].values())
+        for date_str, day_activities in week_counts.items():
+            if day_activities:
                 total_activities += day_activities
                 print(f"{date_str}: {day_activities} activities logged")
             else:
@@ -63,49 +133,103 @@ class ReportGenerator:
         print(f"\nTotal activities this week: {total_activities}")
         print(f"Average per day: {total_activities/7:.1f}")
     
+    @timed('report')
     def pet_activity_overview(self):
         print("\n🐾 PET ACTIVITY OVERVIEW:")
         print("=" * 50)
         
         pet_counts = {'Bailey': 0, 'Munchkin': 0, 'Gus': 0, 'Bunion': 0}
         
-        for date_data in self.care_data.values():
-            for pet, activities in date_data.items():
-                if pet in pet_counts:
-                    pet_counts[pet] += len(activities)
+        self.rollups.refresh()
+        for pet, count in self.rollups.activity_counts_by_pet().items():
+            if pet in pet_counts:
+                pet_counts[pet] = count
         
         for pet, count in pet_counts.items():
             pet_emoji = "🦜" if pet in ["Bailey", "Munchkin", "Gus"] else "🐰"
             print(f"{pet_emoji} {pet}: {count} activities logged")
     
+    @timed('report')
+    def compliance_report(self, days=30, missed_shown=5):
+        """How often each pet's daily and weekly routine items got done over the last days"""
+        from pet_manager import PetManager
+
+        start, end = last_days(days)
+        print(f"\n✅ ROUTINE COMPLIANCE ({days} days to {end.strftime('%Y-%m-%d')}):")
+        print("=" * 60)
+        self.compliance.refresh()
+        pets = PetManager(self.backend).pets
+        results = self.compliance.routine_adherence(pets, start, end)
+        if not any(result.periods for result in results):
+            print("No care logged for these days yet.")
+            return results
+
+        missed_pets = []
+        for pet in pets.values():
+            pet_results = [result for result in results if result.pet == pet['name'] and result.periods]
+            if not pet_results:
+                continue
+            pet_emoji = {"bird": "🦜", "rabbit": "🐰"}.get(pet.get('type'), "🐾")
+            print(f"\n{pet_emoji} {pet['name']}:")
+            for result in pet_results:
+                unit = "days" if result.period_days == 1 else "weeks"
+                print(f"   {result.item:<28}{result.done:>4}/{result.periods:<4}{unit:<6}{result.percent:>4.0f}%"
+                      f"   streak {result.current_streak} (best {result.longest_streak})")
+                if result.missed:
+                    shown = ', '.join(result.missed[-missed_shown:])
+                    more = f" and {len(result.missed) - missed_shown} more" if len(result.missed) > missed_shown else ""
+                    print(f"      missed {shown}{more}")
+                    if result.period_days == 1 and pet['name'] not in missed_pets:
+                        missed_pets.append(pet['name'])
+
+        print()
+        if missed_pets:
+            print(f"⚠️  Missed a daily routine item: {', '.join(missed_pets)}")
+        else:
+            print("🎉 Every daily routine item done every day!")
+        return results
+    
+    def summary(self):
+        """The dashboard's totals as a dict"""
+        self.rollups.refresh()
+        total_days_logged, total_activities = self.rollups.care_totals()
+        total_expenses, expense_total = self.rollups.expense_totals()
+        return {
+            'care_days': total_days_logged,
+            'care_activities': total_activities,
+            'health_records': self.backend.health_record_count(),
+            'expenses': total_expenses,
+            'expense_total': expense_total,
+            'activities_by_pet': self.rollups.activity_counts_by_pet(),
+        }
+    
+    @timed('report')
     def full_dashboard(self):
         print("\n" + "="*60)
         print("🐾 PETCARE PRO DASHBOARD")
         print("="*60)
         
         # Quick stats
-        total_days_logged = len(self.care_data)
-        total_activities = sum(sum(len(activities) for activities in day_data.values()) for day_data in self.care_data.values())
-        
-        health_records = 0
-        if isinstance(self.health_data, dict):
-            for record_type in self.health_data.values():
-                if isinstance(record_type, list):
-                    health_records += len(record_type)
-        
-        total_expenses = len(self.expense_data) if isinstance(self.expense_data, list) else 0
-        expense_total = sum(e.get('amount', 0) for e in self.expense_data) if isinstance(self.expense_data, list) else 0
-        
-        print(f"📅 Days with logged activities: {total_days_logged}")
-        print(f"🎯 Total care activities: {total_activities}")
-        print(f"🏥 Health records: {health_records}")
-        print(f"💰 Expenses tracked: {total_expenses} (${expense_total:.2f})")
+        summary = self.summary()
+        print(f"📅 Days with logged activities: {summary['care_days']}")
+        print(f"🎯 Total care activities: {summary['care_activities']}")
+        print(f"🏥 Health records: {summary['health_records']}")
+        print(f"💰 Expenses tracked: {summary['expenses']} (${summary['expense_total']:.2f})")
         
         print(f"\n🦜 Your Birds: Bailey (Caique), Munchkin (Hahn's Macaw), Gus (Amazon)")
         print(f"🐰 Your Rabbit: Bunion (European Rabbit)")
         
         print(f"\n⚠️  Daily Reminders:")
-        print(f"   💊 Gus needs afternoon medication")
-        print(f"   🦜 Check Munchkin's feather condition")
-        print(f"   🦜 Monitor Bailey's arthritis")
-        print(f"   🐰 Bunion's grooming every 3 months")
+        if self.reminders is None:
+            print(f"   💊 Gus needs afternoon medication")
+            print(f"   🦜 Check Munchkin's feather condition")
+            print(f"   🦜 Monitor Bailey's arthritis")
+            print(f"   🐰 Bunion's grooming every 3 months")
+            return
+        due = self.reminders.due_tasks()
+        if not due:
+            print("   Everything's done for now! 🎉")
+        for due_at, task in due:
+            print(f"   {task.describe()} - due {due_at.strftime('%H:%M')}")
+        for task in self.reminders.checks:
+            print(f"   {task.describe()} - keep an eye on")
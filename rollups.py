@@ -0,0 +1,271 @@
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from care_records import activity_counts
+from care_shards import month_of
+from instrumentation import timed
+from storage import atomic_write, dump_json, read_json_file
+
+ROLLUP_VERSION = 2
+
+# Below this many months a process pool costs more than it saves
+MIN_PARALLEL_MONTHS = 12
+
+def to_cents(amount):
+    return int(round(amount * 100))
+
+def empty_rollups(backend_name):
+    return {
+        'version': ROLLUP_VERSION,
+        # High-water marks are positions in a particular backend's data
+        'backend': backend_name,
+        # Everything up to and including this day has been counted. The day
+        # itself is recounted on refresh since it may still be getting logs.
+        'care_high_water': None,
+        'expense_high_water': None,
+        # Each month's storage stamp as of its last count, to notice
+        # records that arrive behind the high-water mark
+        'care_month_stamps': {},
+        'care_days': {},
+        'care_by_pet': {},
+        'care_activities': 0,
+        'expense_days': {},
+        'expense_count': 0,
+        'expense_cents': 0,
+    }
+
+def default_workers():
+    """PETCARE_WORKERS, or one worker per CPU"""
+    return int(os.environ.get('PETCARE_WORKERS') or 0) or os.cpu_count() or 1
+
+# Each worker process opens the storage once and keeps it here
+worker_backend = None
+
+def start_worker(backend_class, args):
+    global worker_backend
+    worker_backend = backend_class(*args)
+
+def count_month(month):
+    """Map step, run in a worker: one month's {date: {pet: {activity: count}}}"""
+    return worker_backend.care_month_counts(month, from_disk=True)
+
+class RollupCache:
+    """Pre-aggregated counts the reports read instead of the raw history.
+
+    Keeps per-day {pet: {activity_type: count}} for care logs and per-day
+    {category: {pet: cents}} for expenses, plus running totals, in
+    data/rollups.json. A high-water mark for each dataset means refresh()
+    only looks at records added since the last time, so opening a report
+    costs the number of days shown rather than the size of the history.
+    Care months whose storage stamp changed at or before the mark (an
+    edited shard, a migration, another writer's back-dated records) are
+    recounted. The JSON backend only sees that once the journal is
+    compacted, and unsharded JSON can't tell at all (use rebuild()).
+
+    Counting the whole history (a rebuild, a check or the first refresh)
+    is split into per-month counts that run on up to workers processes
+    and are then merged; workers=1 counts in this process.
+    """
+
+    def __init__(self, backend, rollup_file=None, workers=None):
+        self.backend = backend
+        self.rollup_file = rollup_file or os.path.join(backend.data_dir, 'rollups.json')
+        self.backend_name = type(backend).__name__
+        self.workers = workers or default_workers()
+        self.rollups = self.load_rollups()
+
+    def load_rollups(self):
+        if os.path.exists(self.rollup_file):
+            try:
+                rollups = read_json_file(self.rollup_file)
+                if rollups.get('version') == ROLLUP_VERSION and rollups.get('backend') == self.backend_name:
+                    return rollups
+            except json.JSONDecodeError:
+                pass
+        return empty_rollups(self.backend_name)
+
+    def save_rollups(self):
+        atomic_write(self.rollup_file, dump_json(self.rollups, self.rollup_file, indent=None))
+
+    def add_day(self, rollups, day, day_logs, sign=1):
+        """Add (or with sign=-1 remove) one day's care activities"""
+        if sign > 0:
+            self.add_day_counts(rollups, day, activity_counts(day_logs))
+        else:
+            self.add_day_counts(rollups, day, rollups['care_days'].pop(day, {}), sign)
+
+    def add_day_counts(self, rollups, day, day_counts, sign=1):
+        if sign > 0:
+            rollups['care_days'][day] = day_counts
+        for pet, pet_counts in day_counts.items():
+            count = sum(pet_counts.values()) * sign
+            rollups['care_by_pet'][pet] = rollups['care_by_pet'].get(pet, 0) + count
+            rollups['care_activities'] += count
+
+    def add_expense(self, rollups, expense):
+        cents = to_cents(expense.get('amount', 0))
+        by_category = rollups['expense_days'].setdefault(expense['date'], {})
+        by_pet = by_category.setdefault(expense.get('category', ''), {})
+        by_pet[expense.get('pet', '')] = by_pet.get(expense.get('pet', ''), 0) + cents
+        rollups['expense_count'] += 1
+        rollups['expense_cents'] += cents
+
+    def json_stamps(self):
+        stamps = self.backend.care_month_stamps()
+        if stamps is None:
+            return None
+        return {month: list(stamp) if stamp is not None else None for month, stamp in stamps.items()}
+
+    def recount_changed_months(self, rollups, high_water):
+        """Recount the months up to high_water's whose storage changed since
+        they were counted, returns True if any did"""
+        stamps = self.json_stamps()
+        if stamps is None:
+            return False
+        known = rollups['care_month_stamps']
+        rollups['care_month_stamps'] = stamps
+        if high_water is None:
+            return False
+        changed = sorted(month for month in set(stamps) | set(known)
+                         if month <= month_of(high_water) and stamps.get(month) != known.get(month))
+        # Days past high_water are left for care_days_since to add
+        for month in changed:
+            for day in [day for day in rollups['care_days'] if month_of(day) == month and day <= high_water]:
+                self.add_day(rollups, day, {}, sign=-1)
+            for day, day_counts in sorted(self.backend.care_month_counts(month).items()):
+                if day <= high_water:
+                    self.add_day_counts(rollups, day, day_counts)
+        return bool(changed)
+
+    def catch_up(self, rollups):
+        """Fold records past the high-water marks into rollups, returns True if anything changed"""
+        high_water = rollups['care_high_water']
+        changed = self.recount_changed_months(rollups, high_water)
+        previous = rollups['care_days'].get(high_water)
+        if high_water is not None:
+            self.add_day(rollups, high_water, {}, sign=-1)
+        for day, day_logs in self.backend.care_days_since(high_water):
+            self.add_day(rollups, day, day_logs)
+            rollups['care_high_water'] = day
+            changed = changed or day != high_water or rollups['care_days'][day] != previous
+
+        new_expenses, position = self.backend.expenses_since(rollups['expense_high_water'])
+        for expense in new_expenses:
+            self.add_expense(rollups, expense)
+            changed = True
+        rollups['expense_high_water'] = position
+        return changed
+
+    def month_counts(self):
+        """Map: {month: {date: counts}} for the whole care history.
+
+        Months a worker can read from storage are farmed out to a process
+        pool; months that only exist in memory (journaled, unsaved) and
+        everything on a pool failure are counted here.
+        """
+        months = self.backend.care_months()
+        spec = self.backend.worker_spec()
+        detached = self.backend.worker_months() if spec else []
+
+        counts = {}
+        if self.workers > 1 and len(detached) >= MIN_PARALLEL_MONTHS:
+            workers = min(self.workers, len(detached))
+            try:
+                with ProcessPoolExecutor(workers, initializer=start_worker, initargs=spec) as pool:
+                    chunksize = max(1, len(detached) // (workers * 4))
+                    counts = dict(zip(detached, pool.map(count_month, detached, chunksize=chunksize)))
+            except (OSError, BrokenProcessPool) as error:
+                print(f"Warning: counting the history in one process ({error})")
+                counts = {}
+        detached = set(detached)
+        for month in months:
+            if month not in counts:
+                counts[month] = self.backend.care_month_counts(month, from_disk=month in detached)
+        return counts
+
+    def count_history(self, rollups):
+        """Fill empty rollups from the whole history: count each month, then merge"""
+        # Stamped before counting, so a write during the count gets recounted
+        rollups['care_month_stamps'] = self.json_stamps() or {}
+        for month, month_counts in sorted(self.month_counts().items()):
+            for day in sorted(month_counts):
+                self.add_day_counts(rollups, day, month_counts[day])
+        if rollups['care_days']:
+            rollups['care_high_water'] = max(rollups['care_days'])
+        # Picks up the expenses and anything logged while the months were counted
+        self.catch_up(rollups)
+
+    @timed('rollups')
+    def refresh(self):
+        """Bring the rollups up to date with records logged since the last refresh"""
+        if self.rollups['care_high_water'] is None and self.rollups['expense_high_water'] is None:
+            self.count_history(self.rollups)
+            self.save_rollups()
+        elif self.catch_up(self.rollups):
+            self.save_rollups()
+
+    @timed('rollups')
+    def rebuild(self):
+        """Throw the rollups away and recompute them from the raw data"""
+        self.rollups = empty_rollups(self.backend_name)
+        self.count_history(self.rollups)
+        self.save_rollups()
+
+    def check(self):
+        """Compare the stored rollups against a fresh pass over the raw data.
+
+        Returns a list of human readable differences, empty when consistent.
+        """
+        self.refresh()
+        fresh = empty_rollups(self.backend_name)
+        self.count_history(fresh)
+
+        problems = []
+        for key in ('care_days', 'care_by_pet', 'expense_days'):
+            stored, expected = self.rollups[key], fresh[key]
+            for item in sorted(set(stored) | set(expected)):
+                if stored.get(item) != expected.get(item):
+                    problems.append(f"{key}[{item}]: cached {stored.get(item)} but data has {expected.get(item)}")
+        for key in ('care_activities', 'expense_count', 'expense_cents'):
+            if self.rollups[key] != fresh[key]:
+                problems.append(f"{key}: cached {self.rollups[key]} but data has {fresh[key]}")
+        return problems
+
+    # The same report queries StorageBackend answers, served from the rollups
+
+    def activity_counts_by_day(self, days):
+        care_days = self.rollups['care_days']
+        return {day: sum(sum(pet_counts.values()) for pet_counts in care_days[day].values())
+                for day in days if day in care_days}
+
+    def activity_counts_by_pet(self):
+        return dict(self.rollups['care_by_pet'])
+
+    def care_totals(self):
+        return len(self.rollups['care_days']), self.rollups['care_activities']
+
+    def expense_totals(self):
+        return self.rollups['expense_count'], self.rollups['expense_cents'] / 100
+
+if __name__ == "__main__":
+    from backends import open_backend
+    from households import household_data_dir
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'check'
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    backend = open_backend(os.environ.get('PETCARE_BACKEND', 'json'), household_data_dir())
+    cache = RollupCache(backend, workers=workers)
+    if command == 'rebuild':
+        cache.rebuild()
+        print(f"✅ Rebuilt {cache.rollup_file}")
+    elif command == 'check':
+        problems = cache.check()
+        for problem in problems:
+            print(f"❌ {problem}")
+        print("✅ Report cache matches the data" if not problems else f"{len(problems)} differences found")
+    else:
+        print("Usage: python3 rollups.py [check|rebuild] [workers]")
+    backend.close()
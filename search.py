@@ -0,0 +1,222 @@
+import json
+import os
+import re
+import sys
+from collections import namedtuple
+
+from instrumentation import timed
+from storage import atomic_write, dump_json, read_json_file
+
+INDEX_VERSION = 1
+
+# The free text of each kind of record. Records with none aren't indexed.
+CARE_FIELDS = ('notes',)
+HEALTH_FIELDS = {
+    'medications': ('medication', 'notes'),
+    'health_observations': ('observation', 'notes'),
+}
+EXPENSE_FIELDS = ('description',)
+
+# What each document's kind is called in search results
+HEALTH_KINDS = {'medications': 'medication', 'health_observations': 'observation'}
+
+TOKEN = re.compile(r'\w+')
+
+SearchHit = namedtuple('SearchHit', 'date kind pet text')
+
+def tokens(text):
+    """Lowercased words, each once: 'Feather-plucking again' -> {'feather', 'plucking', 'again'}"""
+    return set(TOKEN.findall(text.casefold()))
+
+def record_text(record, fields):
+    return ' | '.join(str(record[field]) for field in fields if record.get(field))
+
+def empty_index(backend_name):
+    return {
+        'version': INDEX_VERSION,
+        # High-water marks are positions in a particular backend's data
+        'backend': backend_name,
+        # As in the rollups, the care high-water day is looked at again on
+        # refresh since it may still be getting logs; care_tail holds the
+        # documents already indexed for it.
+        'care_high_water': None,
+        'care_tail': [],
+        'health_high_water': {kind: None for kind in HEALTH_FIELDS},
+        'expense_high_water': None,
+        # Document id -> [date, kind, pet, text]; None once removed
+        'docs': [],
+        # Token -> ascending document ids
+        'postings': {},
+    }
+
+class SearchIndex:
+    """Inverted index over the free text in care notes, health records and expenses.
+
+    Maps each word to the ids of the documents (one per record with text)
+    that contain it, and keeps every document's date, kind, pet and text
+    so results print without going back to the data. Lives in
+    data/search_index.json and is caught up from high-water marks like
+    the report rollups, so a search only reads what was logged since the
+    last one. Queries are words that must all appear (AND), optionally
+    narrowed to one pet and a date range.
+    """
+
+    def __init__(self, backend, index_file=None):
+        self.backend = backend
+        self.index_file = index_file or os.path.join(backend.data_dir, 'search_index.json')
+        self.backend_name = type(backend).__name__
+        self.index = self.load_index()
+
+    def load_index(self):
+        if os.path.exists(self.index_file):
+            try:
+                index = read_json_file(self.index_file)
+                if index.get('version') == INDEX_VERSION and index.get('backend') == self.backend_name:
+                    return index
+            except json.JSONDecodeError:
+                pass
+        return empty_index(self.backend_name)
+
+    def save_index(self):
+        atomic_write(self.index_file, dump_json(self.index, self.index_file, indent=None))
+
+    def add_document(self, index, day, kind, pet, text):
+        """Index one document, returns its id"""
+        doc_id = len(index['docs'])
+        index['docs'].append([day, kind, pet, text])
+        postings = index['postings']
+        for token in tokens(text):
+            postings.setdefault(token, []).append(doc_id)
+        return doc_id
+
+    def remove_document(self, index, doc_id):
+        day, kind, pet, text = index['docs'][doc_id]
+        postings = index['postings']
+        for token in tokens(text):
+            postings[token].remove(doc_id)
+            if not postings[token]:
+                del postings[token]
+        index['docs'][doc_id] = None
+
+    def care_documents(self, day, day_logs):
+        """[day, 'care', pet, text] for one day's care activities that have notes"""
+        documents = []
+        for pet, activities in day_logs.items():
+            for activity in activities:
+                text = record_text(activity, CARE_FIELDS)
+                if text:
+                    documents.append([day, 'care', pet, f"{activity['activity']}: {text}"])
+        return documents
+
+    def catch_up(self, index):
+        """Index records past the high-water marks, returns True if anything changed"""
+        changed = False
+
+        high_water = index['care_high_water']
+        for day, day_logs in self.backend.care_days_since(high_water):
+            documents = self.care_documents(day, day_logs)
+            if day == high_water:
+                indexed = [index['docs'][doc_id] for doc_id in index['care_tail']]
+                if documents[:len(indexed)] == indexed:
+                    # Only appended to since last time, the usual case
+                    documents = documents[len(indexed):]
+                else:
+                    for doc_id in index['care_tail']:
+                        self.remove_document(index, doc_id)
+                    index['care_tail'] = []
+            else:
+                index['care_tail'] = []
+            for document in documents:
+                index['care_tail'].append(self.add_document(index, *document))
+            index['care_high_water'] = day
+            changed = changed or day != high_water or bool(documents)
+
+        for kind, fields in HEALTH_FIELDS.items():
+            records, position = self.backend.health_records_since(kind, index['health_high_water'][kind])
+            for record in records:
+                text = record_text(record, fields)
+                if text:
+                    self.add_document(index, record['date'], HEALTH_KINDS[kind], record.get('pet_name') or '', text)
+                changed = True
+            index['health_high_water'][kind] = position
+
+        expenses, position = self.backend.expenses_since(index['expense_high_water'])
+        for expense in expenses:
+            text = record_text(expense, EXPENSE_FIELDS)
+            if text:
+                self.add_document(index, expense['date'], 'expense', expense.get('pet') or '', text)
+            changed = True
+        index['expense_high_water'] = position
+        return changed
+
+    @timed('search')
+    def refresh(self):
+        """Bring the index up to date with records logged since the last refresh"""
+        if self.catch_up(self.index):
+            self.save_index()
+
+    @timed('search')
+    def rebuild(self):
+        """Throw the index away and index the whole history again"""
+        self.index = empty_index(self.backend_name)
+        self.catch_up(self.index)
+        self.save_index()
+
+    @timed('search')
+    def search(self, query, pet=None, start=None, end=None, limit=None):
+        """SearchHits for the documents containing every word of query, newest first.
+
+        pet matches case-insensitively; start and end are inclusive
+        'YYYY-MM-DD' dates. An empty query matches nothing.
+        """
+        self.refresh()
+        words = tokens(query)
+        if not words:
+            return []
+        postings = self.index['postings']
+        if any(word not in postings for word in words):
+            return []
+        # Intersect starting from the rarest word
+        ordered = sorted((postings[word] for word in words), key=len)
+        doc_ids = set(ordered[0])
+        for doc_ids_with_word in ordered[1:]:
+            doc_ids.intersection_update(doc_ids_with_word)
+            if not doc_ids:
+                return []
+
+        pet = pet.casefold() if pet else None
+        docs = self.index['docs']
+        hits = []
+        for doc_id in sorted(doc_ids, reverse=True):
+            day, kind, doc_pet, text = docs[doc_id]
+            if (start and day < start) or (end and day > end) or (pet and doc_pet.casefold() != pet):
+                continue
+            hits.append(SearchHit(day, kind, doc_pet, text))
+        hits.sort(key=lambda hit: hit.date, reverse=True)
+        return hits[:limit] if limit else hits
+
+    def stats(self):
+        """(documents, distinct words)"""
+        return sum(1 for doc in self.index['docs'] if doc is not None), len(self.index['postings'])
+
+def format_hit(hit):
+    icon = {'care': '🐾', 'medication': '💊', 'observation': '👀', 'expense': '💰'}[hit.kind]
+    return f"{hit.date}  {icon} {hit.pet}: {hit.text}"
+
+if __name__ == "__main__":
+    from backends import open_backend
+    from households import household_data_dir
+
+    if len(sys.argv) < 2:
+        print("Usage: python3 search.py rebuild | python3 search.py WORD [WORD ...]")
+        sys.exit(1)
+    backend = open_backend(os.environ.get('PETCARE_BACKEND', 'json'), household_data_dir())
+    index = SearchIndex(backend)
+    if sys.argv[1:] == ['rebuild']:
+        index.rebuild()
+        documents, words = index.stats()
+        print(f"✅ Indexed {documents} records ({words} distinct words) into {index.index_file}")
+    else:
+        for hit in index.search(' '.join(sys.argv[1:])):
+            print(format_hit(hit))
+    backend.close()
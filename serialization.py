@@ -0,0 +1,368 @@
+"""Codecs for the data files.
+
+    json     pretty-printed JSON, indent=2 (what the files have always been)
+    compact  JSON without whitespace
+    zlib     compact JSON, zlib-compressed
+    gzip     compact JSON, gzip-compressed
+    records  binary: a string table plus lists of records stored column by column
+    jsonl    one record per line, so records can be appended and the newest
+             read from the end of the file (lists and {kind: [records]} only)
+
+Files keep their .json names whatever the codec; decode() tells the codecs
+apart from the first bytes, so every file can be read without knowing how
+it was written.
+"""
+import io
+import json
+import struct
+import sys
+import zlib
+from array import array
+from collections.abc import Mapping
+
+from care_records import json_default
+
+CODECS = ('json', 'compact', 'zlib', 'gzip', 'records', 'jsonl')
+
+RECORDS_MAGIC = b'PCR1'
+LINES_MAGIC = b'{"format":"petcare-lines"'
+
+# Lists of at least this many dicts with the same keys are stored as columns
+RECORD_RUN = 2
+
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+def to_little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+def from_little_endian(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+class RecordEncoder:
+    """Writes the records format.
+
+    Layout: b'PCR1', the string table (count, uint32 byte lengths, UTF-8
+    blob), then one tagged value. Every string and dict key is an index
+    into the table, so 'snackies' is stored once however many activities
+    use it. A list of dicts sharing the same keys ('r') is stored as one
+    column per key: strings (None allowed) as uint32 indexes, ints as
+    int64, floats as float64, anything else as tagged values.
+
+    Dicts of dicts ending in such lists, like a care log shard's
+    {date: {pet: [activities]}}, are flattened ('g'): the keys and child
+    counts of each level, then all the records as a single 'r' run, so
+    decoding is a few list operations per level instead of a call per day
+    and pet.
+    """
+
+    def __init__(self):
+        # Index 0 stands for None in string columns
+        self.strings = {None: 0}
+        self.body = bytearray()
+
+    def ref(self, string):
+        index = self.strings.get(string)
+        if index is None:
+            index = self.strings[string] = len(self.strings)
+        return index
+
+    def encode(self, value):
+        self.put(value)
+        table = list(self.strings)[1:]
+        encoded = [string.encode() for string in table]
+        lengths = array('I', [len(data) for data in encoded])
+        return b''.join([RECORDS_MAGIC, struct.pack('<I', len(table)), to_little_endian(lengths),
+                         b''.join(encoded), bytes(self.body)])
+
+    def put(self, value):
+        body = self.body
+        if value is None:
+            body += b'N'
+        elif value is True:
+            body += b'T'
+        elif value is False:
+            body += b'F'
+        elif isinstance(value, str):
+            body += b's' + struct.pack('<I', self.ref(value))
+        elif isinstance(value, int):
+            if INT64_MIN <= value <= INT64_MAX:
+                body += b'i' + struct.pack('<q', value)
+            else:
+                body += b'b' + struct.pack('<I', self.ref(str(value)))
+        elif isinstance(value, float):
+            body += b'd' + struct.pack('<d', value)
+        elif isinstance(value, Mapping):
+            groups = self.record_groups(value)
+            if groups is not None:
+                self.put_groups(*groups)
+                return
+            body += b'm' + struct.pack('<I', len(value))
+            for key, item in value.items():
+                if not isinstance(key, str):
+                    raise TypeError(f"keys must be str, not {type(key).__name__}")
+                body += struct.pack('<I', self.ref(key))
+                self.put(item)
+        elif isinstance(value, (list, tuple)):
+            if len(value) >= RECORD_RUN and self.is_record_run(value):
+                self.put_records(value)
+            else:
+                body += b'l' + struct.pack('<I', len(value))
+                for item in value:
+                    self.put(item)
+        else:
+            # Same extension point as json.dumps(default=...)
+            self.put(json_default(value))
+
+    def is_record_run(self, items):
+        if not isinstance(items[0], Mapping):
+            return False
+        keys = list(items[0])
+        return all(isinstance(item, Mapping) and list(item) == keys for item in items)
+
+    def record_groups(self, value):
+        """(levels, leaf counts, records) if value is nested dicts whose
+        leaves are lists of dicts all sharing the same keys, else None"""
+        levels = []
+        nodes = [value]
+        while nodes and all(isinstance(node, Mapping) for node in nodes):
+            keys = [key for node in nodes for key in node]
+            if not all(isinstance(key, str) for key in keys):
+                return None
+            levels.append(([len(node) for node in nodes], keys))
+            nodes = [child for node in nodes for child in node.values()]
+        if not nodes or not all(isinstance(node, list) for node in nodes):
+            return None
+        records = [record for node in nodes for record in node]
+        if not records or not self.is_record_run(records):
+            return None
+        return levels, [len(node) for node in nodes], records
+
+    def put_groups(self, levels, leaf_counts, records):
+        self.body += b'g' + struct.pack('<I', len(levels))
+        for counts, keys in levels:
+            self.body += struct.pack('<I', len(keys))
+            self.body += to_little_endian(array('I', counts))
+            self.body += to_little_endian(array('I', [self.ref(key) for key in keys]))
+        self.body += struct.pack('<I', len(leaf_counts)) + to_little_endian(array('I', leaf_counts))
+        self.put_records(records)
+
+    def put_records(self, records):
+        keys = list(records[0])
+        self.body += b'r' + struct.pack('<II', len(keys), len(records))
+        self.body += to_little_endian(array('I', [self.ref(key) for key in keys]))
+        for key in keys:
+            self.put_column([record[key] for record in records])
+
+    def put_column(self, values):
+        kinds = {type(value) for value in values}
+        if kinds <= {str, type(None)}:
+            self.body += b'S' + to_little_endian(array('I', [self.ref(value) for value in values]))
+        elif kinds == {int} and INT64_MIN <= min(values) and max(values) <= INT64_MAX:
+            self.body += b'I' + to_little_endian(array('q', values))
+        elif kinds == {float}:
+            self.body += b'D' + to_little_endian(array('d', values))
+        else:
+            self.body += b'V'
+            for value in values:
+                self.put(value)
+
+class RecordDecoder:
+    def __init__(self, data):
+        self.data = memoryview(data)
+        count, = struct.unpack_from('<I', data, len(RECORDS_MAGIC))
+        position = len(RECORDS_MAGIC) + 4
+        lengths = from_little_endian('I', self.data[position:position + 4 * count])
+        position += 4 * count
+        self.strings = [None]
+        for length in lengths:
+            self.strings.append(str(self.data[position:position + length], 'utf-8'))
+            position += length
+        self.position = position
+
+    def decode(self):
+        value = self.get()
+        if self.position != len(self.data):
+            raise ValueError("trailing data after records value")
+        return value
+
+    def unpack(self, fmt, size):
+        values = struct.unpack_from(fmt, self.data, self.position)
+        self.position += size
+        return values
+
+    def column(self, typecode, count):
+        size = array(typecode).itemsize * count
+        values = from_little_endian(typecode, self.data[self.position:self.position + size])
+        self.position += size
+        return values
+
+    def get(self):
+        tag = self.data[self.position]
+        self.position += 1
+        if tag == 0x73:  # s
+            return self.strings[self.unpack('<I', 4)[0]]
+        if tag == 0x69:  # i
+            return self.unpack('<q', 8)[0]
+        if tag == 0x64:  # d
+            return self.unpack('<d', 8)[0]
+        if tag == 0x4e:  # N
+            return None
+        if tag == 0x54:  # T
+            return True
+        if tag == 0x46:  # F
+            return False
+        if tag == 0x6d:  # m
+            strings = self.strings
+            result = {}
+            for _ in range(self.unpack('<I', 4)[0]):
+                key = strings[self.unpack('<I', 4)[0]]
+                result[key] = self.get()
+            return result
+        if tag == 0x6c:  # l
+            return [self.get() for _ in range(self.unpack('<I', 4)[0])]
+        if tag == 0x72:  # r
+            key_count, count = self.unpack('<II', 8)
+            keys = [self.strings[index] for index in self.column('I', key_count)]
+            columns = [self.get_column(count) for _ in keys]
+            return [dict(zip(keys, row)) for row in zip(*columns)]
+        if tag == 0x67:  # g
+            return self.get_groups()
+        if tag == 0x62:  # b
+            return int(self.strings[self.unpack('<I', 4)[0]])
+        raise ValueError(f"bad records tag {tag!r} at byte {self.position - 1}")
+
+    def get_groups(self):
+        levels = []
+        parents = 1
+        for _ in range(self.unpack('<I', 4)[0]):
+            key_count, = self.unpack('<I', 4)
+            counts = self.column('I', parents).tolist()
+            keys = [self.strings[index] for index in self.column('I', key_count)]
+            levels.append((counts, keys))
+            parents = key_count
+        leaf_counts = self.column('I', self.unpack('<I', 4)[0]).tolist()
+        records = self.get()
+
+        # Rebuild from the leaves up: slice the records into the leaf
+        # lists, then each level's children into its dicts
+        nodes, start = [], 0
+        for count in leaf_counts:
+            nodes.append(records[start:start + count])
+            start += count
+        for counts, keys in reversed(levels):
+            parents, start = [], 0
+            for count in counts:
+                parents.append(dict(zip(keys[start:start + count], nodes[start:start + count])))
+                start += count
+            nodes = parents
+        return nodes[0]
+
+    def get_column(self, count):
+        tag = self.data[self.position]
+        self.position += 1
+        if tag == 0x53:  # S
+            strings = self.strings
+            return [strings[index] for index in self.column('I', count)]
+        if tag == 0x49:  # I
+            return self.column('q', count).tolist()
+        if tag == 0x44:  # D
+            return self.column('d', count).tolist()
+        if tag == 0x56:  # V
+            return [self.get() for _ in range(count)]
+        raise ValueError(f"bad records column tag {tag!r} at byte {self.position - 1}")
+
+def encode_line(value):
+    return json.dumps(value, separators=(',', ':'), default=json_default).encode() + b'\n'
+
+def line_shaped(data):
+    """Whether the jsonl codec can store data: a list, or a dict of lists"""
+    return isinstance(data, list) or (isinstance(data, Mapping) and
+                                      all(isinstance(records, list) for records in data.values()))
+
+def encode_lines(data):
+    """A header line saying how to put the records back together, then one line per record.
+
+    A dict of lists is written as [key, record] lines, with the keys in the
+    header so empty lists survive.
+    """
+    if isinstance(data, list):
+        header = {'format': 'petcare-lines', 'shape': 'list'}
+        lines = data
+    elif line_shaped(data):
+        header = {'format': 'petcare-lines', 'shape': 'groups', 'groups': list(data)}
+        lines = ([group, record] for group, records in data.items() for record in records)
+    else:
+        raise ValueError("the jsonl codec stores a list or a dict of lists")
+    return encode_line(header) + b''.join(encode_line(line) for line in lines)
+
+def decode_lines(data):
+    header_end = data.index(b'\n') + 1
+    header = json.loads(data[:header_end])
+    # A torn last line from a crash mid-append; everything before it is good
+    body = data[header_end:data.rfind(b'\n') + 1]
+    values = json.loads(b'[' + body.rstrip(b'\n').replace(b'\n', b',') + b']')
+    if header['shape'] == 'list':
+        return values
+    groups = {group: [] for group in header['groups']}
+    for group, record in values:
+        groups.setdefault(group, []).append(record)
+    return groups
+
+def encode(data, codec='json'):
+    """Serialize data to bytes with the named codec"""
+    if codec == 'json':
+        return json.dumps(data, indent=2, default=json_default).encode()
+    if codec == 'compact':
+        return json.dumps(data, separators=(',', ':'), default=json_default).encode()
+    if codec == 'zlib':
+        return zlib.compress(encode(data, 'compact'))
+    if codec == 'gzip':
+        import gzip  # only gzip users pay for the import
+        # mtime=0 keeps the bytes reproducible; gzip.compress() only takes it from 3.8
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as stream:
+            stream.write(encode(data, 'compact'))
+        return buffer.getvalue()
+    if codec == 'records':
+        return RecordEncoder().encode(data)
+    if codec == 'jsonl':
+        return encode_lines(data)
+    raise ValueError(f"unknown codec '{codec}' (choose from {', '.join(CODECS)})")
+
+def detect_codec(data):
+    """Which codec wrote these bytes, from the first few"""
+    if data.startswith(RECORDS_MAGIC):
+        return 'records'
+    if data.startswith(LINES_MAGIC):
+        return 'jsonl'
+    if data[:2] == b'\x1f\x8b':
+        return 'gzip'
+    if len(data) >= 2 and data[0] == 0x78 and (data[0] * 256 + data[1]) % 31 == 0:
+        return 'zlib'
+    # Pretty JSON breaks the line straight after the opening bracket
+    if len(data) > 2 and data[:1] in (b'{', b'[') and not data[1:2].isspace():
+        return 'compact'
+    return 'json'
+
+def decode(data):
+    """Parse bytes written by any codec. Corrupt data raises ValueError."""
+    codec = detect_codec(data)
+    try:
+        if codec == 'records':
+            return RecordDecoder(data).decode()
+        if codec == 'gzip':
+            import gzip
+            return json.loads(gzip.decompress(data))
+        if codec == 'zlib':
+            return json.loads(zlib.decompress(data))
+        if codec == 'jsonl':
+            return decode_lines(data)
+    except (zlib.error, EOFError, OSError, struct.error, IndexError, KeyError, TypeError) as error:
+        raise ValueError(f"corrupt {codec} data: {error}") from error
+    return json.loads(data)
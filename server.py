@@ -0,0 +1,425 @@
+"""JSON HTTP API for the front desk tablets, standard library only.
+
+    python3 main.py serve --host 0.0.0.0 --port 8080
+
+    GET  /pets                       GET  /pets/<name>
+    GET  /care/today                 GET  /care/<YYYY-MM-DD>
+    GET  /expenses?limit=10          GET  /health/<medications|observations>?limit=10
+    GET  /reports/<summary|weekly|pets|compliance>?days=30
+    GET  /timeline/<pet>?from=&to=&kinds=&page=&per_page=
+    GET  /search?q=&pet=&from=&to=   GET  /stats
+    POST /care                {"pet", "activity", "notes", "time_spent"}
+    POST /expenses            {"amount", "category", "pet", "description", "date"}
+    POST /health/medications  {"pet", "medication", "notes", "date", "time"}
+    POST /health/observations {"pet", "observation", "notes", "date"}
+
+The event loop only does the HTTP. Everything that touches the trackers
+runs on one data thread, so they're never used from two threads at once
+(and the SQLite connection stays on the thread that opened it). GET
+responses are cached for a couple of seconds, and until the next write,
+keyed by the path and the query parameters the endpoint reads.
+POSTs go on a queue that a single writer task drains: every write
+waiting when it gets to them is validated and saved as one batch (one
+save per data file, as the bulk import does), and the response is sent
+once the batch is on disk.
+"""
+import asyncio
+import json
+import re
+import signal
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from care_records import json_default
+from cli import parse_record, resolve_pet, valid_date
+
+# How long a GET response is reused when nothing was written through this
+# server (other processes may still be writing to the same data)
+CACHE_SECONDS = 2.0
+# Most GET responses kept at once (least recently used go first)
+MAX_CACHED = 256
+MAX_BATCH = 500
+MAX_BODY = 64 * 1024
+
+REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+HEALTH_KINDS = {'medications': 'medication', 'observations': 'observation'}
+
+class NotFound(LookupError):
+    pass
+
+class MethodNotAllowed(Exception):
+    pass
+
+def int_param(params, name, default):
+    value = params.get(name, default)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a whole number")
+    if value < 1:
+        raise ValueError(f"{name} must be at least 1")
+    return value
+
+def date_param(params, name):
+    value = params.get(name)
+    if value is None:
+        return None
+    try:
+        return valid_date(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a YYYY-MM-DD date")
+
+class PetCareAPI:
+    """Routes, the read cache and the write queue. open_backend() is
+    called on the data thread to get the storage backend to serve."""
+
+    def __init__(self, open_backend, cache_seconds=CACHE_SECONDS, max_batch=MAX_BATCH, max_cached=MAX_CACHED):
+        self.open_backend = open_backend
+        self.cache_seconds = cache_seconds
+        self.max_batch = max_batch
+        self.max_cached = max_cached
+        self.data_thread = ThreadPoolExecutor(1, thread_name_prefix='petcare-data')
+        self.backend = None
+        # {(path, params): (expires, payload)}, least recently used first
+        self.cache = OrderedDict()
+        # Bumped by every saved batch, so a GET answered across one isn't cached
+        self.write_generation = 0
+        self.queue = None
+        self.stats = {'requests': 0, 'cache_hits': 0, 'writes': 0, 'batches': 0,
+                      'largest_batch': 0, 'write_seconds': 0.0}
+        # (method, path pattern, handler, query parameters it reads)
+        self.routes = [
+            ('GET', r'/pets', self.get_pets, ()),
+            ('GET', r'/pets/(?P<name>[^/]+)', self.get_pet, ()),
+            ('GET', r'/care/(?P<day>today|\d{4}-\d{2}-\d{2})', self.get_care_day, ()),
+            ('GET', r'/expenses', self.get_expenses, ('limit',)),
+            ('GET', r'/health/(?P<kind>medications|observations)', self.get_health_records, ('limit',)),
+            ('GET', r'/reports/(?P<report>summary|weekly|pets|compliance)', self.get_report, ('days',)),
+            ('GET', r'/timeline/(?P<pet>[^/]+)', self.get_timeline, ('from', 'to', 'kinds', 'page', 'per_page')),
+            ('GET', r'/search', self.get_search, ('q', 'pet', 'from', 'to', 'limit')),
+            ('POST', r'/care', 'care', ()),
+            ('POST', r'/expenses', 'expense', ()),
+            ('POST', r'/health/(?P<kind>medications|observations)', None, ()),
+        ]
+        self.routes = [(method, re.compile(pattern), target, known) for method, pattern, target, known in self.routes]
+
+    # Data thread
+
+    def open_state(self):
+        from care_logger import CareLogger
+        from expense_tracker import ExpenseTracker
+        from health_tracker import HealthTracker
+        from pet_manager import PetManager
+        from reminder_system import ReminderScheduler
+        from reports import ReportGenerator
+        from rollups import RollupCache
+        from search import SearchIndex
+
+        self.backend = self.open_backend()
+        self.pets = PetManager(self.backend)
+        self.care = CareLogger(self.backend)
+        self.health = HealthTracker(self.backend)
+        self.expenses = ExpenseTracker(self.backend)
+        self.rollups = RollupCache(self.backend)
+        self.reminders = ReminderScheduler(self.pets, self.care, self.health)
+        self.reports = ReportGenerator(self.backend, rollups=self.rollups, reminders=self.reminders)
+        self.search_index = SearchIndex(self.backend)
+
+    def close_state(self):
+        if self.backend is not None:
+            self.backend.close()
+
+    def known_pet(self, name):
+        try:
+            return resolve_pet(self.pets, name)
+        except ValueError as error:
+            raise NotFound(str(error))
+
+    def get_pets(self, params):
+        return self.pets.pets
+
+    def get_pet(self, params, name):
+        pet_id, pet = self.pets.get_pet_by_name(name)
+        if pet is None:
+            raise NotFound(f"unknown pet '{name}'")
+        return dict(pet, pet_id=pet_id)
+
+    def get_care_day(self, params, day):
+        if day == 'today':
+            day = date.today().strftime('%Y-%m-%d')
+        return {'date': day, 'pets': self.care.care_logs.get(day, {})}
+
+    def get_expenses(self, params):
+        return self.backend.recent_expenses(int_param(params, 'limit', 10))
+
+    def get_health_records(self, params, kind):
+        kind = 'health_observations' if kind == 'observations' else kind
+        return self.backend.recent_health_records(kind, int_param(params, 'limit', 10))
+
+    def get_report(self, params, report):
+        if report == 'summary':
+            summary = self.reports.summary()
+            summary['due'] = [{'pet': task.pet_name, 'activity': task.activity,
+                               'due': due_at.strftime('%Y-%m-%d %H:%M')}
+                              for due_at, task in self.reminders.due_tasks()]
+            return summary
+        if report == 'weekly':
+            return self.reports.weekly_counts()
+        if report == 'pets':
+            self.rollups.refresh()
+            return self.rollups.activity_counts_by_pet()
+        from compliance import last_days
+        start, end = last_days(int_param(params, 'days', 30))
+        self.reports.compliance.refresh()
+        return [result._asdict() for result in
+                self.reports.compliance.routine_adherence(self.pets.pets, start, end)]
+
+    def get_timeline(self, params, pet):
+        from query import KINDS, timeline_page
+        kinds = tuple(params['kinds'].split(',')) if params.get('kinds') else KINDS
+        page = int_param(params, 'page', 1)
+        entries, has_more = timeline_page(self.known_pet(pet), date_param(params, 'from'), date_param(params, 'to'),
+                                          kinds, page, int_param(params, 'per_page', 50), self.backend)
+        return {'page': page, 'has_more': has_more,
+                'entries': [dict(entry._asdict(), record=dict(entry.record)) for entry in entries]}
+
+    def get_search(self, params):
+        pet = self.known_pet(params['pet']) if params.get('pet') else None
+        hits = self.search_index.search(params.get('q', ''), pet, date_param(params, 'from'),
+                                        date_param(params, 'to'), int_param(params, 'limit', 50))
+        return [hit._asdict() for hit in hits]
+
+    def save_batch(self, writes):
+        """Validate and save a batch of (kind, row); returns a record or ValueError per write"""
+        now = datetime.now()
+        batches = {'care': [], 'expense': [], 'medication': [], 'observation': []}
+        positions = {kind: [] for kind in batches}
+        results = []
+        for kind, row in writes:
+            try:
+                if not isinstance(row, dict):
+                    raise ValueError("expected a JSON object")
+                row = dict(row)
+                if kind == 'care':
+                    # Care is logged as it happens, like the menu's quick log
+                    row['date'] = now.strftime('%Y-%m-%d')
+                row.setdefault('date', now.strftime('%Y-%m-%d'))
+                if kind in ('care', 'medication'):
+                    row.setdefault('time', now.strftime('%H:%M'))
+                if kind == 'expense':
+                    row.setdefault('pet', 'All')
+                kind, record = parse_record(row, self.pets, kind)
+            except ValueError as error:
+                results.append(error)
+                continue
+            batches[kind].append(record)
+            positions[kind].append(len(results))
+            if kind == 'care':
+                day, pet, activity = record
+                record = dict(activity, date=day, pet=pet)
+            results.append(record)
+
+        def save(kinds, add):
+            if any(batches[kind] for kind in kinds):
+                try:
+                    add()
+                except Exception as error:
+                    # Only this dataset's writes failed, the rest of the batch is saved
+                    for kind in kinds:
+                        for position in positions[kind]:
+                            results[position] = error
+
+        save(('care',), lambda: self.care.add_activities(batches['care']))
+        save(('medication', 'observation'), lambda: self.health.add_records({
+            'medications': batches['medication'], 'health_observations': batches['observation']}))
+        save(('expense',), lambda: self.expenses.add_expenses(batches['expense']))
+        return results
+
+    # Event loop
+
+    async def on_data_thread(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.data_thread, func, *args)
+
+    async def writer(self):
+        """The single writer: takes every queued write at once and saves them as one batch"""
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            started = time.perf_counter()
+            try:
+                results = await self.on_data_thread(self.save_batch, [(kind, row) for kind, row, _ in batch])
+            except Exception as error:
+                # save_batch reports failures per write, so this is the data
+                # thread itself failing before anything was saved
+                results = [error] * len(batch)
+            self.cache.clear()
+            self.write_generation += 1
+            self.stats['batches'] += 1
+            self.stats['writes'] += len(batch)
+            self.stats['largest_batch'] = max(self.stats['largest_batch'], len(batch))
+            self.stats['write_seconds'] += time.perf_counter() - started
+            for (_, _, future), result in zip(batch, results):
+                if future.cancelled():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    async def write(self, kind, body):
+        try:
+            row = json.loads(body or b'{}')
+        except ValueError:
+            raise ValueError("request body must be JSON")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((kind, row, future))
+        return await future
+
+    def route(self, method, target):
+        """(handler, query params, path params, cache key) for a request.
+        Query parameters the endpoint doesn't read are dropped."""
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+        allowed = False
+        for route_method, pattern, handler, known in self.routes:
+            match = pattern.fullmatch(path)
+            if not match:
+                continue
+            allowed = True
+            if route_method == method:
+                params = {name: values[-1] for name, values in parse_qs(url.query).items() if name in known}
+                groups = {name: unquote(value) for name, value in match.groupdict().items()}
+                return handler, params, groups, (path, tuple(sorted(params.items())))
+        if allowed:
+            raise MethodNotAllowed(f"{method} not allowed here")
+        raise NotFound(f"no such endpoint {path}")
+
+    async def respond(self, method, target, body):
+        """(status, encoded JSON body)"""
+        self.stats['requests'] += 1
+        if method == 'GET' and target == '/stats':
+            return 200, self.encode(dict(self.stats, queued=self.queue.qsize(), cached=len(self.cache)))
+        try:
+            handler, params, groups, key = self.route(method, target)
+            if method == 'GET':
+                cached = self.cache.get(key)
+                if cached and cached[0] > time.monotonic():
+                    self.stats['cache_hits'] += 1
+                    self.cache.move_to_end(key)
+                    return 200, cached[1]
+                generation = self.write_generation
+                payload = self.encode(await self.on_data_thread(lambda: handler(params, **groups)))
+                if generation == self.write_generation:
+                    self.remember(key, payload)
+                return 200, payload
+            kind = handler or HEALTH_KINDS[groups['kind']]
+            return 201, self.encode(await self.write(kind, body))
+        except NotFound as error:
+            return 404, self.encode({'error': str(error)})
+        except MethodNotAllowed as error:
+            return 405, self.encode({'error': str(error)})
+        except ValueError as error:
+            return 400, self.encode({'error': str(error)})
+        except Exception as error:
+            print(f"❌ {method} {target}: {error!r}", file=sys.stderr)
+            return 500, self.encode({'error': 'internal error'})
+
+    def remember(self, key, payload):
+        """Cache a GET response, dropping expired entries and then the least
+        recently used ones beyond max_cached"""
+        now = time.monotonic()
+        self.cache[key] = (now + self.cache_seconds, payload)
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.max_cached:
+            for stale in [cached for cached, (expires, _) in self.cache.items() if expires <= now]:
+                del self.cache[stale]
+            while len(self.cache) > self.max_cached:
+                self.cache.popitem(last=False)
+
+    def encode(self, payload):
+        return json.dumps(payload, default=json_default).encode()
+
+    async def handle_connection(self, reader, writer):
+        """HTTP/1.1 with keep-alive, one request at a time per connection"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    await self.send(writer, 400, self.encode({'error': 'malformed request'}), False)
+                    break
+                if length > MAX_BODY:
+                    await self.send(writer, 413, self.encode({'error': 'request body too large'}), False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+                status, payload = await self.respond(method.upper(), target, body)
+                await self.send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def send(self, writer, status, payload, keep_alive):
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + payload)
+        await writer.drain()
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        await self.on_data_thread(self.open_state)
+        self.queue = asyncio.Queue()
+        writer_task = asyncio.get_running_loop().create_task(self.writer())
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        port = server.sockets[0].getsockname()[1]
+        print(f"🌐 PetCare Pro API on http://{host}:{port} (Ctrl+C to stop)", flush=True)
+        stopped = asyncio.Event()
+        try:
+            # kill / service managers stop it as cleanly as Ctrl+C does
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+        try:
+            async with server:
+                await stopped.wait()
+        finally:
+            writer_task.cancel()
+            await self.on_data_thread(self.close_state)
+            self.data_thread.shutdown()
+
+def serve(open_backend, host='127.0.0.1', port=8080):
+    api = PetCareAPI(open_backend)
+    try:
+        asyncio.run(api.serve(host, port))
+    except KeyboardInterrupt:
+        pass
+    print(f"\n👋 API stopped after {api.stats['requests']} requests")
+    return api.stats
+
+if __name__ == "__main__":
+    from backends import backend_from_env
+
+    serve(backend_from_env, port=int(sys.argv[1]) if len(sys.argv) > 1 else 8080)
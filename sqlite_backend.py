@@ -0,0 +1,500 @@
+import copy
+import json
+import os
+import sqlite3
+import sys
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+
+from backends import HEALTH_RECORD_TYPES, JSONBackend, StorageBackend, merge_changes
+from care_records import CareActivity
+from instrumentation import instrument_methods
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pets (
+    pet_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    type TEXT,
+    species TEXT,
+    profile TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS care_activities (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    pet TEXT NOT NULL,
+    activity TEXT NOT NULL,
+    time TEXT,
+    notes TEXT,
+    time_spent TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_care_date ON care_activities (date);
+CREATE INDEX IF NOT EXISTS idx_care_pet_date ON care_activities (pet, date);
+-- Covers the per-month activity counts the report rollups are built from
+CREATE INDEX IF NOT EXISTS idx_care_date_activity ON care_activities (date, pet, activity);
+CREATE TABLE IF NOT EXISTS medications (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    time TEXT,
+    pet TEXT NOT NULL,
+    medication TEXT,
+    notes TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_medications_date ON medications (date);
+CREATE INDEX IF NOT EXISTS idx_medications_pet_date ON medications (pet, date);
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    pet TEXT NOT NULL,
+    observation TEXT,
+    notes TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_observations_date ON observations (date);
+CREATE INDEX IF NOT EXISTS idx_observations_pet_date ON observations (pet, date);
+CREATE TABLE IF NOT EXISTS grooming_appointments (
+    id INTEGER PRIMARY KEY,
+    date TEXT,
+    pet TEXT,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    category TEXT,
+    pet TEXT,
+    amount REAL NOT NULL,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses (date);
+CREATE INDEX IF NOT EXISTS idx_expenses_pet_date ON expenses (pet, date);
+CREATE INDEX IF NOT EXISTS idx_expenses_category_date ON expenses (category, date);
+CREATE TABLE IF NOT EXISTS changes (
+    dataset TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO changes (dataset, version) VALUES
+    ('pets', 0), ('care_logs', 0), ('health_records', 0), ('expenses', 0);
+"""
+
+def activity_from_row(row):
+    return CareActivity(row['activity'], row['time'], row['notes'], row['time_spent'])
+
+def expense_from_row(row):
+    return {'date': row['date'], 'category': row['category'], 'pet': row['pet'],
+            'amount': row['amount'], 'description': row['description']}
+
+def medication_from_row(row):
+    return {'date': row['date'], 'time': row['time'], 'pet_name': row['pet'],
+            'medication': row['medication'], 'notes': row['notes']}
+
+def observation_from_row(row):
+    return {'date': row['date'], 'pet_name': row['pet'], 'observation': row['observation'], 'notes': row['notes']}
+
+# health record kind -> (table, row converter)
+HEALTH_TABLES = {
+    'medications': ('medications', medication_from_row),
+    'health_observations': ('observations', observation_from_row),
+    'grooming_appointments': ('grooming_appointments', lambda row: json.loads(row['record'])),
+}
+
+class SQLiteCareLogs(MutableMapping):
+    """{date: {pet: [activities]}} view over the care_activities table.
+
+    Days are fetched with an indexed query the first time they're looked at
+    and cached after that. Assigning a day only updates the cache; new
+    activities reach the database through SQLiteBackend.add_care_activity.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.conn = backend.conn
+        self.days = {}
+
+    def __getitem__(self, day):
+        if day not in self.days:
+            rows = self.conn.execute(
+                "SELECT pet, activity, time, notes, time_spent FROM care_activities WHERE date = ? ORDER BY id",
+                (day,)).fetchall()
+            if not rows:
+                raise KeyError(day)
+            day_logs = {}
+            for row in rows:
+                day_logs.setdefault(sys.intern(row['pet']), []).append(activity_from_row(row))
+            self.days[day] = day_logs
+        return self.days[day]
+
+    def __setitem__(self, day, day_logs):
+        self.days[day] = day_logs
+
+    def __delitem__(self, day):
+        with self.backend.writing('care_logs'):
+            self.conn.execute("DELETE FROM care_activities WHERE date = ?", (day,))
+        self.days.pop(day, None)
+
+    def __contains__(self, day):
+        try:
+            self[day]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        rows = self.conn.execute("SELECT DISTINCT date FROM care_activities ORDER BY date").fetchall()
+        return iter([row['date'] for row in rows])
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(DISTINCT date) FROM care_activities").fetchone()[0]
+
+@instrument_methods('load_', 'save_', 'add_')
+class SQLiteBackend(StorageBackend):
+    """All four datasets in one SQLite database (WAL mode).
+
+    Each add_* is a single-row insert and the report queries run against
+    the (date), (pet, date) and (category, date) indexes. Every write bumps
+    its dataset's counter in the changes table, and a loaded dataset stays
+    cached until another connection bumps that counter, so a new expense
+    from another station doesn't reload the whole care history.
+    """
+
+    def __init__(self, db_file='data/petcare.db'):
+        super().__init__()
+        self.db_file = db_file
+        self.data_dir = os.path.dirname(db_file) or '.'
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.conn = sqlite3.connect(db_file)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # The pets as last read or written, to merge other stations' edits against
+        self.pets_base = {}
+        # (care_logs version, care_month_stamps()) so unchanged data isn't rescanned
+        self.month_stamps = None
+
+    def version(self, name):
+        """How many writes dataset name has had, from any connection"""
+        return self.conn.execute("SELECT version FROM changes WHERE dataset = ?", (name,)).fetchone()[0]
+
+    @contextmanager
+    def writing(self, name, replace=False):
+        """A transaction that writes dataset name and bumps its counter.
+
+        Our cached copy already has our own change, so it keeps counting as
+        fresh, unless another connection wrote since we read it (then the
+        next load picks both up), or replace says we rewrote it all.
+        """
+        with self.conn:
+            yield
+            self.conn.execute("UPDATE changes SET version = version + 1 WHERE dataset = ?", (name,))
+            version = self.version(name)
+        cache = self.dataset(name)
+        if replace or cache.stamp == version - 1:
+            cache.stamp = version
+
+    # Pets
+
+    def load_pets(self):
+        return self.cached('pets', self.version('pets'), self.query_pets)
+
+    def query_pets(self):
+        rows = self.conn.execute("SELECT pet_id, profile FROM pets ORDER BY rowid").fetchall()
+        if not rows:
+            return None
+        pets = {row['pet_id']: json.loads(row['profile']) for row in rows}
+        self.pets_base = copy.deepcopy(pets)
+        return pets
+
+    def save_pets(self, pets):
+        with self.writing('pets', replace=True):
+            # Take the write lock before looking, so nobody saves in between
+            self.conn.execute("BEGIN IMMEDIATE")
+            cache = self.dataset('pets')
+            version = self.version('pets')
+            if cache.value is pets and cache.stamp != version:
+                # Another station saved since we loaded: keep its edits to other pets
+                base = self.pets_base
+                merge_changes(base, pets, self.query_pets() or {})
+                cache.generation += 1
+                cache.stamp = version
+            self.remember('pets', pets)
+            self.conn.execute("DELETE FROM pets")
+            self.conn.executemany(
+                "INSERT INTO pets (pet_id, name, type, species, profile) VALUES (?, ?, ?, ?, ?)",
+                [(pet_id, pet['name'], pet.get('type'), pet.get('species'), json.dumps(pet))
+                 for pet_id, pet in pets.items()])
+        self.pets_base = copy.deepcopy(pets)
+
+    # Care logs
+
+    def load_care_logs(self):
+        return self.cached('care_logs', self.version('care_logs'), lambda: SQLiteCareLogs(self))
+
+    def save_care_logs(self, care_logs):
+        rows = [(day, pet, a['activity'], a.get('time'), a.get('notes'), a.get('time_spent'))
+                for day, day_logs in care_logs.items()
+                for pet, activities in day_logs.items()
+                for a in activities]
+        with self.writing('care_logs', replace=True):
+            self.conn.execute("DELETE FROM care_activities")
+            self.conn.executemany(
+                "INSERT INTO care_activities (date, pet, activity, time, notes, time_spent) VALUES (?, ?, ?, ?, ?, ?)",
+                rows)
+        self.remember('care_logs', SQLiteCareLogs(self))
+
+    def add_care_activity(self, day, pet_name, activity):
+        with self.writing('care_logs'):
+            self.conn.execute(
+                "INSERT INTO care_activities (date, pet, activity, time, notes, time_spent) VALUES (?, ?, ?, ?, ?, ?)",
+                (day, pet_name, activity['activity'], activity.get('time'), activity.get('notes'), activity.get('time_spent')))
+
+    def add_care_activities(self, entries):
+        with self.writing('care_logs'):
+            self.conn.executemany(
+                "INSERT INTO care_activities (date, pet, activity, time, notes, time_spent) VALUES (?, ?, ?, ?, ?, ?)",
+                [(day, pet_name, a['activity'], a.get('time'), a.get('notes'), a.get('time_spent'))
+                 for day, pet_name, a in entries])
+
+    # Health records
+
+    def load_health_records(self):
+        return self.cached('health_records', self.version('health_records'), self.query_health_records)
+
+    def query_health_records(self):
+        health_records = {}
+        for kind, (table, from_row) in HEALTH_TABLES.items():
+            health_records[kind] = [from_row(row) for row in self.conn.execute(f"SELECT * FROM {table} ORDER BY id")]
+        return health_records
+
+    def insert_health_record(self, kind, record):
+        if kind == 'medications':
+            self.conn.execute(
+                "INSERT INTO medications (date, time, pet, medication, notes) VALUES (?, ?, ?, ?, ?)",
+                (record['date'], record.get('time'), record['pet_name'], record.get('medication'), record.get('notes')))
+        elif kind == 'health_observations':
+            self.conn.execute(
+                "INSERT INTO observations (date, pet, observation, notes) VALUES (?, ?, ?, ?)",
+                (record['date'], record['pet_name'], record.get('observation'), record.get('notes')))
+        elif kind == 'grooming_appointments':
+            self.conn.execute(
+                "INSERT INTO grooming_appointments (date, pet, record) VALUES (?, ?, ?)",
+                (record.get('date'), record.get('pet_name'), json.dumps(record)))
+        else:
+            raise ValueError(f"Unknown health record type: {kind}")
+
+    def save_health_records(self, health_records):
+        self.remember('health_records', health_records)
+        with self.writing('health_records', replace=True):
+            for table in ('medications', 'observations', 'grooming_appointments'):
+                self.conn.execute(f"DELETE FROM {table}")
+            for kind in HEALTH_RECORD_TYPES:
+                for record in health_records.get(kind, []):
+                    self.insert_health_record(kind, record)
+
+    def add_health_record(self, kind, record):
+        with self.writing('health_records'):
+            self.insert_health_record(kind, record)
+
+    def add_health_records(self, records_by_kind):
+        with self.writing('health_records'):
+            for kind, records in records_by_kind.items():
+                for record in records:
+                    self.insert_health_record(kind, record)
+
+    # Expenses
+
+    def load_expenses(self):
+        return self.cached('expenses', self.version('expenses'), self.query_expenses)
+
+    def query_expenses(self):
+        return [expense_from_row(row) for row in self.conn.execute("SELECT * FROM expenses ORDER BY id")]
+
+    def save_expenses(self, expenses):
+        self.remember('expenses', expenses)
+        with self.writing('expenses', replace=True):
+            self.conn.execute("DELETE FROM expenses")
+            self.conn.executemany(
+                "INSERT INTO expenses (date, category, pet, amount, description) VALUES (?, ?, ?, ?, ?)",
+                [(e['date'], e.get('category'), e.get('pet'), e['amount'], e.get('description')) for e in expenses])
+
+    def add_expense(self, expense):
+        with self.writing('expenses'):
+            self.conn.execute(
+                "INSERT INTO expenses (date, category, pet, amount, description) VALUES (?, ?, ?, ?, ?)",
+                (expense['date'], expense.get('category'), expense.get('pet'), expense['amount'], expense.get('description')))
+
+    def add_expenses(self, expenses):
+        with self.writing('expenses'):
+            self.conn.executemany(
+                "INSERT INTO expenses (date, category, pet, amount, description) VALUES (?, ?, ?, ?, ?)",
+                [(e['date'], e.get('category'), e.get('pet'), e['amount'], e.get('description')) for e in expenses])
+
+    # Report queries
+
+    def care_days_since(self, day):
+        rows = self.conn.execute(
+            "SELECT date, pet, activity, time, notes, time_spent FROM care_activities WHERE date >= ? ORDER BY date, id",
+            (day or '',))
+        current_day, day_logs = None, {}
+        for row in rows:
+            if row['date'] != current_day:
+                if current_day is not None:
+                    yield current_day, day_logs
+                current_day, day_logs = row['date'], {}
+            day_logs.setdefault(sys.intern(row['pet']), []).append(activity_from_row(row))
+        if current_day is not None:
+            yield current_day, day_logs
+
+    def expenses_since(self, position):
+        rows = self.conn.execute("SELECT * FROM expenses WHERE id > ? ORDER BY id", (position or 0,)).fetchall()
+        return [expense_from_row(row) for row in rows], rows[-1]['id'] if rows else position
+
+    def health_records_since(self, kind, position):
+        if kind not in HEALTH_TABLES:
+            return [], position
+        table, from_row = HEALTH_TABLES[kind]
+        rows = self.conn.execute(f"SELECT * FROM {table} WHERE id > ? ORDER BY id", (position or 0,)).fetchall()
+        return [from_row(row) for row in rows], rows[-1]['id'] if rows else position
+
+    def activity_counts_by_day(self, days):
+        days = list(days)
+        if not days:
+            return {}
+        placeholders = ', '.join('?' * len(days))
+        rows = self.conn.execute(
+            f"SELECT date, COUNT(*) FROM care_activities WHERE date IN ({placeholders}) GROUP BY date", days)
+        return {row[0]: row[1] for row in rows}
+
+    def activity_counts_by_pet(self):
+        rows = self.conn.execute("SELECT pet, COUNT(*) FROM care_activities GROUP BY pet")
+        return {row[0]: row[1] for row in rows}
+
+    def care_totals(self):
+        row = self.conn.execute("SELECT COUNT(DISTINCT date), COUNT(*) FROM care_activities").fetchone()
+        return row[0], row[1]
+
+    def care_months(self):
+        rows = self.conn.execute("SELECT DISTINCT substr(date, 1, 7) FROM care_activities ORDER BY 1")
+        return [row[0] for row in rows]
+
+    def care_month_stamps(self):
+        version = self.version('care_logs')
+        if self.month_stamps is None or self.month_stamps[0] != version:
+            rows = self.conn.execute(
+                "SELECT substr(date, 1, 7), COUNT(*), MAX(id) FROM care_activities GROUP BY 1").fetchall()
+            self.month_stamps = version, {row[0]: (row[1], row[2]) for row in rows}
+        return self.month_stamps[1]
+
+    def care_month_counts(self, month, from_disk=False):
+        # Plain tuples: building a sqlite3.Row per group costs more than the query
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        rows = cursor.execute(
+            "SELECT date, pet, activity, COUNT(*) FROM care_activities WHERE date >= ? AND date <= ? "
+            "GROUP BY date, pet, activity", (f"{month}-01", f"{month}-31"))
+        counts = {}
+        for day, pet, activity, count in rows:
+            counts.setdefault(day, {}).setdefault(pet, {})[activity] = count
+        return counts
+
+    def worker_spec(self):
+        return type(self), (self.db_file,)
+
+    def worker_months(self):
+        # Every write is committed straight to the database
+        return self.care_months()
+
+    def health_record_count(self):
+        return sum(self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                   for table in ('medications', 'observations', 'grooming_appointments'))
+
+    def expense_totals(self):
+        row = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM expenses").fetchone()
+        return row[0], row[1]
+
+    def expenses_for_month(self, month):
+        rows = self.conn.execute(
+            "SELECT * FROM expenses WHERE date >= ? AND date <= ? ORDER BY id", (f"{month}-01", f"{month}-31"))
+        return [expense_from_row(row) for row in rows]
+
+    def rows_between(self, columns, table, pet_name, start, end, order):
+        """Cursor over a table's rows dated within [start, end], for one pet (any case) or all"""
+        sql = f"SELECT {columns} FROM {table} WHERE date >= ? AND date <= ?"
+        params = [start or '', end or '9999']
+        if pet_name:
+            sql += " AND pet = ? COLLATE NOCASE"
+            params.append(pet_name)
+        return self.conn.execute(f"{sql} ORDER BY {order}", params)
+
+    def care_activities_between(self, pet_name=None, start=None, end=None):
+        rows = self.rows_between("date, pet, activity, time, notes, time_spent", "care_activities",
+                                 pet_name, start, end, "date, time, id")
+        for row in rows:
+            yield row['date'], row['pet'], activity_from_row(row)
+
+    def health_records_between(self, kind, pet_name=None, start=None, end=None):
+        if kind not in HEALTH_TABLES:
+            return
+        table, from_row = HEALTH_TABLES[kind]
+        order = "date, time, id" if kind == 'medications' else "date, id"
+        for row in self.rows_between("*", table, pet_name, start, end, order):
+            yield from_row(row)
+
+    def expenses_between(self, pet_name=None, start=None, end=None):
+        for row in self.rows_between("*", "expenses", pet_name, start, end, "date, id"):
+            yield expense_from_row(row)
+
+    def recent_expenses(self, count):
+        rows = self.conn.execute("SELECT * FROM expenses ORDER BY id DESC LIMIT ?", (count,)).fetchall()
+        return [expense_from_row(row) for row in reversed(rows)]
+
+    def recent_health_records(self, kind, count):
+        if kind not in HEALTH_TABLES:
+            return []
+        table, from_row = HEALTH_TABLES[kind]
+        rows = self.conn.execute(f"SELECT * FROM {table} ORDER BY id DESC LIMIT ?", (count,)).fetchall()
+        return [from_row(row) for row in reversed(rows)]
+
+    def close(self):
+        self.conn.close()
+
+def migrate_json_to_sqlite(data_dir='data', db_file=None):
+    """One-shot copy of the data/*.json files into a SQLite database.
+
+    Refuses to run against a database that already has data so it can't
+    double up records.
+    """
+    db_file = db_file or os.path.join(data_dir, 'petcare.db')
+    source = JSONBackend(data_dir)
+    target = SQLiteBackend(db_file)
+
+    tables = ('pets', 'care_activities', 'medications', 'observations', 'grooming_appointments', 'expenses')
+    if any(target.conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() for table in tables):
+        target.close()
+        raise ValueError(f"{db_file} already has data; not migrating again")
+
+    pets = source.load_pets() or {}
+    care_logs = source.load_care_logs()
+    health_records = source.load_health_records()
+    expenses = source.load_expenses()
+
+    target.save_pets(pets)
+    target.save_care_logs(care_logs)
+    target.save_health_records(health_records)
+    target.save_expenses(expenses)
+
+    counts = {
+        'pets': len(pets),
+        'care_activities': target.care_totals()[1],
+        'health_records': target.health_record_count(),
+        'expenses': len(expenses),
+    }
+    target.close()
+    return counts
+
+if __name__ == "__main__":
+    from households import household_data_dir
+
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else household_data_dir()
+    counts = migrate_json_to_sqlite(data_dir)
+    print(f"✅ Migrated {data_dir}/*.json into {os.path.join(data_dir, 'petcare.db')}:")
+    for table, count in counts.items():
+        print(f"   {table}: {count}")
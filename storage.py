@@ -0,0 +1,223 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+from collections import namedtuple
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (Windows): one station writes to a data directory at a time
+    fcntl = None
+
+from care_records import json_default
+from instrumentation import file_label, timer
+from serialization import LINES_MAGIC, decode, detect_codec, encode, encode_line, line_shaped
+
+def atomic_write(path, data):
+    """Write bytes to a temp file, fsync it, then swap it into place"""
+    with timer('write', file_label(path)) as t:
+        t.bytes = len(data)
+        # Per process and thread, so concurrent writers never share a temp file
+        tmp_file = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            written = os.fstat(f.fileno())
+        # File times come from a coarse clock and the old file's inode can be
+        # reused, so two quick saves of the same size could have the same
+        # FileStamp: keep the mtime moving forward
+        replaced = file_stamp(path)
+        if replaced is not None and written.st_mtime_ns <= replaced.mtime_ns:
+            os.utime(tmp_file, ns=(written.st_atime_ns, replaced.mtime_ns + 1))
+        os.replace(tmp_file, path)
+
+def read_json_file(path):
+    """Parse a JSON file; raises json.JSONDecodeError like json.load"""
+    label = file_label(path)
+    with timer('read', label) as t:
+        with open(path, 'rb') as f:
+            data = f.read()
+        t.bytes = len(data)
+    with timer('json.parse', label):
+        return json.loads(data)
+
+def dump_json(data, path, indent=2):
+    """Serialize data for path as UTF-8 JSON bytes"""
+    with timer('json.serialize', file_label(path)):
+        return json.dumps(data, indent=indent, default=json_default).encode()
+
+def read_data_file(path):
+    """Parse a data file written by any codec (see serialization.py); raises ValueError if corrupt"""
+    label = file_label(path)
+    with timer('read', label) as t:
+        with open(path, 'rb') as f:
+            data = f.read()
+        t.bytes = len(data)
+    with timer('decode', label):
+        return decode(data)
+
+def file_codec(path):
+    """The codec an existing file was written with, or None"""
+    try:
+        with open(path, 'rb') as f:
+            return detect_codec(f.read(len(LINES_MAGIC)))
+    except FileNotFoundError:
+        return None
+
+def save_codec(path):
+    """PETCARE_CODEC, or else whatever the file is already in, so a converted file stays converted"""
+    return os.environ.get('PETCARE_CODEC') or file_codec(path) or 'json'
+
+def dump_data(data, path, codec=None):
+    """Serialize a data file with codec, by default save_codec(path)"""
+    codec = codec or save_codec(path)
+    if codec == 'jsonl' and not line_shaped(data):
+        # Only the record logs are line-delimited
+        codec = 'json'
+    with timer('encode', file_label(path)):
+        return encode(data, codec)
+
+def append_lines(path, values):
+    """Append records to a jsonl data file and fsync, instead of rewriting it"""
+    data = b''.join(encode_line(value) for value in values)
+    with timer('append', file_label(path)) as t:
+        t.bytes = len(data)
+        with open(path, 'rb+') as f:
+            # Drop a half-written last line so the new records start on a clean line
+            size = os.fstat(f.fileno()).st_size
+            f.seek(max(0, size - 1))
+            if size and f.read(1) != b'\n':
+                f.seek(0)
+                f.truncate(f.read().rfind(b'\n') + 1)
+            f.seek(0, os.SEEK_END)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+def read_tail_records(path, count, group=None):
+    """The last count records of a jsonl data file, oldest first.
+
+    Scans backwards from the end of the memory-mapped file a line at a
+    time, so the cost depends on count rather than the file size. With
+    group, only [group, record] lines count and their records come back.
+    """
+    records = []
+    with timer('tail', file_label(path)) as t, open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return records
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            header_end = mm.find(b'\n') + 1
+            # A torn last line has no newline yet and is skipped
+            end = mm.rfind(b'\n') + 1
+            while end > header_end and len(records) < count:
+                start = max(mm.rfind(b'\n', header_end, end - 1) + 1, header_end)
+                value = json.loads(mm[start:end])
+                t.bytes += end - start
+                end = start
+                if group is None:
+                    records.append(value)
+                elif value[0] == group:
+                    records.append(value[1])
+    records.reverse()
+    return records
+
+def convert_file(path, codec):
+    """Rewrite a data file with codec, returns (old codec, old size, new size)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    old_codec = detect_codec(data)
+    if old_codec == codec:
+        return old_codec, len(data), len(data)
+    converted = encode(decode(data), codec)
+    atomic_write(path, converted)
+    return old_codec, len(data), len(converted)
+
+def file_digest(path):
+    """sha256 of a file's contents, or None if it doesn't exist"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+FileStamp = namedtuple('FileStamp', 'inode mtime_ns size')
+
+def file_stamp(path):
+    """FileStamp of a file or directory, or None if it doesn't exist.
+
+    Appends grow the size and atomic_write swaps in a new inode, so both
+    kinds of write change the stamp even within one mtime tick.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return FileStamp(stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def read_appended_lines(path, old_stamp, new_stamp):
+    """The JSON lines appended to path between two of its stamps, or None
+    if it was replaced or truncated in between instead"""
+    if (old_stamp is None or new_stamp is None or old_stamp.inode != new_stamp.inode
+            or new_stamp.size < old_stamp.size):
+        return None
+    # Start a byte early to check old_stamp ended on a line boundary
+    start = max(old_stamp.size - 1, 0)
+    try:
+        with timer('read', file_label(path)) as t, open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_ino != new_stamp.inode:
+                # Replaced since new_stamp was taken
+                return None
+            f.seek(start)
+            data = f.read(new_stamp.size - start)
+            t.bytes = len(data)
+    except FileNotFoundError:
+        return None
+    if old_stamp.size:
+        if not data.startswith(b'\n'):
+            return None
+        data = data[1:]
+    if data and not data.endswith(b'\n'):
+        return None
+    try:
+        return [json.loads(line) for line in data.splitlines()]
+    except ValueError:
+        return None
+
+class FileLock:
+    """Exclusive advisory lock (flock) on a lock file, held around load-modify-write.
+
+    Reentrant, and it also serializes this process's own threads. Readers
+    never take it: data files are only appended to or atomically replaced.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.file = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if self.depth == 0 and fcntl:
+            try:
+                self.file = open(self.path, 'a')
+                with timer('lock', file_label(self.path)):
+                    fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+            except BaseException:
+                if self.file:
+                    self.file.close()
+                    self.file = None
+                self.thread_lock.release()
+                raise
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth == 0 and self.file:
+            # Closing the file releases the lock
+            self.file.close()
+            self.file = None
+        self.thread_lock.release()
@@ -0,0 +1,101 @@
+import os
+
+import backends
+from backends import JSONBackend
+from care_logger import CareLogger
+from care_records import CareActivity
+from storage import read_data_file
+
+def open_journaled(data_dir, compact_every=100):
+    return JSONBackend(str(data_dir), journal=True, sharded=True, compact_every=compact_every)
+
+def log(backend, day, pet, note):
+    CareLogger(backend).add_activities([(day, pet, CareActivity('snackies', '10:00', note))])
+
+def notes(care_logs, day, pet='Gus'):
+    return [activity['notes'] for activity in care_logs.get(day, {}).get(pet, [])]
+
+def journal_lines(backend):
+    if not os.path.exists(backend.journal_file):
+        return []
+    with open(backend.journal_file) as f:
+        return f.read().splitlines()
+
+def test_writes_go_to_the_journal_and_replay_on_reopen(tmp_path):
+    backend = open_journaled(tmp_path)
+    log(backend, '2024-03-01', 'Gus', 'one')
+    log(backend, '2024-03-01', 'Gus', 'two')
+    backend.close()
+
+    assert len(journal_lines(backend)) == 2
+    shard = os.path.join(backend.shard_dir, '2024-03.json')
+    assert not os.path.exists(shard) or '2024-03-01' not in read_data_file(shard)
+
+    reopened = open_journaled(tmp_path)
+    assert notes(reopened.load_care_logs(), '2024-03-01') == ['one', 'two']
+    assert reopened.journal_entries == 2
+
+def test_close_leaves_a_short_journal_alone(tmp_path):
+    backend = open_journaled(tmp_path)
+    log(backend, '2024-03-01', 'Gus', 'one')
+    stamp = backend.stamp('care_logs')
+    backend.close()
+    assert backend.stamp('care_logs') == stamp
+
+def test_compaction_folds_the_journal_into_the_shards(tmp_path):
+    backend = open_journaled(tmp_path, compact_every=3)
+    for n in range(3):
+        # The single-activity path, as log_care_activity takes it
+        day = f"2024-0{n + 1}-15"
+        care_logs = backend.load_care_logs()
+        day_logs = care_logs.get(day, {})
+        day_logs.setdefault('Gus', []).append(CareActivity('snackies', '10:00', str(n)))
+        care_logs[day] = day_logs
+        backend.add_care_activity(day, 'Gus', day_logs['Gus'][-1])
+
+    assert journal_lines(backend) == []
+    for n in range(3):
+        shard = read_data_file(os.path.join(backend.shard_dir, f"2024-0{n + 1}.json"))
+        assert [a['notes'] for a in shard[f"2024-0{n + 1}-15"]['Gus']] == [str(n)]
+
+    reopened = open_journaled(tmp_path, compact_every=3)
+    care_logs = reopened.load_care_logs()
+    assert [notes(care_logs, f"2024-0{n + 1}-15") for n in range(3)] == [['0'], ['1'], ['2']]
+    assert reopened.journal_entries == 0
+
+def test_torn_last_journal_line_is_skipped(tmp_path):
+    backend = open_journaled(tmp_path)
+    log(backend, '2024-03-01', 'Gus', 'kept')
+    with open(backend.journal_file, 'a') as f:
+        f.write('{"date": "2024-03-01", "pet": "Gus", "activ')
+
+    reopened = open_journaled(tmp_path)
+    assert notes(reopened.load_care_logs(), '2024-03-01') == ['kept']
+    # The next append starts on a clean line
+    log(reopened, '2024-03-01', 'Gus', 'after')
+    assert notes(open_journaled(tmp_path).load_care_logs(), '2024-03-01') == ['kept', 'after']
+
+def test_crash_between_snapshot_and_journal_clear_does_not_replay_twice(tmp_path, monkeypatch):
+    backend = open_journaled(tmp_path)
+    log(backend, '2024-03-01', 'Gus', 'one')
+    log(backend, '2024-04-01', 'Gus', 'two')
+
+    real_atomic_write = backends.atomic_write
+
+    def crash_on_journal(path, data):
+        if path == backend.journal_file:
+            raise OSError("simulated crash")
+        real_atomic_write(path, data)
+
+    monkeypatch.setattr(backends, 'atomic_write', crash_on_journal)
+    try:
+        backend.compact_journal()
+    except OSError:
+        pass
+    monkeypatch.undo()
+
+    # The snapshot has the records and the journal still has them plus the marker
+    assert any('compact' in line for line in journal_lines(backend))
+    care_logs = open_journaled(tmp_path).load_care_logs()
+    assert notes(care_logs, '2024-03-01') == ['one']
+    assert notes(care_logs, '2024-04-01') == ['two']
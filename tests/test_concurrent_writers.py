@@ -0,0 +1,90 @@
+import multiprocessing
+
+import pytest
+
+from backends import JSONBackend, merge_changes, open_backend
+from care_logger import CareLogger
+from care_records import CareActivity
+from expense_tracker import ExpenseTracker
+from health_tracker import HealthTracker
+from pet_manager import PetManager
+
+STATIONS = 3
+WRITES = 30
+
+def station(data_dir, index, compact_every):
+    backend = open_backend('json', data_dir)
+    backend.compact_every = compact_every
+    care, expenses, health = CareLogger(backend), ExpenseTracker(backend), HealthTracker(backend)
+    pets = PetManager(backend)
+    for n in range(WRITES):
+        day = f"2024-0{1 + n % 3}-1{index}"
+        note = f"station {index} write {n}"
+        care.add_activities([(day, f"Pet{index}", CareActivity('snackies', '10:00', note))])
+        expenses.add_expenses([{'date': day, 'category': 'Food', 'pet': f"Pet{index}", 'amount': 1.0,
+                                'description': note}])
+        health.add_records({'medications': [{'date': day, 'time': '10:00', 'pet_name': f"Pet{index}",
+                                             'medication': 'x', 'notes': note}]})
+        if n % 10 == 0:
+            pets.update_pet('gus', **{f"station{index}": n})
+    backend.close()
+
+@pytest.mark.parametrize('codec', ['json', 'jsonl'])
+@pytest.mark.parametrize('compact_every', [7, 500])
+def test_concurrent_processes_keep_every_record(tmp_path, monkeypatch, compact_every, codec):
+    # jsonl files get appended to, json ones rewritten under the lock
+    monkeypatch.setenv('PETCARE_CODEC', codec)
+    data_dir = str(tmp_path)
+    PetManager(open_backend('json', data_dir)).pets  # the sample profiles
+    processes = [multiprocessing.Process(target=station, args=(data_dir, index, compact_every))
+                 for index in range(STATIONS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    backend = open_backend('json', data_dir)
+    expected = {f"station {index} write {n}" for index in range(STATIONS) for n in range(WRITES)}
+    care_notes = [activity['notes'] for day_logs in backend.load_care_logs().values()
+                  for activities in day_logs.values() for activity in activities]
+    assert sorted(care_notes) == sorted(expected)
+    assert sorted(e['description'] for e in backend.load_expenses()) == sorted(expected)
+    assert sorted(m['notes'] for m in backend.load_health_records()['medications']) == sorted(expected)
+    gus = backend.load_pets()['gus']
+    assert {key: gus[key] for key in gus if key.startswith('station')} == \
+        {f"station{index}": 20 for index in range(STATIONS)}
+
+def test_saving_pets_merges_another_stations_edits(tmp_path):
+    first = PetManager(JSONBackend(str(tmp_path)))
+    first.pets
+    second = PetManager(JSONBackend(str(tmp_path)))
+    second.pets
+
+    first.update_pet('gus', age=30)
+    second.update_pet('bunion', age=4)
+    second.add_pet('pip', {'name': 'Pip', 'type': 'bird', 'species': 'Budgie'})
+
+    pets = PetManager(JSONBackend(str(tmp_path))).pets
+    assert pets['gus']['age'] == 30
+    assert pets['bunion']['age'] == 4
+    assert 'pip' in pets
+
+def test_loaded_copy_folds_in_another_writers_appends(tmp_path):
+    first = JSONBackend(str(tmp_path), journal=True, sharded=True)
+    second = JSONBackend(str(tmp_path), journal=True, sharded=True)
+    CareLogger(first).add_activities([('2024-05-01', 'Gus', CareActivity('snackies', '10:00', 'first'))])
+    care_logs = second.load_care_logs()
+    generation = second.generation('care_logs')
+
+    CareLogger(first).add_activities([('2024-05-01', 'Gus', CareActivity('dinner', '17:00', 'again'))])
+    assert second.load_care_logs() is care_logs
+    assert second.generation('care_logs') == generation + 1
+    assert [a['notes'] for a in care_logs['2024-05-01']['Gus']] == ['first', 'again']
+
+def test_merge_changes_keeps_both_sides():
+    base = {'a': {'name': 'A', 'age': 1}, 'b': {'name': 'B'}, 'c': {'name': 'C'}}
+    ours = {'a': {'name': 'A', 'age': 2}, 'b': {'name': 'B'}, 'c': {'name': 'C'}}
+    theirs = {'a': {'name': 'A', 'age': 1}, 'b': {'name': 'Bee'}, 'd': {'name': 'D'}}
+    merge_changes(base, ours, theirs)
+    assert ours == {'a': {'name': 'A', 'age': 2}, 'b': {'name': 'Bee'}, 'd': {'name': 'D'}}
@@ -0,0 +1,88 @@
+import os
+import sqlite3
+from datetime import date
+
+import pytest
+
+from backends import open_backend
+from benchmarks.synthetic import generate
+from care_logger import CareLogger
+from care_records import CareActivity
+from expense_tracker import ExpenseTracker
+from rollups import RollupCache
+from storage import atomic_write, dump_data, read_data_file
+
+END = date(2024, 6, 15)
+
+@pytest.fixture(params=['json', 'sqlite'])
+def data_dir(request, tmp_path):
+    generate(str(tmp_path), pets=3, years=1.2, seed=7, end=END)
+    if request.param == 'sqlite':
+        from sqlite_backend import migrate_json_to_sqlite
+        migrate_json_to_sqlite(str(tmp_path))
+    return str(tmp_path), request.param
+
+def counted(cache):
+    rollups = cache.rollups
+    return {key: rollups[key] for key in ('care_days', 'care_by_pet', 'care_activities',
+                                          'expense_days', 'expense_count', 'expense_cents')}
+
+def rebuilt(data_dir, backend_name):
+    cache = RollupCache(open_backend(backend_name, data_dir), os.path.join(data_dir, 'rebuilt.json'), workers=1)
+    cache.rebuild()
+    return counted(cache)
+
+def log(backend, day, note):
+    CareLogger(backend).add_activities([(day, 'Gus', CareActivity('snackies', '10:00', note))])
+
+def test_catch_up_matches_a_full_rebuild(data_dir):
+    data_dir, backend_name = data_dir
+    backend = open_backend(backend_name, data_dir)
+    cache = RollupCache(backend, workers=1)
+    cache.refresh()
+    assert cache.rollups['care_high_water'] == END.strftime('%Y-%m-%d')
+
+    # More on the high-water day, new days past it and a new expense
+    log(backend, '2024-06-15', 'late')
+    log(backend, '2024-06-16', 'next day')
+    log(backend, '2024-07-02', 'next month')
+    ExpenseTracker(backend).add_expenses([{'date': '2024-06-16', 'category': 'Food', 'pet': 'Gus',
+                                           'amount': 4.25, 'description': ''}])
+    cache.refresh()
+    assert cache.rollups['care_high_water'] == '2024-07-02'
+    backend.close()
+
+    assert counted(cache) == rebuilt(data_dir, backend_name)
+    assert RollupCache(open_backend(backend_name, data_dir), workers=1).check() == []
+
+def test_back_dated_care_is_recounted(data_dir):
+    data_dir, backend_name = data_dir
+    backend = open_backend(backend_name, data_dir)
+    cache = RollupCache(backend, workers=1)
+    cache.refresh()
+    before = cache.rollups['care_by_pet'].get('Gus', 0)
+
+    # Behind the high-water mark, written by something other than this backend
+    if backend_name == 'json':
+        shard = os.path.join(backend.shard_dir, '2024-02.json')
+        month = read_data_file(shard)
+        month['2024-02-10'].setdefault('Gus', []).append(
+            {'activity': 'snackies', 'time': '10:00', 'notes': 'edited', 'time_spent': None})
+        atomic_write(shard, dump_data(month, shard))
+    else:
+        with sqlite3.connect(backend.db_file) as conn:
+            conn.execute("INSERT INTO care_activities (date, pet, activity, time, notes) "
+                         "VALUES ('2024-02-10', 'Gus', 'snackies', '10:00', 'edited')")
+        conn.close()
+
+    fresh = RollupCache(open_backend(backend_name, data_dir), workers=1)
+    fresh.refresh()
+    assert fresh.rollups['care_by_pet']['Gus'] == before + 1
+    assert counted(fresh) == rebuilt(data_dir, backend_name)
+
+def test_parallel_count_matches_one_process(data_dir):
+    data_dir, backend_name = data_dir
+    serial = rebuilt(data_dir, backend_name)
+    cache = RollupCache(open_backend(backend_name, data_dir), os.path.join(data_dir, 'parallel.json'), workers=2)
+    cache.rebuild()
+    assert counted(cache) == serial
@@ -0,0 +1,99 @@
+import pytest
+
+from serialization import CODECS, decode, detect_codec, encode
+from storage import dump_data, read_data_file, read_tail_records
+
+PETS = {
+    'gus': {'name': 'Gus', 'type': 'bird', 'species': 'Amazon', 'age': 31, 'weight': 0.45,
+            'special_needs': ['daily_medication'], 'vet': None, 'indoor': True},
+    'bunion': {'name': 'Bunion', 'type': 'rabbit', 'species': 'European Rabbit', 'age': 4, 'weight': 2.1,
+               'special_needs': [], 'vet': 'Dr. Müller 🐰', 'indoor': False},
+}
+EXPENSES = [
+    {'date': '2024-05-01', 'category': 'Food', 'pet': 'Gus', 'amount': 12.5, 'description': 'pellets'},
+    {'date': '2024-05-02', 'category': 'Vet', 'pet': 'Bunion', 'amount': 80, 'description': None},
+    {'date': '2024-05-03', 'category': 'Toys', 'pet': 'All', 'amount': 3.99, 'description': 'bell "ding"'},
+]
+HEALTH_RECORDS = {
+    'medications': [{'date': '2024-05-01', 'time': '14:00', 'pet_name': 'Gus', 'medication': 'x', 'notes': ''}],
+    'health_observations': [],
+    'grooming_appointments': [{'date': '2024-04-01', 'pet_name': 'Bunion'}],
+}
+CARE_LOGS = {
+    '2024-05-01': {'Gus': [{'activity': 'snackies', 'time': '10:00', 'notes': '', 'time_spent': None},
+                           {'activity': 'dinner', 'time': '17:00', 'notes': 'ate well', 'time_spent': '5 min'}]},
+    '2024-05-02': {},
+}
+MIXED = {'big': 2 ** 70, 'negative': -2 ** 63, 'flags': [True, False, 0, 1], 'nested': [[], {}, [{'a': [1.5]}]]}
+
+DATASETS = {'pets': PETS, 'expenses': EXPENSES, 'health_records': HEALTH_RECORDS,
+            'care_logs': CARE_LOGS, 'mixed': MIXED}
+LINE_SHAPED = ('expenses', 'health_records')
+
+def cases():
+    for codec in CODECS:
+        for name in DATASETS:
+            if codec != 'jsonl' or name in LINE_SHAPED:
+                yield codec, name
+
+@pytest.mark.parametrize('codec,name', list(cases()))
+def test_every_codec_round_trips(codec, name):
+    data = encode(DATASETS[name], codec)
+    assert detect_codec(data) == codec
+    decoded = decode(data)
+    assert decoded == DATASETS[name]
+    # bools don't come back as ints or the other way round
+    assert repr(decoded) == repr(DATASETS[name])
+
+@pytest.mark.parametrize('codec', ['zlib', 'gzip', 'records'])
+def test_compressed_and_binary_codecs_are_deterministic(codec):
+    assert encode(EXPENSES, codec) == encode([dict(expense) for expense in EXPENSES], codec)
+
+@pytest.mark.parametrize('codec', ['zlib', 'gzip', 'records'])
+def test_truncated_data_raises_value_error(codec):
+    data = encode(EXPENSES, codec)
+    with pytest.raises(ValueError):
+        decode(data[:len(data) // 2])
+
+def test_jsonl_refuses_data_that_is_not_line_shaped():
+    with pytest.raises(ValueError):
+        encode(PETS, 'jsonl')
+
+def test_dump_data_falls_back_to_json_for_non_line_shaped_files(tmp_path):
+    data = dump_data(PETS, str(tmp_path / 'pets.json'), 'jsonl')
+    assert detect_codec(data) == 'json'
+
+def test_jsonl_keeps_empty_groups():
+    assert decode(encode(HEALTH_RECORDS, 'jsonl'))['health_observations'] == []
+
+def write_jsonl(path, data):
+    path.write_bytes(encode(data, 'jsonl'))
+    return str(path)
+
+def test_read_tail_records_returns_the_newest_oldest_first(tmp_path):
+    records = [{'n': n} for n in range(50)]
+    path = write_jsonl(tmp_path / 'expenses.json', records)
+    assert read_tail_records(path, 3) == records[-3:]
+    assert read_tail_records(path, 1) == records[-1:]
+    assert read_tail_records(path, 500) == records
+
+def test_read_tail_records_by_group(tmp_path):
+    data = {'medications': [{'n': n} for n in range(5)], 'health_observations': [{'o': o} for o in range(3)]}
+    path = write_jsonl(tmp_path / 'health_records.json', data)
+    assert read_tail_records(path, 2, 'medications') == [{'n': 3}, {'n': 4}]
+    assert read_tail_records(path, 10, 'health_observations') == data['health_observations']
+    assert read_tail_records(path, 10, 'grooming_appointments') == []
+
+def test_read_tail_records_skips_a_torn_last_line(tmp_path):
+    records = [{'n': n} for n in range(5)]
+    path = write_jsonl(tmp_path / 'expenses.json', records)
+    with open(path, 'ab') as f:
+        f.write(b'{"n": 5, "amou')
+    assert read_tail_records(path, 2) == records[-2:]
+    assert read_data_file(path) == records
+
+def test_read_tail_records_of_empty_files(tmp_path):
+    empty = tmp_path / 'empty.json'
+    empty.write_bytes(b'')
+    assert read_tail_records(str(empty), 5) == []
+    assert read_tail_records(write_jsonl(tmp_path / 'header_only.json', []), 5) == []
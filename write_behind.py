@@ -0,0 +1,166 @@
+import sys
+import threading
+import time
+
+from storage import atomic_write
+
+class WriteBehindWriter:
+    """Background writer for one data file that coalesces saves.
+
+    request() just records the latest way to serialize the file and returns
+    immediately. The writer thread waits at most flush_delay seconds after
+    the first unsaved change, then serializes the current state once and
+    writes it atomically, so a burst of changes costs a single write.
+
+    A write that fails is logged and retried flush_delay later (with the
+    newest state by then); flush() raises its error rather than waiting
+    for a write that may never succeed.
+    """
+
+    def __init__(self, path, flush_delay=0.5, on_written=None):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.on_written = on_written
+        self.condition = threading.Condition()
+        self.serialize = None
+        self.pending_since = None
+        self.writing = False
+        self.flush_requested = False
+        self.closed = False
+        self.failures = 0
+        self.last_error = None
+
+        self.requests = 0
+        self.writes = 0
+        self.write_seconds = 0.0
+        self.max_write_seconds = 0.0
+        self.max_delay_seconds = 0.0
+
+        self.thread = threading.Thread(target=self.run, name=f"write-behind {path}", daemon=True)
+        self.thread.start()
+
+    def request(self, serialize):
+        """Schedule a save; serialize() must return the file's bytes"""
+        with self.condition:
+            self.serialize = serialize
+            self.requests += 1
+            if self.pending_since is None:
+                self.pending_since = time.monotonic()
+            self.condition.notify_all()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending_since is None and not self.closed:
+                    self.condition.wait()
+                if self.pending_since is None:
+                    return
+
+                deadline = self.pending_since + self.flush_delay
+                while not (self.flush_requested or self.closed):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+
+                serialize = self.serialize
+                pending_since = self.pending_since
+                self.pending_since = None
+                self.flush_requested = False
+                self.writing = True
+
+            started = time.monotonic()
+            try:
+                self.write_now(serialize)
+                error = None
+            except Exception as failure:
+                error = failure
+                print(f"⚠️  Couldn't save {self.path}: {error}", file=sys.stderr)
+            finished = time.monotonic()
+            with self.condition:
+                self.writing = False
+                if error is None:
+                    self.writes += 1
+                    self.write_seconds += finished - started
+                    self.max_write_seconds = max(self.max_write_seconds, finished - started)
+                    self.max_delay_seconds = max(self.max_delay_seconds, finished - pending_since)
+                else:
+                    self.failures += 1
+                    self.last_error = error
+                    if self.pending_since is None and not self.closed:
+                        # Nothing newer asked for: try this state again later
+                        self.serialize = serialize
+                        self.pending_since = finished
+                self.condition.notify_all()
+
+    def write_now(self, serialize):
+        atomic_write(self.path, self.serialize_safely(serialize))
+        if self.on_written:
+            self.on_written()
+
+    def serialize_safely(self, serialize, attempts=5):
+        # The menu thread may add a record while we're walking a dict; the
+        # newer state is what we want anyway, so just take it again.
+        for attempt in range(attempts):
+            try:
+                return serialize()
+            except RuntimeError:
+                if attempt == attempts - 1:
+                    raise
+
+    def busy(self):
+        """True while there are changes that haven't reached the file yet"""
+        with self.condition:
+            return self.pending_since is not None or self.writing
+
+    def flush(self):
+        """Block until everything requested so far is on disk; raises the
+        write's error if it failed"""
+        with self.condition:
+            if self.pending_since is not None:
+                self.flush_requested = True
+                self.condition.notify_all()
+            failures = self.failures
+            while (self.pending_since is not None or self.writing) and self.failures == failures:
+                if not self.thread.is_alive():
+                    # The writer thread died: write what's pending from here
+                    serialize = self.serialize
+                    self.pending_since = None
+                    self.writing = False
+                    self.write_now(serialize)
+                    return
+                self.condition.wait(0.5)
+            if self.pending_since is not None:
+                raise self.last_error
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            with self.condition:
+                self.closed = True
+                self.condition.notify_all()
+            self.thread.join()
+
+    def stats(self):
+        with self.condition:
+            return {
+                'file': self.path,
+                'save_requests': self.requests,
+                'writes': self.writes,
+                'coalescing_ratio': self.requests / self.writes if self.writes else 0.0,
+                'avg_write_ms': 1000 * self.write_seconds / self.writes if self.writes else 0.0,
+                'max_write_ms': 1000 * self.max_write_seconds,
+                'max_delay_ms': 1000 * self.max_delay_seconds,
+                'failed_writes': self.failures,
+            }
+
+def print_write_stats(stats):
+    if not stats:
+        return
+    print("\n💾 Write-behind:")
+    for s in stats:
+        print(f"   {s['file']}: {s['save_requests']} saves -> {s['writes']} writes "
+              f"(x{s['coalescing_ratio']:.1f}), avg {s['avg_write_ms']:.1f}ms, "
+              f"max {s['max_write_ms']:.1f}ms, max delay {s['max_delay_ms']:.0f}ms"
+              + (f", {s['failed_writes']} failed" if s.get('failed_writes') else ""))